@@ -0,0 +1,230 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""Persistent cache of build-input analysis, shared across archive runs.
+
+Running nm / llvm-bcanalyzer on every object file and parsing every .ninja file
+dominates the time it takes to archive a native library. Between two
+consecutive builds, only a handful of object files typically change, so results
+are stored on disk and reused:
+
+* Per-file results (e.g. nm output of a .o) are keyed by the file's path and
+  content hash. A stat index (path -> size, mtime, hash) avoids re-hashing
+  files that have not been touched.
+* Derived results (e.g. parsed .ninja files) record the size and mtime of every
+  file they were computed from, and are valid only while none of them change.
+
+Results of running a tool are stored in a namespace from ToolNamespace(), so
+that updating the tool, or the code that parses its output, invalidates them.
+
+Values must be JSON-serializable. Entries are evicted in least-recently-used
+order once there are more than |max_entries| of them.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+
+# Bump whenever the format of cached values changes.
+_VERSION = 1
+_STAT_INDEX_NAME = 'stat_index.json'
+_ENTRIES_DIR = 'entries'
+_READ_CHUNK_SIZE = 1 << 20
+
+# Chrome links ~50k object files, so this holds a few builds' worth.
+DEFAULT_MAX_ENTRIES = 200000
+
+
+def _WriteFileAtomically(path, data):
+  dirname = os.path.dirname(path)
+  os.makedirs(dirname, exist_ok=True)
+  fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'w') as f:
+      f.write(data)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
+def _StatKey(path):
+  st = os.stat(path)
+  return [st.st_size, st.st_mtime_ns]
+
+
+def ToolNamespace(name, tool_path, parser_module):
+  """Returns a namespace for results of running |tool_path|.
+
+  Args:
+    name: Name of the kind of result, e.g. 'nm'.
+    tool_path: Path to the tool's executable. Its size and mtime are part of the
+      namespace.
+    parser_module: The module that parses the tool's output. Its source is part
+      of the namespace.
+  """
+  parts = [name, tool_path]
+  try:
+    parts.append('%d:%d' % tuple(_StatKey(tool_path)))
+  except OSError:
+    # Running the tool will fail, so nothing is cached anyway.
+    pass
+  with open(inspect.getsourcefile(parser_module), 'rb') as f:
+    parts.append(hashlib.sha1(f.read()).hexdigest())
+  return '\0'.join(parts)
+
+
+class AnalysisCache:
+  """Stores analysis results keyed by the build inputs they came from."""
+
+  def __init__(self, cache_dir, output_directory,
+               max_entries=DEFAULT_MAX_ENTRIES):
+    self._cache_dir = cache_dir
+    self._output_directory = output_directory
+    self._max_entries = max_entries
+    self._stat_index = self._ReadStatIndex()
+    self._stat_index_dirty = False
+    self._used_stat_keys = set()
+    self.hit_count = 0
+    self.miss_count = 0
+
+  def _ReadStatIndex(self):
+    try:
+      with open(os.path.join(self._cache_dir, _STAT_INDEX_NAME)) as f:
+        data = json.load(f)
+    except (OSError, ValueError):
+      return {}
+    if data.get('version') != _VERSION:
+      return {}
+    return data['files']
+
+  def _ContentHash(self, path):
+    """Returns the content hash of |path|, or None if it does not exist."""
+    full_path = os.path.abspath(os.path.join(self._output_directory, path))
+    try:
+      stat_key = _StatKey(full_path)
+    except OSError:
+      return None
+    self._used_stat_keys.add(full_path)
+    entry = self._stat_index.get(full_path)
+    if entry and entry[:2] == stat_key:
+      return entry[2]
+    h = hashlib.sha1()
+    with open(full_path, 'rb') as f:
+      for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+        h.update(chunk)
+    content_hash = h.hexdigest()
+    self._stat_index[full_path] = stat_key + [content_hash]
+    self._stat_index_dirty = True
+    return content_hash
+
+  def _EntryPath(self, namespace, *key_parts):
+    key = '\0'.join((str(_VERSION), namespace) + key_parts)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(self._cache_dir, _ENTRIES_DIR, digest[:2], digest)
+
+  def _ReadEntry(self, entry_path):
+    try:
+      with open(entry_path) as f:
+        ret = json.load(f)
+    except (OSError, ValueError):
+      return None
+    # Bump mtime, which is what LRU eviction is based on.
+    os.utime(entry_path)
+    return ret
+
+  def Partition(self, namespace, paths):
+    """Looks up results for |paths| (relative to the output directory).
+
+    Returns:
+      A tuple of (values_by_path, uncached_paths).
+    """
+    values_by_path = {}
+    uncached_paths = []
+    for path in paths:
+      content_hash = self._ContentHash(path)
+      value = None
+      if content_hash:
+        value = self._ReadEntry(self._EntryPath(namespace, path, content_hash))
+      if value is None:
+        uncached_paths.append(path)
+      else:
+        values_by_path[path] = value
+    self.hit_count += len(values_by_path)
+    self.miss_count += len(uncached_paths)
+    return values_by_path, uncached_paths
+
+  def Put(self, namespace, path, value):
+    """Stores |value| as the result for |path|."""
+    content_hash = self._ContentHash(path)
+    # Files that do not exist (e.g. in tests) are never cached.
+    if content_hash:
+      _WriteFileAtomically(self._EntryPath(namespace, path, content_hash),
+                           json.dumps(value))
+
+  def GetDerived(self, namespace, key):
+    """Returns the value stored via PutDerived() if its inputs are unchanged."""
+    entry = self._ReadEntry(self._EntryPath(namespace, key))
+    if entry is None:
+      return None
+    for path, stat_key in entry['inputs'].items():
+      try:
+        if _StatKey(os.path.join(self._output_directory, path)) != stat_key:
+          return None
+      except OSError:
+        return None
+    return entry['value']
+
+  def PutDerived(self, namespace, key, input_paths, value):
+    """Stores |value|, which was computed from |input_paths|."""
+    try:
+      inputs = {
+          p: _StatKey(os.path.join(self._output_directory, p))
+          for p in input_paths
+      }
+    except OSError:
+      return
+    _WriteFileAtomically(self._EntryPath(namespace, key),
+                         json.dumps({
+                             'inputs': inputs,
+                             'value': value
+                         }))
+
+  def _EvictEntries(self):
+    entries_dir = os.path.join(self._cache_dir, _ENTRIES_DIR)
+    if not os.path.isdir(entries_dir):
+      return
+    entries = []
+    for subdir in os.scandir(entries_dir):
+      if subdir.is_dir():
+        entries.extend((e.stat().st_mtime, e.path)
+                       for e in os.scandir(subdir.path))
+    num_to_evict = len(entries) - self._max_entries
+    if num_to_evict > 0:
+      logging.info('Evicting %d analysis cache entries', num_to_evict)
+      entries.sort()
+      for _, path in entries[:num_to_evict]:
+        os.unlink(path)
+
+  def Flush(self):
+    """Writes the stat index and evicts least-recently-used entries."""
+    logging.info('Analysis cache: %d hits, %d misses', self.hit_count,
+                 self.miss_count)
+    if self._stat_index_dirty:
+      if len(self._stat_index) > self._max_entries:
+        # Keep the files used in this run.
+        self._stat_index = {
+            k: v
+            for k, v in self._stat_index.items() if k in self._used_stat_keys
+        }
+      _WriteFileAtomically(
+          os.path.join(self._cache_dir, _STAT_INDEX_NAME),
+          json.dumps({
+              'version': _VERSION,
+              'files': self._stat_index
+          }))
+      self._stat_index_dirty = False
+    self._EvictEntries()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import tempfile
+import unittest
+
+import analysis_cache
+import nm
+
+
+class AnalysisCacheTest(unittest.TestCase):
+  def setUp(self):
+    self._temp_dir = tempfile.TemporaryDirectory()
+    self._cache_dir = os.path.join(self._temp_dir.name, 'cache')
+    self._output_dir = os.path.join(self._temp_dir.name, 'out')
+    os.makedirs(self._output_dir)
+
+  def tearDown(self):
+    self._temp_dir.cleanup()
+
+  def _WriteFile(self, path, data):
+    with open(os.path.join(self._output_dir, path), 'w') as f:
+      f.write(data)
+
+  def _CreateCache(self, max_entries=10):
+    return analysis_cache.AnalysisCache(self._cache_dir,
+                                        self._output_dir,
+                                        max_entries=max_entries)
+
+  def testPartition(self):
+    self._WriteFile('a.o', 'a')
+    self._WriteFile('b.o', 'b')
+    cache = self._CreateCache()
+    cache.Put('nm', 'a.o', [['foo'], []])
+    cache.Flush()
+
+    cache = self._CreateCache()
+    values_by_path, uncached_paths = cache.Partition(
+        'nm', ['a.o', 'b.o', 'missing.o'])
+    self.assertEqual({'a.o': [['foo'], []]}, values_by_path)
+    self.assertEqual(['b.o', 'missing.o'], uncached_paths)
+    # Namespaces are independent.
+    self.assertEqual(({}, ['a.o']), cache.Partition('other', ['a.o']))
+
+  def testPartition_ContentChanged(self):
+    self._WriteFile('a.o', 'a')
+    cache = self._CreateCache()
+    cache.Put('nm', 'a.o', 1)
+    self._WriteFile('a.o', 'changed')
+    os.utime(os.path.join(self._output_dir, 'a.o'), ns=(0, 0))
+    self.assertEqual(({}, ['a.o']), cache.Partition('nm', ['a.o']))
+
+  def testToolNamespace(self):
+    tool_path = os.path.join(self._temp_dir.name, 'llvm-nm')
+    with open(tool_path, 'w') as f:
+      f.write('v1')
+    namespace = analysis_cache.ToolNamespace('nm', tool_path, nm)
+    self.assertEqual(namespace,
+                     analysis_cache.ToolNamespace('nm', tool_path, nm))
+    self.assertNotEqual(namespace,
+                        analysis_cache.ToolNamespace('nm', tool_path,
+                                                     analysis_cache))
+    with open(tool_path, 'w') as f:
+      f.write('v2 is longer')
+    self.assertNotEqual(namespace,
+                        analysis_cache.ToolNamespace('nm', tool_path, nm))
+
+    self._WriteFile('a.o', 'a')
+    cache = self._CreateCache()
+    cache.Put(namespace, 'a.o', 1)
+    self.assertEqual(({
+        'a.o': 1
+    }, []), cache.Partition(namespace, ['a.o']))
+    self.assertEqual(({}, ['a.o']),
+                     cache.Partition(
+                         analysis_cache.ToolNamespace('nm', tool_path, nm),
+                         ['a.o']))
+
+  def testDerived(self):
+    self._WriteFile('build.ninja', 'a')
+    cache = self._CreateCache()
+    self.assertIsNone(cache.GetDerived('ninja', 'key'))
+    cache.PutDerived('ninja', 'key', ['build.ninja'], {'x': 1})
+    self.assertEqual({'x': 1}, cache.GetDerived('ninja', 'key'))
+    self._WriteFile('build.ninja', 'changed')
+    self.assertIsNone(cache.GetDerived('ninja', 'key'))
+
+  def testEviction(self):
+    cache = self._CreateCache(max_entries=2)
+    for i, name in enumerate(('a.o', 'b.o', 'c.o')):
+      self._WriteFile(name, name)
+      cache.Put('nm', name, i)
+    # Age all entries, then use all but b.o.
+    for root, _, files in os.walk(os.path.join(self._cache_dir, 'entries')):
+      for name in files:
+        os.utime(os.path.join(root, name), (1, 1))
+    cache.Partition('nm', ['a.o', 'c.o'])
+    cache.Flush()
+
+    values_by_path, uncached_paths = self._CreateCache().Partition(
+        'nm', ['a.o', 'b.o', 'c.o'])
+    self.assertEqual({'a.o': 0, 'c.o': 2}, values_by_path)
+    self.assertEqual(['b.o'], uncached_paths)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -27,6 +27,7 @@ import function_signature
 import json_config_parser
 import models
 import native
+import obj_analyzer
 import pakfile
 import parallel
 import path_util
@@ -45,6 +46,11 @@ class NativeSpec:
   elf_path: str = None
   # Whether to create symbols for each string literal.
   track_string_literals: bool = True
+  # Whether to name string literals after their contents while archiving.
+  # When False, literals are named "string literal" and can be named on demand
+  # via string_extract.NameStringLiterals() (e.g. from the console). Literals
+  # are still created and attributed to object files either way.
+  name_string_literals: bool = True
   # component to use for all symbols.
   component: str = None
   # Regular expression that will match generated files.
@@ -201,13 +207,21 @@ def _NormalizeNames(raw_symbols):
   logging.debug('Found name prefixes of: %r', found_prefixes)
 
 
+def _PostProcessRawSymbols(raw_symbols):
+  logging.info('Normalizing symbol names')
+  _NormalizeNames(raw_symbols)
+  logging.info('Loaded %d symbols', len(raw_symbols))
+
+
 def LoadAndPostProcessSizeInfo(path, file_obj=None):
-  """Returns a SizeInfo for the given |path|."""
+  """Returns a SizeInfo for the given |path|.
+
+  For columnar .size files, symbols are loaded and post-processed only once
+  |raw_symbols| is first accessed.
+  """
   logging.debug('Loading results from: %s', path)
   size_info = file_format.LoadSizeInfo(path, file_obj=file_obj)
-  logging.info('Normalizing symbol names')
-  _NormalizeNames(size_info.raw_symbols)
-  logging.info('Loaded %d symbols', len(size_info.raw_symbols))
+  size_info.PostProcessRawSymbols(_PostProcessRawSymbols)
   return size_info
 
 
@@ -216,11 +230,8 @@ def LoadAndPostProcessDeltaSizeInfo(path, file_obj=None):
   logging.debug('Loading results from: %s', path)
   before_size_info, after_size_info = file_format.LoadDeltaSizeInfo(
       path, file_obj=file_obj)
-  logging.info('Normalizing symbol names')
-  _NormalizeNames(before_size_info.raw_symbols)
-  _NormalizeNames(after_size_info.raw_symbols)
-  logging.info('Loaded %d + %d symbols', len(before_size_info.raw_symbols),
-               len(after_size_info.raw_symbols))
+  before_size_info.PostProcessRawSymbols(_PostProcessRawSymbols)
+  after_size_info.PostProcessRawSymbols(_PostProcessRawSymbols)
   return before_size_info, after_size_info
 
 
@@ -303,8 +314,12 @@ def _CreatePakSymbols(*, pak_spec, pak_id_map, apk_spec, output_directory):
   return section_ranges, raw_symbols
 
 
-def _CreateContainerSymbols(container_spec, apk_file_manager,
-                            apk_analyzer_results, pak_id_map):
+def _CreateContainerSymbols(container_spec,
+                            apk_file_manager,
+                            apk_analyzer_results,
+                            pak_id_map,
+                            analysis_cache_dir=None,
+                            obj_analyzer_service=None):
   container_name = container_spec.container_name
   apk_spec = container_spec.apk_spec
   pak_spec = container_spec.pak_spec
@@ -362,7 +377,9 @@ def _CreateContainerSymbols(container_spec, apk_file_manager,
         apk_spec=apk_spec,
         native_spec=native_spec,
         output_directory=output_directory,
-        pak_id_map=pak_id_map)
+        pak_id_map=pak_id_map,
+        analysis_cache_dir=analysis_cache_dir,
+        obj_analyzer_service=obj_analyzer_service)
     add_syms(section_ranges,
              new_raw_symbols,
              source_path_prefix=native_spec.source_path_prefix,
@@ -530,6 +547,35 @@ def _AddContainerArguments(parser, is_top_args=False):
                        help='Include a padding field for each symbol, '
                        'instead of rederiving from consecutive symbols '
                        'on file load.')
+    group.add_argument('--columnar',
+                       action='store_true',
+                       help='Write an uncompressed, memory-mappable .size '
+                       'file, which is larger but whose symbols are created '
+                       'only when first accessed (all at once).')
+    group.add_argument('--include-rollups',
+                       action='store_true',
+                       help='Store per-section, per-component, and '
+                       'per-directory totals in the .size file, which can '
+                       'be read without loading symbols. Requires '
+                       '--columnar.')
+    group.add_argument('--lazy-string-literal-names',
+                       action='store_true',
+                       help='Do not read string literal contents from the '
+                       'ELF while archiving (literals are still attributed '
+                       'to object files). Use NameStringLiterals() in the '
+                       'console to name them when needed.')
+    group.add_argument('--defer-string-literals',
+                       action='store_true',
+                       help='Do not break down "** merge strings" while '
+                       'archiving, which skips running llvm-bcanalyzer and '
+                       'attributing string literals to object files. '
+                       'ReadStringLiterals(merge_strings=True) in the console '
+                       'reads the literals within them from the ELF when '
+                       'needed.')
+    group.add_argument('--analysis-cache-dir',
+                       help='Directory in which to cache the analysis of '
+                       'object files and .ninja files, so that subsequent '
+                       'runs re-analyze only the files that changed.')
     group.add_argument('--check-data-quality',
                        action='store_true',
                        help='Perform sanity checks to ensure there is no '
@@ -1039,7 +1085,10 @@ def _FilterContainerSpecs(container_specs, container_re=None):
   return ret
 
 
-def CreateSizeInfo(container_specs, build_config, apk_file_manager):
+def CreateSizeInfo(container_specs,
+                   build_config,
+                   apk_file_manager,
+                   analysis_cache_dir=None):
   def sort_key(container_spec):
     # Native containers come first to ensure pak_id_map is populated before
     # any pak_spec is encountered.
@@ -1071,11 +1120,23 @@ def CreateSizeInfo(container_specs, build_config, apk_file_manager):
 
   raw_symbols_list = []
   pak_id_map = pakfile.PakIdMap()
-  for container_spec in container_specs:
-    raw_symbols = _CreateContainerSymbols(container_spec, apk_file_manager,
-                                          apk_analyzer_results, pak_id_map)
-    assert raw_symbols, f'{container_spec.container_name} had no symbols.'
-    raw_symbols_list.append(raw_symbols)
+  # Native containers often share object files (e.g. split libraries of a
+  # bundle), so share their analysis.
+  obj_analyzer_service = obj_analyzer.ObjectFileAnalyzerService(
+      analysis_cache_dir=analysis_cache_dir)
+  try:
+    for container_spec in container_specs:
+      raw_symbols = _CreateContainerSymbols(
+          container_spec,
+          apk_file_manager,
+          apk_analyzer_results,
+          pak_id_map,
+          analysis_cache_dir=analysis_cache_dir,
+          obj_analyzer_service=obj_analyzer_service)
+      assert raw_symbols, f'{container_spec.container_name} had no symbols.'
+      raw_symbols_list.append(raw_symbols)
+  finally:
+    obj_analyzer_service.Close()
 
   # Normalize names before sorting.
   logging.info('Normalizing symbol names')
@@ -1105,6 +1166,8 @@ def Run(top_args, on_config_error):
 
   if not top_args.size_file.endswith('.size'):
     on_config_error('size_file must end with .size')
+  if top_args.include_rollups and not top_args.columnar:
+    on_config_error('--include-rollups requires --columnar')
   if top_args.check_data_quality:
     start_time = time.time()
 
@@ -1120,12 +1183,21 @@ def Run(top_args, on_config_error):
     container_specs = _CreateAllContainerSpecs(apk_file_manager, top_args,
                                                on_config_error)
     container_specs = _FilterContainerSpecs(container_specs, container_re)
+    for container_spec in container_specs:
+      native_spec = container_spec.native_spec
+      if native_spec and top_args.defer_string_literals:
+        native_spec.track_string_literals = False
+      if native_spec and top_args.lazy_string_literal_names:
+        native_spec.name_string_literals = False
 
     build_config = CreateBuildConfig(top_args.output_directory,
                                      top_args.source_directory,
                                      url=top_args.url,
                                      title=top_args.title)
-    size_info = CreateSizeInfo(container_specs, build_config, apk_file_manager)
+    size_info = CreateSizeInfo(container_specs,
+                               build_config,
+                               apk_file_manager,
+                               analysis_cache_dir=top_args.analysis_cache_dir)
 
   if logging.getLogger().isEnabledFor(logging.DEBUG):
     for line in data_quality.DescribeSizeInfoCoverage(size_info):
@@ -1138,13 +1210,17 @@ def Run(top_args, on_config_error):
   logging.info('Saving result to %s', top_args.size_file)
   file_format.SaveSizeInfo(size_info,
                            top_args.size_file,
-                           include_padding=top_args.include_padding)
+                           include_padding=top_args.include_padding,
+                           columnar=top_args.columnar,
+                           include_rollups=top_args.include_rollups)
   size_in_mb = os.path.getsize(top_args.size_file) / 1024.0 / 1024.0
   logging.info('Done. File size is %.2fMiB.', size_in_mb)
 
   if top_args.check_data_quality:
     logging.info('Checking data quality')
-    data_quality.CheckDataQuality(size_info, top_args.track_string_literals)
+    data_quality.CheckDataQuality(
+        size_info, top_args.track_string_literals
+        and not top_args.defer_string_literals)
     duration = (time.time() - start_time) / 60
     if duration > 10:
       raise data_quality.QualityCheckError(
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""Measures the performance of supersize on synthetic inputs.
+
+Generates a SizeInfo with a configurable number of symbols, along with the
+linker map and nm output that would have produced it, and then times each
+stage of the pipeline:
+
+  parse_map: linker_map_parser.ParseFile() (serially, then in chunks).
+  parse_nm: Parsing of nm output of object files (as done by obj_analyzer).
+  save: file_format.SaveSizeInfo() (gzipped, then columnar).
+  load: archive.LoadAndPostProcessSizeInfo() + accessing raw_symbols.
+  diff: diff.Diff() against a perturbed copy.
+  describe: Consuming all lines of describe.GenerateLines().
+  canned_queries: Running all canned_queries.CannedQueries.
+
+Reports wall time for each stage, along with the peak RSS of the process
+after it (which includes all earlier stages, since it never goes down).
+
+Example:
+  tools/binary_size/libsupersize/benchmark.py --symbols 1000000 \
+      --json-output results.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import archive
+import canned_queries
+import describe
+import diff
+import file_format
+import linker_map_parser
+import models
+import nm
+import parallel
+
+_ALL_STAGES = ('parse_map', 'parse_nm', 'save', 'load', 'diff', 'describe',
+               'canned_queries')
+
+_TOP_DIRS = ('base', 'cc', 'chrome/browser', 'components', 'content', 'net',
+             'skia/src', 'third_party/blink/renderer', 'ui', 'v8/src')
+_COMPONENTS = ('', 'Blink>DOM', 'Blink>JavaScript', 'Internals>Network',
+               'Internals>Skia', 'UI>Browser')
+# (section_name, relative frequency, alignment).
+_NATIVE_SECTIONS = (
+    (models.SECTION_TEXT, 70, 4),
+    (models.SECTION_RODATA, 12, 8),
+    (models.SECTION_DATA_REL_RO, 8, 8),
+    (models.SECTION_DATA, 4, 8),
+    (models.SECTION_BSS, 6, 8),
+)
+_JAVA_FRACTION = 0.1
+_ALIAS_FRACTION = 0.02
+_NM_SYMBOLS_PER_OBJECT = 20
+_MAP_CHUNK_SIZE = 4 << 20
+
+
+def _PeakRssKb():
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _SyntheticGenerator:
+  """Creates deterministic, Chrome-like symbols."""
+
+  def __init__(self, num_symbols, seed):
+    self._num_symbols = num_symbols
+    self._rand = random.Random(seed)
+    num_files = max(1, num_symbols // 40)
+    self._paths = [self._MakePath(i) for i in range(num_files)]
+
+  def _MakePath(self, i):
+    top_dir = self._rand.choice(_TOP_DIRS)
+    return '%s/dir%d/sub%d/file%d.cc' % (top_dir, self._rand.randrange(40),
+                                         self._rand.randrange(8), i)
+
+  def _MakeNativeName(self, i):
+    roll = self._rand.random()
+    ns = 'ns%d' % self._rand.randrange(200)
+    if roll < 0.15:
+      full_name = '%s::Vector<%s::Class%d>::Method%d(int)' % (
+          ns, ns, self._rand.randrange(1000), i)
+      template_name = full_name[:full_name.index('(')]
+      name = '%s::Vector<>::Method%d' % (ns, i)
+      return full_name, template_name, name
+    if roll < 0.2:
+      return models.STRING_LITERAL_NAME, '', ''
+    full_name = '%s::Class%d::Method%d(int, bool)' % (
+        ns, self._rand.randrange(5000), i)
+    name = full_name[:full_name.index('(')]
+    return full_name, name, name
+
+  def CreateSizeInfo(self):
+    container = models.Container(name='',
+                                 metadata={'synthetic_symbols':
+                                           self._num_symbols},
+                                 section_sizes={})
+    num_java = int(self._num_symbols * _JAVA_FRACTION)
+    num_native = self._num_symbols - num_java
+    total_weight = sum(w for _, w, _ in _NATIVE_SECTIONS)
+
+    raw_symbols = []
+    address = 0x100000
+    for section_name, weight, alignment in _NATIVE_SECTIONS:
+      section_start = address
+      count = num_native * weight // total_weight
+      i = 0
+      while i < count:
+        path = self._rand.choice(self._paths)
+        object_path = 'obj/' + path[:-3] + '.o'
+        size = self._rand.randrange(1, 600)
+        full_name, template_name, name = self._MakeNativeName(len(raw_symbols))
+        address = -(-address // alignment) * alignment
+        num_aliases = 1
+        if self._rand.random() < _ALIAS_FRACTION:
+          num_aliases = 2
+        aliases = [] if num_aliases > 1 else None
+        for _ in range(num_aliases):
+          sym = models.Symbol(section_name,
+                              size,
+                              address=address,
+                              full_name=full_name,
+                              template_name=template_name,
+                              name=name,
+                              source_path=path,
+                              object_path=object_path,
+                              aliases=aliases)
+          if aliases is not None:
+            aliases.append(sym)
+            full_name += '_alias'
+          raw_symbols.append(sym)
+        i += num_aliases
+        address += size
+      container.section_sizes[section_name] = address - section_start
+      address += 0x1000
+
+    dex_size = 0
+    for i in range(num_java):
+      size = self._rand.randrange(10, 300)
+      raw_symbols.append(
+          models.Symbol(models.SECTION_DEX_METHOD,
+                        size,
+                        full_name='org.chromium.pkg%d.Class%d#method%d()' %
+                        (self._rand.randrange(100), self._rand.randrange(2000),
+                         i),
+                        source_path='$APK/classes.dex'))
+      dex_size += size
+    container.section_sizes[models.SECTION_DEX_METHOD] = dex_size
+
+    for sym in raw_symbols:
+      sym.container = container
+      sym.component = self._rand.choice(_COMPONENTS)
+    file_format.CalculatePadding(raw_symbols)
+    return models.SizeInfo({}, [container], raw_symbols)
+
+  def CreatePerturbedCopy(self, size_info):
+    """Returns a copy of |size_info| with ~5% of symbols changed or removed."""
+    raw_symbols = []
+    for sym in size_info.raw_symbols:
+      roll = self._rand.random()
+      if roll < 0.01:
+        continue
+      new_sym = models.Symbol(sym.section_name,
+                              sym.size_without_padding,
+                              address=sym.address,
+                              full_name=sym.full_name,
+                              template_name=sym.template_name,
+                              name=sym.name,
+                              source_path=sym.source_path,
+                              object_path=sym.object_path)
+      new_sym.container = sym.container
+      new_sym.component = sym.component
+      if roll < 0.04:
+        new_sym.size += self._rand.randrange(1, 100)
+      elif roll < 0.05:
+        new_sym.object_path = 'obj/moved/' + sym.object_path
+      raw_symbols.append(new_sym)
+    return models.SizeInfo(size_info.build_config, size_info.containers,
+                           raw_symbols)
+
+
+def WriteLinkerMap(size_info, path):
+  """Writes an LLD (v1) linker map containing the native symbols."""
+  with open(path, 'w') as f:
+    f.write('     VMA      LMA     Size Align Out     In      Symbol\n')
+    for group in size_info.raw_symbols.GroupedBySectionName():
+      if not group[0].IsNative():
+        continue
+      section_name = group[0].section_name
+      start = group[0].address
+      end = group[-1].end_address
+      f.write('%8x %8x %8x %5d %s\n' % (start, start, end - start, 64,
+                                         section_name))
+      prev_address = None
+      for sym in group:
+        if sym.address != prev_address:
+          f.write('%8x %8x %8x %5d         %s:(%s.%d)\n' %
+                  (sym.address, sym.address, sym.size_without_padding, 4,
+                   sym.object_path, section_name, sym.address))
+          prev_address = sym.address
+        name = sym.full_name
+        if sym.IsStringLiteral():
+          name = '.L.str.%d' % sym.address
+        f.write('%8x %8x %8x %5d                 %s\n' %
+                (sym.address, sym.address, 0, 1, name))
+
+
+def CreateNmOutput(size_info):
+  """Returns the lines of nm output for all object files of |size_info|."""
+  names_by_object_path = {}
+  for sym in size_info.raw_symbols:
+    if sym.object_path:
+      names = names_by_object_path.setdefault(sym.object_path, [])
+      if len(names) < _NM_SYMBOLS_PER_OBJECT:
+        names.append(sym.full_name)
+  lines = []
+  for object_path, names in names_by_object_path.items():
+    lines.append('')
+    lines.append(object_path + ':')
+    for i, name in enumerate(names):
+      lines.append('%08x T %s' % (i * 16, name))
+      lines.append('%08x r .L.str.%d' % (i * 16, i))
+  return lines
+
+
+def _ParseNmOutput(lines):
+  """Parses output of CreateNmOutput() as RunNmOnIntermediates() does."""
+  lines = iter(lines)
+  next(lines)
+  path = next(lines)[:-1]
+  symbol_names_by_path = {}
+  string_addresses_by_path = {}
+  while path:
+    # pylint: disable=protected-access
+    symbol_names, string_addresses = nm._ParseOneObjectFileNmOutput(lines)
+    symbol_names_by_path[path] = symbol_names
+    if string_addresses:
+      string_addresses_by_path[path] = string_addresses
+    path = next(lines, ':')[:-1]
+  encoded = (parallel.EncodeDictOfLists(symbol_names_by_path),
+             parallel.EncodeDictOfLists(string_addresses_by_path))
+  return [parallel.DecodeDictOfLists(x) for x in encoded]
+
+
+class _Timer:
+  """Records wall time and peak RSS of named stages."""
+
+  def __init__(self):
+    self.results = []
+
+  def Run(self, name, func, *args, **kwargs):
+    gc.collect()
+    logging.info('Running %s', name)
+    start = time.time()
+    ret = func(*args, **kwargs)
+    duration = time.time() - start
+    self.results.append({
+        'stage': name,
+        'seconds': round(duration, 3),
+        'peak_rss_mb': _PeakRssKb() // 1024,
+    })
+    logging.info('%s took %.2fs', name, duration)
+    return ret
+
+
+def _ConsumeLines(lines):
+  count = 0
+  for _ in lines:
+    count += 1
+  return count
+
+
+def RunBenchmarks(num_symbols, stages, work_dir, seed=0):
+  """Runs |stages| on |num_symbols| synthetic symbols.
+
+  Returns:
+    A list of dicts with keys: stage, seconds, peak_rss_mb.
+  """
+  timer = _Timer()
+  generator = _SyntheticGenerator(num_symbols, seed)
+  size_info = timer.Run('generate', generator.CreateSizeInfo)
+
+  if 'parse_map' in stages:
+    map_path = os.path.join(work_dir, 'synthetic.map')
+    WriteLinkerMap(size_info, map_path)
+    timer.Run('parse_map', linker_map_parser.ParseFile, map_path)
+    timer.Run('parse_map_chunked',
+              linker_map_parser.ParseFile,
+              map_path,
+              chunk_size=_MAP_CHUNK_SIZE)
+
+  if 'parse_nm' in stages:
+    nm_lines = CreateNmOutput(size_info)
+    timer.Run('parse_nm', _ParseNmOutput, nm_lines)
+    del nm_lines
+
+  size_path = os.path.join(work_dir, 'synthetic.size')
+  columnar_path = os.path.join(work_dir, 'synthetic_columnar.size')
+  if 'save' in stages or 'load' in stages:
+    timer.Run('save', file_format.SaveSizeInfo, size_info, size_path)
+    timer.Run('save_columnar',
+              file_format.SaveSizeInfo,
+              size_info,
+              columnar_path,
+              columnar=True)
+
+  if 'load' in stages:
+    for name, path in (('load', size_path), ('load_columnar', columnar_path)):
+      timer.Run(name,
+                lambda p: archive.LoadAndPostProcessSizeInfo(p).raw_symbols,
+                path)
+
+  if 'diff' in stages:
+    after = generator.CreatePerturbedCopy(size_info)
+    timer.Run('diff', diff.Diff, size_info, after)
+    del after
+
+  if 'describe' in stages:
+    timer.Run('describe', lambda: _ConsumeLines(
+        describe.GenerateLines(size_info)))
+
+  if 'canned_queries' in stages:
+    queries = canned_queries.CannedQueries([size_info])
+
+    def run_queries():
+      for name in ('CategorizeGenerated', 'CategorizeByChromeComponent',
+                   'TemplatesByName', 'StaticInitializers', 'LargeFiles',
+                   'PakByPath'):
+        _ConsumeLines(describe.GenerateLines(getattr(queries, name)()))
+
+    timer.Run('canned_queries', run_queries)
+
+  return timer.results
+
+
+def _FormatResults(results):
+  lines = ['%-20s %10s %14s' % ('Stage', 'Seconds', 'Peak RSS (MB)')]
+  for r in results:
+    lines.append('%-20s %10.3f %14d' %
+                 (r['stage'], r['seconds'], r['peak_rss_mb']))
+  return '\n'.join(lines)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--symbols',
+                      type=int,
+                      default=100000,
+                      help='Number of symbols to generate.')
+  parser.add_argument('--stages',
+                      default=','.join(_ALL_STAGES),
+                      help='Comma-separated subset of: %s' %
+                      ', '.join(_ALL_STAGES))
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--work-dir',
+                      help='Directory for generated files (kept afterwards). '
+                      'Defaults to a temporary directory.')
+  parser.add_argument('--json-output', help='Write results to this file.')
+  parser.add_argument('-v', '--verbose', action='store_true')
+  args = parser.parse_args()
+
+  logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                      format='%(levelname).1s %(relativeCreated)6d %(message)s')
+  stages = args.stages.split(',')
+  unknown_stages = set(stages) - set(_ALL_STAGES)
+  if unknown_stages:
+    parser.error('Unknown stages: ' + ', '.join(sorted(unknown_stages)))
+
+  work_dir = args.work_dir or tempfile.mkdtemp(prefix='supersize_benchmark')
+  os.makedirs(work_dir, exist_ok=True)
+  try:
+    results = RunBenchmarks(args.symbols, stages, work_dir, seed=args.seed)
+  finally:
+    if not args.work_dir:
+      shutil.rmtree(work_dir)
+
+  print(_FormatResults(results))
+  if args.json_output:
+    with open(args.json_output, 'w') as f:
+      json.dump({'symbols': args.symbols, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import tempfile
+import unittest
+
+import benchmark
+
+
+class BenchmarkTest(unittest.TestCase):
+
+  def testRunBenchmarks(self):
+    # Ensures that the benchmark harness does not bit-rot.
+    with tempfile.TemporaryDirectory() as work_dir:
+      results = benchmark.RunBenchmarks(500, benchmark._ALL_STAGES, work_dir)
+    stages = [r['stage'] for r in results]
+    self.assertEqual('generate', stages[0])
+    for stage in benchmark._ALL_STAGES:
+      self.assertIn(stage, stages)
+
+  def testSyntheticLinkerMap(self):
+    generator = benchmark._SyntheticGenerator(500, seed=1)
+    size_info = generator.CreateSizeInfo()
+    with tempfile.NamedTemporaryFile(suffix='.map') as map_file:
+      benchmark.WriteLinkerMap(size_info, map_file.name)
+      section_ranges, raw_symbols, _ = (
+          benchmark.linker_map_parser.ParseFile(map_file.name))
+    self.assertEqual(size_info.containers[0].section_sizes[
+        benchmark.models.SECTION_TEXT], section_ranges['.text'][1])
+    self.assertTrue(raw_symbols)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -158,12 +158,19 @@ def _CategorizeGenerated(symbols):
   return g.Finalize(symbols)
 
 
+def _SortedTotals(totals):
+  return sorted(totals.items(), key=lambda kv: (-abs(kv[1].pss), kv[0]))
+
+
 class CannedQueries:
   """A set of pre-written queries."""
 
   def __init__(self, size_infos):
     self._size_infos = size_infos
 
+  def _SizeInfoArg(self, arg):
+    return arg if arg is not None else self._size_infos[-1]
+
   def _SymbolsArg(self, arg, native_only=False, pak_only=False):
     arg = arg if arg is not None else self._size_infos[-1]
     if isinstance(arg, models.BaseSizeInfo):
@@ -206,3 +213,15 @@ class CannedQueries:
     """Groups .pak.* symbols by path."""
     symbols = self._SymbolsArg(symbols, pak_only=True)
     return symbols.WhereIsPak().Sorted().GroupedByPath().Sorted()
+
+  def ComponentSizes(self, size_info=None, container=None):
+    """Lists (component, Total) by PSS. Uses rollups from the .size file."""
+    totals = self._SizeInfoArg(size_info).rollups.ByComponent(
+        container_name=container)
+    return _SortedTotals(totals)
+
+  def DirectorySizes(self, size_info=None, depth=1, container=None):
+    """Lists (directory, Total) by PSS. Uses rollups from the .size file."""
+    totals = self._SizeInfoArg(size_info).rollups.ByPath(
+        depth=depth, container_name=container)
+    return _SortedTotals(totals)
@@ -93,6 +93,7 @@ class _Session:
         'SaveSizeInfo': self._SaveSizeInfo,
         'SaveDeltaSizeInfo': self._SaveDeltaSizeInfo,
         'ReadStringLiterals': self._ReadStringLiterals,
+        'NameStringLiterals': self._NameStringLiterals,
         'ReplaceWithRelocations': self._ReplaceWithRelocations,
         'Disassemble': self._DisassembleFunc,
         'ExpandRegex': match_util.ExpandRegexIdentifierPlaceholder,
@@ -104,6 +105,8 @@ class _Session:
     }
     self._output_directory_finder = output_directory_finder
     self._size_infos = size_infos
+    # ELF path -> StringLiteralReader, so that literals are read only once.
+    self._string_literal_readers = {}
 
     if len(size_infos) == 1:
       self._variables['size_info'] = size_infos[0]
@@ -111,7 +114,11 @@ class _Session:
       for i, size_info in enumerate(size_infos):
         self._variables['size_info%d' % (i + 1)] = size_info
 
-  def _ReadStringLiterals(self, thing=None, all_rodata=False, elf_path=None):
+  def _ReadStringLiterals(self,
+                          thing=None,
+                          all_rodata=False,
+                          elf_path=None,
+                          merge_strings=False):
     """Returns a list of (symbol, string value) for all string literal symbols.
 
     E.g.:
@@ -124,7 +131,41 @@ class _Session:
            string literal.
       elf_path: Path to the executable containing the symbol. Required only
           when auto-detection fails.
+      merge_strings: Also return the literals within "** merge strings"
+          symbols, e.g. for .size files created with --defer-string-literals.
     """
+    thing, elf_path, reader = self._StringLiteralSymbolsAndReader(
+        thing, elf_path)
+    if not reader:
+      return []
+    return string_extract.ReadStringLiterals(thing,
+                                             elf_path,
+                                             all_rodata=all_rodata,
+                                             reader=reader,
+                                             merge_strings=merge_strings)
+
+  def _NameStringLiterals(self, thing=None, elf_path=None):
+    """Names string literal symbols after their contents (in place).
+
+    Needed only for .size files created with --lazy-string-literal-names.
+
+    E.g.:
+      # Name the string literals of the largest .rodata symbols:
+      syms = size_info.symbols.WhereInSection("r").Sorted()[:100]
+      NameStringLiterals(syms)
+      Print(syms)
+    Args:
+      thing: Can be a Symbol, iterable of symbols, or SizeInfo.
+           Defaults to the current SizeInfo.
+      elf_path: Path to the executable containing the symbol. Required only
+          when auto-detection fails.
+    """
+    thing, elf_path, reader = self._StringLiteralSymbolsAndReader(
+        thing, elf_path)
+    if reader:
+      string_extract.NameStringLiterals(thing, elf_path, reader=reader)
+
+  def _StringLiteralSymbolsAndReader(self, thing, elf_path):
     if thing is None:
       thing = self._size_infos[-1]
     if isinstance(thing, models.SizeInfo):
@@ -135,14 +176,15 @@ class _Session:
     thing, thing_clone = itertools.tee(thing)
     first_sym = next(thing_clone, None)
     if not first_sym:
-      return []
+      return thing, None, None
     size_info = self._SizeInfoForSymbol(first_sym)
     container = first_sym.container
     elf_path = self._ElfPathForSymbol(size_info, container, elf_path)
-
-    return string_extract.ReadStringLiterals(thing,
-                                             elf_path,
-                                             all_rodata=all_rodata)
+    reader = self._string_literal_readers.get(elf_path)
+    if reader is None:
+      reader = string_extract.StringLiteralReader(elf_path)
+      self._string_literal_readers[elf_path] = reader
+    return thing, elf_path, reader
 
   def _DiffFunc(self, before=None, after=None, sort=True):
     """Diffs two SizeInfo objects. Returns a DeltaSizeInfo.
@@ -172,11 +172,16 @@ class Describer:
 
 
 class DescriberText(Describer):
-  def __init__(self, verbose=False, recursive=False, summarize=True):
+  def __init__(self,
+               verbose=False,
+               recursive=False,
+               summarize=True,
+               include_symbols=True):
     super().__init__()
     self.verbose = verbose
     self.recursive = recursive
     self.summarize = summarize
+    self.include_symbols = include_symbols
 
   def _DescribeSectionSizes(self,
                             unsummed_sections,
@@ -588,6 +593,10 @@ class DescriberText(Describer):
           self._DescribeSectionSizes(unsummed_sections, summed_sections,
                                      c.section_sizes))
 
+    if not self.include_symbols:
+      desc_list.append(self._DescribeRollups(size_info.rollups))
+      return itertools.chain.from_iterable(desc_list)
+
     if self.verbose:
       desc_list.append(('', ))
       desc_list.append(data_quality.DescribeSizeInfoCoverage(size_info))
@@ -595,6 +604,27 @@ class DescriberText(Describer):
     desc_list.append(self.GenerateLines(size_info.symbols))
     return itertools.chain.from_iterable(desc_list)
 
+  def _DescribeRollups(self, size_rollups, max_rows=10):
+    """Describes totals by section, component, and top-level directory.
+
+    Loads no symbols when the .size file has precomputed rollups.
+    """
+    def describe_totals(title, totals, limit=None):
+      yield ''
+      yield title
+      items = sorted(totals.items(), key=lambda kv: (-abs(kv[1].pss), kv[0]))
+      for name, total in items[:limit]:
+        yield '    {}: {} ({} bytes) in {} symbols'.format(
+            name or '(none)', _PrettySize(int(total.pss)), int(total.pss),
+            total.count)
+
+    return itertools.chain(
+        describe_totals('Sizes by Section:', size_rollups.BySection()),
+        describe_totals('Largest Components:', size_rollups.ByComponent(),
+                        max_rows),
+        describe_totals('Largest Directories:', size_rollups.ByPath(depth=1),
+                        max_rows))
+
 
 class DescriberCsv(Describer):
   def __init__(self, verbose=False):
@@ -742,10 +772,17 @@ def DescribeDict(input_dict):
 
 
 def GenerateLines(obj, verbose=False, recursive=False, summarize=True,
-                  format_name='text'):
-  """Returns an iterable of lines (without \n) that describes |obj|."""
+                  format_name='text', include_symbols=True):
+  """Returns an iterable of lines (without \n) that describes |obj|.
+
+  When |include_symbols| is False, a SizeInfo is described by its totals rather
+  than by listing its symbols (text format only).
+  """
   if format_name == 'text':
-    d = DescriberText(verbose=verbose, recursive=recursive, summarize=summarize)
+    d = DescriberText(verbose=verbose,
+                      recursive=recursive,
+                      summarize=summarize,
+                      include_symbols=include_symbols)
   elif format_name == 'csv':
     d = DescriberCsv(verbose=verbose)
   else:
@@ -58,57 +58,88 @@ def _Key4(s):
   return s.container_name, s.section, s.full_name
 
 
-def _MatchSymbols(before, after, key_func, padding_by_segment):
+# Keys are computed for (symbol, _Key1(symbol)) tuples, so that _Key1 is
+# computed only once per symbol, and _Key2 is derived from it. _Key3 and _Key4
+# are computed only for the few symbols left unmatched by the earlier passes:
+# computing all four keys up front makes diffs slower and uses more memory.
+def _CachedKey1(t):
+  return t[1]
+
+
+def _CachedKey2(t):
+  return t[1][:4]
+
+
+def _CachedKey3(t):
+  return _Key3(t[0])
+
+
+def _CachedKey4(t):
+  return _Key4(t[0])
+
+
+def _MatchSymbols(before, after, key_func, padding_by_segment, changes_only):
+  """Matches (symbol, key1) tuples of |before| and |after| by |key_func|."""
   logging.debug('%s: Building symbol index', key_func.__name__)
-  before_symbols_by_key = collections.defaultdict(list)
-  for s in before:
-    before_symbols_by_key[key_func(s)].append(s)
+  # Deques since buckets can be large (e.g. string literals of the same size).
+  before_symbols_by_key = collections.defaultdict(collections.deque)
+  for t in before:
+    before_symbols_by_key[key_func(t)].append(t)
 
   logging.debug('%s: Creating delta symbols', key_func.__name__)
   unmatched_after = []
   delta_symbols = []
-  for after_sym in after:
-    key = key_func(after_sym)
-    before_sym = key and before_symbols_by_key.get(key)
-    if before_sym:
-      before_sym = before_sym.pop(0)
+  num_matched = 0
+  for t in after:
+    key = key_func(t)
+    before_tuples = key and before_symbols_by_key.get(key)
+    if before_tuples:
+      num_matched += 1
+      before_sym = before_tuples.popleft()[0]
+      after_sym = t[0]
       # Padding tracked in aggregate, except for padding-only symbols.
       if before_sym.size_without_padding != 0:
         segment = (before_sym.container_name, before_sym.section_name)
         padding_by_segment[segment] += (after_sym.padding_pss -
                                         before_sym.padding_pss)
-      delta_symbols.append(models.DeltaSymbol(before_sym, after_sym))
+      delta_sym = models.DeltaSymbol(before_sym, after_sym)
+      if (not changes_only
+          or delta_sym.diff_status != models.DIFF_STATUS_UNCHANGED):
+        delta_symbols.append(delta_sym)
     else:
-      unmatched_after.append(after_sym)
+      unmatched_after.append(t)
 
   logging.debug('%s: Matched %d of %d symbols', key_func.__name__,
-                len(delta_symbols), len(after))
+                num_matched, len(after))
 
   unmatched_before = []
-  for syms in before_symbols_by_key.values():
-    unmatched_before.extend(syms)
+  for tuples in before_symbols_by_key.values():
+    unmatched_before.extend(tuples)
   return delta_symbols, unmatched_before, unmatched_after
 
 
-def _DiffSymbolGroups(containers, before, after):
+def _DiffSymbolGroups(containers, before, after, changes_only=False):
   # For changed symbols, padding is zeroed out. In order to not lose the
   # information entirely, store it in aggregate. These aggregations are grouped
   # by "segment names", which are (container name, section name) tuples.
   padding_by_segment = collections.defaultdict(float)
 
+  logging.debug('Computing symbol keys')
+  before = [(s, _Key1(s)) for s in before]
+  after = [(s, _Key1(s)) for s in after]
+
   # Usually >90% of symbols are exact matches, so all of the time is spent in
   # this first pass.
-  all_deltas, before, after = _MatchSymbols(before, after, _Key1,
-                                            padding_by_segment)
-  for key_func in (_Key2, _Key3, _Key4):
+  all_deltas = []
+  for key_func in (_CachedKey1, _CachedKey2, _CachedKey3, _CachedKey4):
     delta_syms, before, after = _MatchSymbols(before, after, key_func,
-                                              padding_by_segment)
+                                              padding_by_segment, changes_only)
     all_deltas.extend(delta_syms)
 
   logging.debug('Creating %d unmatched symbols', len(after) + len(before))
-  for after_sym in after:
+  for after_sym, _ in after:
     all_deltas.append(models.DeltaSymbol(None, after_sym))
-  for before_sym in before:
+  for before_sym, _ in before:
     all_deltas.append(models.DeltaSymbol(before_sym, None))
 
   container_from_name = {c.name: c for c in containers}
@@ -149,16 +180,31 @@ def _DiffContainerLists(before_containers, after_containers):
   return ret
 
 
-def Diff(before, after, sort=False):
+def _SubsetSymbols(size_info, subset_func):
+  if subset_func is None:
+    return size_info.raw_symbols
+  return subset_func(size_info.raw_symbols)
+
+
+def Diff(before, after, sort=False, subset_func=None):
   """Diffs two SizeInfo objects. Returns a DeltaSizeInfo.
 
   See docs/diffs.md for diffing algorithm.
+
+  Args:
+    before: SizeInfo for "before".
+    after: SizeInfo for "after".
+    sort: Whether to group and sort the resulting symbols.
+    subset_func: When set, only symbols in subset_func(raw_symbols) are diffed.
+        E.g.: lambda syms: syms.WhereInContainer('Foo'). All raw_symbols are
+        still loaded, but keys are computed only for the subset.
   """
   assert isinstance(before, models.SizeInfo)
   assert isinstance(after, models.SizeInfo)
   containers_diff = _DiffContainerLists(before.containers, after.containers)
-  symbol_diff = _DiffSymbolGroups(containers_diff, before.raw_symbols,
-                                  after.raw_symbols)
+  symbol_diff = _DiffSymbolGroups(containers_diff,
+                                  _SubsetSymbols(before, subset_func),
+                                  _SubsetSymbols(after, subset_func))
   ret = models.DeltaSizeInfo(before, after, containers_diff, symbol_diff)
 
   if sort:
@@ -173,3 +219,24 @@ def Diff(before, after, sort=False):
     ret.symbols = syms.Sorted()
   logging.debug('Diff complete')
   return ret
+
+
+def DiffChangedSymbols(before, after, subset_func=None):
+  """Diffs two SizeInfo objects, returning only symbols that changed.
+
+  Cheaper than Diff() when only a summary of changes is required, since no
+  DeltaSymbols are kept for unchanged symbols, and no clustering is done.
+
+  Args:
+    before: SizeInfo for "before".
+    after: SizeInfo for "after".
+    subset_func: When set, only symbols in subset_func(raw_symbols) are diffed.
+
+  Returns:
+    A DeltaSymbolGroup of added, removed, and changed symbols.
+  """
+  containers_diff = _DiffContainerLists(before.containers, after.containers)
+  return _DiffSymbolGroups(containers_diff,
+                           _SubsetSymbols(before, subset_func),
+                           _SubsetSymbols(after, subset_func),
+                           changes_only=True)
@@ -232,6 +232,35 @@ class DiffTest(unittest.TestCase):
     self.assertEqual((0, 1, 1), d.raw_symbols.CountsByDiffStatus()[1:])
     self.assertEqual(0, d.raw_symbols.size)
 
+  def testSubset(self):
+    container_a = models.Container('A', metadata={}, section_sizes={})
+    container_b = models.Container('B', metadata={}, section_sizes={})
+    containers = [container_a, container_b]
+    size_info1 = _CreateSizeInfo(containers=containers)
+    size_info2 = _CreateSizeInfo(containers=containers)
+    size_info2.raw_symbols[0].container = container_b
+    size_info2.raw_symbols[1].size += 11
+    d = diff.Diff(size_info1,
+                  size_info2,
+                  subset_func=lambda syms: syms.WhereInContainer('B'))
+    # Only the symbol that moved into container B is diffed.
+    self.assertEqual(1, len(d.raw_symbols))
+    self.assertEqual((0, 1, 0), d.raw_symbols.CountsByDiffStatus()[1:])
+
+  def testDiffChangedSymbols(self):
+    size_info1 = _CreateSizeInfo()
+    size_info2 = _CreateSizeInfo()
+    size_info1.raw_symbols -= [size_info1.raw_symbols[0]]
+    size_info2.raw_symbols[2].size += 11
+    size_info2.raw_symbols -= [size_info2.raw_symbols[-1]]
+    full_diff = diff.Diff(size_info1, size_info2)
+    changed = diff.DiffChangedSymbols(size_info1, size_info2)
+    self.assertEqual((0, 1, 1, 1), changed.CountsByDiffStatus())
+    self.assertEqual(full_diff.raw_symbols.CountsByDiffStatus()[1:],
+                     changed.CountsByDiffStatus()[1:])
+    self.assertEqual(full_diff.raw_symbols.size, changed.size)
+    self.assertEqual(full_diff.raw_symbols.pss, changed.pss)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -7,17 +7,20 @@
 See docs/file_format.md for a specification of the file formats.
 """
 
+import array
 import contextlib
 import gzip
 import io
 import itertools
 import json
 import logging
+import mmap
 import os
 import sys
 
 import models
 import parallel
+import rollups
 
 
 _COMMON_HEADER = b'# Created by //tools/binary_size\n'
@@ -25,6 +28,13 @@ _COMMON_HEADER = b'# Created by //tools/binary_size\n'
 # File format version for .size files.
 _SIZE_HEADER_SINGLE_CONTAINER = b'Size File Format v1\n'
 _SIZE_HEADER_MULTI_CONTAINER = b'Size File Format v1.1\n'
+# Uncompressed, memory-mappable format. See docs/file_format.md.
+_SIZE_HEADER_COLUMNAR = b'Size File Format v2\n'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# Columns start at offsets that are multiples of this.
+_COLUMN_ALIGNMENT = 8
 
 # Header for .sizediff files
 _SIZEDIFF_HEADER = b'DIFF\n'
@@ -629,6 +639,338 @@ def _LoadSizeInfoFromFile(file_obj, size_path):
                          size_path=size_path)
 
 
+def _AlignUp(value):
+  return -(-value // _COLUMN_ALIGNMENT) * _COLUMN_ALIGNMENT
+
+
+class _ColumnWriter:
+  """Lays out typed arrays and string tables for a columnar .size file.
+
+  Columns are stored little-endian, each starting at an aligned offset relative
+  to the start of the data section.
+  """
+
+  def __init__(self):
+    self._chunks = []
+    self._size = 0
+    self.layout = {}
+
+  def _AddBytes(self, name, typecode, count, data):
+    padding = _AlignUp(self._size) - self._size
+    if padding:
+      self._chunks.append(b'\0' * padding)
+      self._size += padding
+    self.layout[name] = [self._size, count, typecode]
+    self._chunks.append(data)
+    self._size += len(data)
+
+  def AddColumn(self, name, values):
+    """Adds an array.array as a column."""
+    if sys.byteorder != 'little':
+      values = array.array(values.typecode, values)
+      values.byteswap()
+    self._AddBytes(name, values.typecode, len(values), values.tobytes())
+
+  def AddStringTable(self, name, strings):
+    """Adds |strings| as a blob of UTF-8 data plus a column of offsets.
+
+    Each string is followed by a '\n' so that tables without embedded newlines
+    can be decoded with a single split().
+    """
+    encoded = [s.encode('utf-8') + b'\n' for s in strings]
+    offsets = array.array('Q', [0])
+    offsets.extend(itertools.accumulate(len(e) for e in encoded))
+    self.AddColumn(name + '.offsets', offsets)
+    self._AddBytes(name + '.data', 'B', offsets[-1], b''.join(encoded))
+    self.layout[name + '.data'].append(not any('\n' in s for s in strings))
+
+  def WriteTo(self, file_obj):
+    for chunk in self._chunks:
+      file_obj.write(chunk)
+
+
+class _StringTable:
+  """Read-only view of a string table, decoding entries as they are accessed."""
+
+  def __init__(self, offsets, data, splittable):
+    self._offsets = offsets
+    self._data = data
+    self._splittable = splittable
+    self._cache = [None] * (len(offsets) - 1)
+
+  def __len__(self):
+    return len(self._cache)
+
+  def __getitem__(self, idx):
+    ret = self._cache[idx]
+    if ret is None:
+      ret = str(self._data[self._offsets[idx]:self._offsets[idx + 1] - 1],
+                'utf-8')
+      self._cache[idx] = ret
+    return ret
+
+  def AsList(self):
+    """Returns all strings, decoding any that have not yet been decoded."""
+    if self._splittable and None in self._cache:
+      self._cache = str(self._data, 'utf-8').split('\n')[:-1]
+    return [self[i] for i in range(len(self))]
+
+
+class _ColumnReader:
+  """Provides zero-copy access to the columns of a columnar .size file."""
+
+  def __init__(self, buf, data_start, layout):
+    # Keep a reference to |buf| since memoryviews of an mmap must not outlive
+    # it.
+    self._buf = buf
+    self._data = memoryview(buf)[data_start:]
+    self._layout = layout
+
+  def Column(self, name):
+    offset, count, typecode = self._layout[name][:3]
+    itemsize = array.array(typecode).itemsize
+    view = self._data[offset:offset + count * itemsize]
+    if sys.byteorder == 'little':
+      return view.cast(typecode)
+    ret = array.array(typecode, view.tobytes())
+    ret.byteswap()
+    return ret
+
+  def StringTable(self, name):
+    splittable = self._layout[name + '.data'][3]
+    return _StringTable(self.Column(name + '.offsets'),
+                        self.Column(name + '.data'), splittable)
+
+
+def _SaveSizeInfoToColumnarFile(size_info,
+                                file_obj,
+                                sparse_symbols=None,
+                                include_rollups=False):
+  """Saves size info to a columnar .size file.
+
+  See docs/file_format.md for a description of the format.
+
+  Args:
+    size_info: Data to write to the file
+    file_obj: File opened for writing.
+    sparse_symbols: If present, only save these symbols to the file.
+    include_rollups: Whether to store precomputed totals in the header.
+  """
+  if sparse_symbols is not None:
+    raw_symbols = _ExpandSparseSymbols(sparse_symbols)
+  else:
+    raw_symbols = size_info.raw_symbols
+
+  assert len(set(c.name for c in size_info.containers)) == len(
+      size_info.containers), 'Container names must be distinct.'
+  container_indices = {c.name: i for i, c in enumerate(size_info.containers)}
+
+  # Keep symbols of each (container, section) together, as is done for the
+  # text format.
+  symbols = list(
+      itertools.chain.from_iterable(
+          raw_symbols.GroupedByContainerAndSectionName()))
+
+  section_names = []
+  section_indices = {}
+  string_tables = {
+      'full_names': {},
+      'object_paths': {},
+      'source_paths': {},
+      'components': {},
+  }
+
+  def intern(table_name, value):
+    table = string_tables[table_name]
+    ret = table.get(value)
+    if ret is None:
+      ret = len(table)
+      table[value] = ret
+    return ret
+
+  container_col = array.array('H')
+  section_col = array.array('B')
+  address_col = array.array('Q')
+  size_col = array.array('q')
+  padding_col = array.array('q')
+  flags_col = array.array('I')
+  num_aliases_col = array.array('I')
+  full_name_col = array.array('I')
+  object_path_col = array.array('I')
+  source_path_col = array.array('I')
+  component_col = array.array('I')
+  disassembly_indices = array.array('Q')
+  disassembly = []
+
+  for i, sym in enumerate(symbols):
+    section_idx = section_indices.get(sym.section_name)
+    if section_idx is None:
+      section_idx = len(section_names)
+      section_indices[sym.section_name] = section_idx
+      section_names.append(sym.section_name)
+    container_col.append(container_indices[sym.container.name])
+    section_col.append(section_idx)
+    address_col.append(sym.address)
+    size_col.append(sym.size)
+    padding_col.append(sym.padding)
+    flags_col.append(sym.flags)
+    num_aliases_col.append(sym.num_aliases)
+    full_name_col.append(intern('full_names', sym.full_name))
+    object_path_col.append(intern('object_paths', sym.object_path))
+    source_path_col.append(intern('source_paths', sym.source_path))
+    component_col.append(intern('components', sym.component))
+    if sym.disassembly:
+      disassembly_indices.append(i)
+      disassembly.append(sym.disassembly)
+
+  w = _ColumnWriter()
+  w.AddColumn('container', container_col)
+  w.AddColumn('section', section_col)
+  w.AddColumn('address', address_col)
+  w.AddColumn('size', size_col)
+  w.AddColumn('padding', padding_col)
+  w.AddColumn('flags', flags_col)
+  w.AddColumn('num_aliases', num_aliases_col)
+  w.AddColumn('full_name', full_name_col)
+  w.AddColumn('object_path', object_path_col)
+  w.AddColumn('source_path', source_path_col)
+  w.AddColumn('component', component_col)
+  for name, table in string_tables.items():
+    w.AddStringTable(name, list(table))
+  w.AddColumn('disassembly_indices', disassembly_indices)
+  w.AddStringTable('disassembly', disassembly)
+
+  fields = {
+      'build_config': size_info.build_config,
+      'containers': [{
+          'name': c.name,
+          'metadata': c.metadata,
+          'section_sizes': c.section_sizes,
+      } for c in size_info.containers],
+      'section_names': section_names,
+      'num_symbols': len(symbols),
+      'layout': w.layout,
+  }
+  if include_rollups:
+    fields['rollups'] = rollups.Rollups.Compute(symbols).ToJson()
+  fields_bytes = json.dumps(fields, indent=2, sort_keys=True).encode('ascii')
+
+  header = b'%s%s%d\n%s\n' % (_COMMON_HEADER, _SIZE_HEADER_COLUMNAR,
+                               len(fields_bytes), fields_bytes)
+  file_obj.write(header)
+  file_obj.write(b'\0' * (_AlignUp(len(header)) - len(header)))
+  w.WriteTo(file_obj)
+
+
+def _MaterializeSymbols(reader, containers, section_names, num_symbols):
+  """Creates the list of Symbols described by the columns of |reader|."""
+  logging.debug('Materializing %d symbols from columns', num_symbols)
+  full_names = reader.StringTable('full_names').AsList()
+  object_paths = reader.StringTable('object_paths').AsList()
+  source_paths = reader.StringTable('source_paths').AsList()
+  components = reader.StringTable('components').AsList()
+
+  raw_symbols = [None] * num_symbols
+  aliases = None
+  alias_counter = 0
+  for i, (container_idx, section_idx, address, size, padding, flags,
+          num_aliases, full_name_idx, object_path_idx, source_path_idx,
+          component_idx) in enumerate(
+              zip(reader.Column('container'), reader.Column('section'),
+                  reader.Column('address'), reader.Column('size'),
+                  reader.Column('padding'), reader.Column('flags'),
+                  reader.Column('num_aliases'), reader.Column('full_name'),
+                  reader.Column('object_path'), reader.Column('source_path'),
+                  reader.Column('component'))):
+    # Skip the constructor to avoid default value checks.
+    new_sym = models.Symbol.__new__(models.Symbol)
+    new_sym.container = containers[container_idx]
+    new_sym.section_name = section_names[section_idx]
+    new_sym.full_name = full_names[full_name_idx]
+    new_sym.address = address
+    new_sym.size = size
+    new_sym.padding = padding
+    new_sym.object_path = object_paths[object_path_idx]
+    new_sym.source_path = source_paths[source_path_idx]
+    new_sym.component = components[component_idx]
+    new_sym.flags = flags
+    new_sym.disassembly = ''
+    new_sym.template_name = ''
+    new_sym.name = ''
+
+    if alias_counter > 0:
+      aliases.append(new_sym)
+      alias_counter -= 1
+    elif num_aliases > 1:
+      aliases = []
+      aliases.append(new_sym)
+      alias_counter = num_aliases - 1
+    else:
+      aliases = None
+    new_sym.aliases = aliases
+    raw_symbols[i] = new_sym
+
+  disassembly = reader.StringTable('disassembly')
+  for i, idx in enumerate(reader.Column('disassembly_indices')):
+    raw_symbols[idx].disassembly = disassembly[i]
+  logging.debug('Done materializing symbols')
+  return raw_symbols
+
+
+def _LoadSizeInfoFromColumnarFile(file_obj, size_path):
+  """Loads a size_info from a columnar .size file.
+
+  The file is memory-mapped when possible, and symbols are created only once
+  SizeInfo.raw_symbols is accessed.
+
+  Args:
+    file_obj: File opened for reading, positioned at the start of the data.
+  """
+  buf = None
+  if file_obj.tell() == 0:
+    try:
+      buf = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, io.UnsupportedOperation, ValueError):
+      pass  # Not a real file (e.g. BytesIO), or an empty one.
+  if buf is None:
+    buf = file_obj.read()
+
+  expected_header = _COMMON_HEADER + _SIZE_HEADER_COLUMNAR
+  if buf[:len(expected_header)] != expected_header:
+    raise ValueError('Version mismatch. Need to write some upgrade code.')
+  json_start = buf.find(b'\n', len(expected_header)) + 1
+  json_len = int(buf[len(expected_header):json_start])
+  fields = json.loads(buf[json_start:json_start + json_len])
+  data_start = _AlignUp(json_start + json_len + 1)
+
+  containers = [
+      models.Container(name=cfield['name'],
+                       metadata=cfield['metadata'],
+                       section_sizes=cfield['section_sizes'])
+      for cfield in fields['containers']
+  ]
+  models.BaseContainer.AssignShortNames(containers)
+
+  reader = _ColumnReader(buf, data_start, fields['layout'])
+  section_names = fields['section_names']
+  num_symbols = fields['num_symbols']
+  if num_symbols == 0:
+    logging.warning('File contains no symbols: %s', size_path)
+
+  def load_raw_symbols():
+    return _MaterializeSymbols(reader, containers, section_names, num_symbols)
+
+  stored_rollups = None
+  if 'rollups' in fields:
+    stored_rollups = rollups.Rollups.FromJson(fields['rollups'])
+
+  return models.SizeInfo(fields['build_config'],
+                         containers,
+                         load_raw_symbols,
+                         size_path=size_path,
+                         precomputed_rollups=stored_rollups)
+
+
 @contextlib.contextmanager
 def _OpenGzipForWrite(path, file_obj=None):
   # Open in a way that doesn't set any gzip header fields.
@@ -645,9 +987,30 @@ def SaveSizeInfo(size_info,
                  path,
                  file_obj=None,
                  include_padding=False,
-                 sparse_symbols=None):
-  """Saves |size_info| to |path|."""
-  if os.environ.get('SUPERSIZE_MEASURE_GZIP') == '1':
+                 sparse_symbols=None,
+                 columnar=False,
+                 include_rollups=False):
+  """Saves |size_info| to |path|.
+
+  When |columnar| is True, writes the uncompressed columnar format, which
+  always includes padding. Only the columnar format supports
+  |include_rollups|, which stores totals that SizeInfo.rollups can then answer
+  queries from without loading symbols.
+  """
+  assert columnar or not include_rollups, 'Rollups require columnar=True.'
+  if columnar:
+    if file_obj:
+      _SaveSizeInfoToColumnarFile(size_info,
+                                  file_obj,
+                                  sparse_symbols=sparse_symbols,
+                                  include_rollups=include_rollups)
+    else:
+      with open(path, 'wb') as f:
+        _SaveSizeInfoToColumnarFile(size_info,
+                                    f,
+                                    sparse_symbols=sparse_symbols,
+                                    include_rollups=include_rollups)
+  elif os.environ.get('SUPERSIZE_MEASURE_GZIP') == '1':
     # Doing serialization and Gzip together.
     with _OpenGzipForWrite(path, file_obj=file_obj) as f:
       _SaveSizeInfoToFile(size_info,
@@ -669,7 +1032,19 @@ def SaveSizeInfo(size_info,
 
 
 def LoadSizeInfo(filename, file_obj=None):
-  """Returns a SizeInfo loaded from |filename|."""
+  """Returns a SizeInfo loaded from |filename|.
+
+  Supports both gzipped and columnar .size files.
+  """
+  if not file_obj:
+    with open(filename, 'rb') as f:
+      return LoadSizeInfo(filename, f)
+
+  pos = file_obj.tell()
+  is_gzipped = file_obj.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+  file_obj.seek(pos)
+  if not is_gzipped:
+    return _LoadSizeInfoFromColumnarFile(file_obj, filename)
   with gzip.GzipFile(filename=filename, fileobj=file_obj) as f:
     return _LoadSizeInfoFromFile(f, filename)
 
@@ -17,12 +17,14 @@ import tempfile
 import zipfile
 
 import archive
+import canned_queries
 import data_quality
 import describe
 import diff
 import file_format
 import models
 import pakfile
+import string_extract
 import test_util
 import zip_util
 
@@ -321,7 +323,11 @@ class IntegrationTest(unittest.TestCase):
                  use_aux_elf=None,
                  ignore_linker_map=False,
                  debug_measures=False,
-                 include_padding=False):
+                 include_padding=False,
+                 columnar=False,
+                 analysis_cache_dir=None,
+                 lazy_string_literal_names=False,
+                 defer_string_literals=False):
     args = [
         archive_path,
         '--source-directory',
@@ -362,6 +368,14 @@ class IntegrationTest(unittest.TestCase):
       args += ['--aux-elf-file', _TEST_ELF_PATH]
     if include_padding:
       args += ['--include-padding']
+    if columnar:
+      args += ['--columnar']
+    if analysis_cache_dir:
+      args += ['--analysis-cache-dir', analysis_cache_dir]
+    if lazy_string_literal_names:
+      args += ['--lazy-string-literal-names']
+    if defer_string_literals:
+      args += ['--defer-string-literals']
 
     _RunApp('archive', args, debug_measures=debug_measures)
 
@@ -376,7 +390,9 @@ class IntegrationTest(unittest.TestCase):
                      use_aux_elf=False,
                      ignore_linker_map=False,
                      debug_measures=False,
-                     include_padding=False):
+                     include_padding=False,
+                     columnar=False,
+                     analysis_cache_dir=None):
     with tempfile.NamedTemporaryFile(suffix='.size') as temp_file:
       self._DoArchive(temp_file.name,
                       use_output_directory=use_output_directory,
@@ -388,7 +404,9 @@ class IntegrationTest(unittest.TestCase):
                       use_aux_elf=use_aux_elf,
                       ignore_linker_map=ignore_linker_map,
                       debug_measures=debug_measures,
-                      include_padding=include_padding)
+                      include_padding=include_padding,
+                      columnar=columnar,
+                      analysis_cache_dir=analysis_cache_dir)
       size_info = archive.LoadAndPostProcessSizeInfo(temp_file.name)
     # Check that saving & loading is the same as directly parsing.
     expected_size_info = self._CloneSizeInfo(
@@ -456,6 +474,144 @@ class IntegrationTest(unittest.TestCase):
                                use_aux_elf=True,
                                include_padding=True)
 
+  @_CompareWithGolden(name='Archive_Apk')
+  def test_Archive_Columnar(self):
+    return self._DoArchiveTest(use_apk=True, use_aux_elf=True, columnar=True)
+
+  @_CompareWithGolden(name='Archive_Elf')
+  def test_Archive_AnalysisCache(self):
+    with tempfile.TemporaryDirectory() as cache_dir:
+      # Populate the cache, then check that a run using it is the same.
+      self._DoArchiveTest(use_elf=True, analysis_cache_dir=cache_dir)
+      self.assertTrue(os.listdir(cache_dir))
+      return self._DoArchiveTest(use_elf=True, analysis_cache_dir=cache_dir)
+
+  def test_Archive_LazyStringLiteralNames(self):
+    def string_literals(size_info):
+      return sorted((s.address, s.full_name, s.name)
+                    for s in size_info.raw_symbols if s.IsStringLiteral())
+
+    with tempfile.NamedTemporaryFile(suffix='.size') as temp_file:
+      self._DoArchive(temp_file.name, use_elf=True)
+      eager_info = archive.LoadAndPostProcessSizeInfo(temp_file.name)
+      self._DoArchive(temp_file.name,
+                      use_elf=True,
+                      lazy_string_literal_names=True)
+      lazy_info = archive.LoadAndPostProcessSizeInfo(temp_file.name)
+
+    expected = string_literals(eager_info)
+    self.assertTrue(any(t[1] != models.STRING_LITERAL_NAME for t in expected))
+    self.assertTrue(
+        all(t[1] == models.STRING_LITERAL_NAME
+            for t in string_literals(lazy_info)))
+    # Literals are attributed to object files even when not named.
+    self.assertEqual([s.object_path for s in eager_info.raw_symbols],
+                     [s.object_path for s in lazy_info.raw_symbols])
+    rodata = lazy_info.raw_symbols.WhereInSection('r')
+    self.assertEqual(0, len(rodata.WhereFullNameMatches('^"')))
+    with test_util.AddMocksToPath():
+      string_extract.NameStringLiterals(lazy_info.raw_symbols, _TEST_ELF_PATH)
+    self.assertEqual(expected, string_literals(lazy_info))
+    # Groups queried before naming see the new names.
+    self.assertEqual(sum(1 for t in expected if t[1].startswith('"')),
+                     len(rodata.WhereFullNameMatches('^"')))
+
+  def test_Archive_DeferStringLiterals(self):
+    with tempfile.NamedTemporaryFile(suffix='.size') as temp_file:
+      self._DoArchive(temp_file.name, use_elf=True)
+      eager_info = archive.LoadAndPostProcessSizeInfo(temp_file.name)
+      self._DoArchive(temp_file.name, use_elf=True, defer_string_literals=True)
+      deferred_info = archive.LoadAndPostProcessSizeInfo(temp_file.name)
+
+    self.assertFalse(
+        any(s.IsStringLiteral() for s in deferred_info.raw_symbols))
+    with test_util.AddMocksToPath():
+      expected = [
+          data for _, data in string_extract.ReadStringLiterals(
+              eager_info.raw_symbols, _TEST_ELF_PATH)
+      ]
+      actual = [
+          data for _, data in string_extract.ReadStringLiterals(
+              deferred_info.raw_symbols, _TEST_ELF_PATH, merge_strings=True)
+      ]
+    self.assertTrue(expected)
+    # Literals broken out of ** merge strings are read on demand instead.
+    for data in expected:
+      self.assertTrue(any(d.endswith(data) for d in actual), data)
+
+  def test_SaveSizeInfo_Columnar(self):
+    orig_info = self._CloneSizeInfo(use_minimal_apks=True, use_aux_elf=True)
+    orig_info.raw_symbols[0].disassembly = 'line 1\nline 2'
+    bytesio = io.BytesIO()
+    file_format.SaveSizeInfo(orig_info, 'path', file_obj=bytesio, columnar=True)
+    bytesio.seek(0)
+    new_info = archive.LoadAndPostProcessSizeInfo('path', file_obj=bytesio)
+
+    # Symbols are created on first access.
+    self.assertFalse(new_info.HasLoadedRawSymbols())
+    self.assertEqual(_AllMetadata(orig_info), _AllMetadata(new_info))
+    self.assertFalse(new_info.HasLoadedRawSymbols())
+    self.assertEqual([repr(s) for s in orig_info.raw_symbols],
+                     [repr(s) for s in new_info.raw_symbols])
+    self.assertEqual(orig_info.raw_symbols[0].disassembly,
+                     new_info.raw_symbols[0].disassembly)
+    self.assertEqual(list(describe.GenerateLines(orig_info, verbose=True)),
+                     list(describe.GenerateLines(new_info, verbose=True)))
+
+  def test_SaveSizeInfo_ColumnarRollups(self):
+    orig_info = self._CloneSizeInfo(use_minimal_apks=True, use_aux_elf=True)
+    bytesio = io.BytesIO()
+    file_format.SaveSizeInfo(orig_info,
+                             'path',
+                             file_obj=bytesio,
+                             columnar=True,
+                             include_rollups=True)
+    bytesio.seek(0)
+    new_info = archive.LoadAndPostProcessSizeInfo('path', file_obj=bytesio)
+
+    # Totals are available without creating symbols.
+    new_rollups = new_info.rollups
+    self.assertFalse(new_info.HasLoadedRawSymbols())
+    orig_rollups = orig_info.rollups
+    self.assertEqual(orig_rollups.ByContainerAndSection(),
+                     new_rollups.ByContainerAndSection())
+    self.assertEqual(orig_rollups.ByComponent(), new_rollups.ByComponent())
+    self.assertEqual(orig_rollups.ByPath(depth=2), new_rollups.ByPath(depth=2))
+    section_totals = new_rollups.BySection()
+    text_symbols = orig_info.raw_symbols.WhereInSection('t')
+    self.assertEqual(len(text_symbols),
+                     section_totals[models.SECTION_TEXT].count)
+    self.assertAlmostEqual(text_symbols.pss,
+                           section_totals[models.SECTION_TEXT].pss)
+
+    # Summaries are answered from the rollups, also without creating symbols.
+    queries = canned_queries.CannedQueries([new_info])
+    self.assertEqual(
+        canned_queries.CannedQueries([orig_info]).ComponentSizes(),
+        queries.ComponentSizes())
+    self.assertEqual(
+        canned_queries.CannedQueries([orig_info]).DirectorySizes(depth=2),
+        queries.DirectorySizes(depth=2))
+    summary = list(describe.GenerateLines(new_info, include_symbols=False))
+    self.assertIn('Sizes by Section:', summary)
+    self.assertIn('Largest Directories:', summary)
+    self.assertEqual(
+        list(describe.GenerateLines(orig_info, include_symbols=False)),
+        summary)
+    self.assertFalse(new_info.HasLoadedRawSymbols())
+
+  def test_SaveSizeInfo_ColumnarSparse(self):
+    orig_info = self._CloneSizeInfo(use_elf=True)
+    sparse_symbols = orig_info.raw_symbols.WhereNameMatches('Patcher|gap')
+    with tempfile.NamedTemporaryFile(suffix='.size') as size_file:
+      file_format.SaveSizeInfo(orig_info,
+                               size_file.name,
+                               sparse_symbols=sparse_symbols,
+                               columnar=True)
+      new_info = archive.LoadAndPostProcessSizeInfo(size_file.name)
+    self.assertEqual([repr(s) for s in sparse_symbols],
+                     [repr(s) for s in new_info.raw_symbols])
+
   def test_SaveDeltaSizeInfo(self):
     # Check that saving & loading is the same as directly parsing.
     orig_info1 = self._CloneSizeInfo(use_apk=True, use_aux_elf=True)
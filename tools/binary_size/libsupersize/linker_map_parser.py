@@ -21,6 +21,8 @@ import collections
 import gzip
 import itertools
 import logging
+import mmap
+import multiprocessing
 import os
 import re
 import readline
@@ -28,6 +30,7 @@ import sys
 
 import demangle
 import models
+import parallel
 
 # About linker maps:
 # * "Discarded input sections" include symbols merged with other symbols
@@ -36,6 +39,11 @@ import models
 #   whereas "nm" skips over these (they don't account for much though).
 # * The parse time for compressed linker maps is dominated by ungzipping.
 
+# Uncompressed lld maps at least this large are parsed in parallel, by splitting
+# them into chunks at section and input section boundaries.
+_MIN_PARALLEL_PARSE_SIZE = 64 * 1024 * 1024
+_MIN_CHUNK_SIZE = 4 * 1024 * 1024
+
 _STRIP_NAME_PREFIX = {
     models.FLAG_STARTUP: 8,
     models.FLAG_UNLIKELY: 9,
@@ -333,6 +341,22 @@ class MapFileParserGold:
         raise
 
 
+def _IsUsefulSection(section):
+  return bool(section) and (section in models.BSS_SECTIONS
+                            or section in (models.SECTION_RODATA,
+                                           models.SECTION_TEXT)
+                            or section.startswith(models.SECTION_DATA))
+
+
+def _LogLldStats(stats):
+  promoted_name_count, jump_tables_count, jump_entries_count = stats
+  if promoted_name_count:
+    logging.info('Found %d promoted global names', promoted_name_count)
+  if jump_tables_count:
+    logging.info('Found %d CFI jump tables with %d total entries',
+                 jump_tables_count, jump_entries_count)
+
+
 class MapFileParserLld:
   """Parses a linker map file from LLD."""
   # Map file writer for LLD linker (for ELF):
@@ -435,7 +459,26 @@ class MapFileParserLld:
       identify file type.
 
     Returns:
-      A tuple of (section_ranges, symbols).
+      A tuple of (section_ranges, symbols, extras).
+    """
+    syms, thin_map, stats = self.ParseChunk(lines)
+    _LogLldStats(stats)
+    return self._section_ranges, syms, {'thin_map': thin_map}
+
+  def ParseChunk(self, lines, cur_section=None, in_partitions=False):
+    """Parses a range of lines from a linker map file.
+
+    Chunks must start at a Level 1 or Level 2 line (or at the start of the
+    map). Section ranges are added to |self._section_ranges|.
+
+    Args:
+      lines: Iterable of lines.
+      cur_section: The section that the chunk starts in, when it starts with a
+          Level 2 line.
+      in_partitions: Whether the chunk starts within feature partitions.
+
+    Returns:
+      A tuple of (symbols, thin_map, stats).
     """
     # Newest format:
     #     VMA      LMA     Size Align Out     In      Symbol
@@ -469,8 +512,12 @@ class MapFileParserLld:
     # 00000000002010ed 0000000000000071     1         a.o:(.text)
     # 00000000002010ed 0000000000000071     0             main
     syms = []
-    cur_section = None
-    cur_section_is_useful = False
+    cur_section_is_useful = _IsUsefulSection(cur_section)
+    if cur_section:
+      # E.g., Want to convert "(.text._name)" -> "_name" later.
+      mangled_start_idx = len(cur_section) + 2
+    # Set by Level 2 lines, but used by CFI jump tables without being updated.
+    cur_flags = 0
     promoted_name_count = 0
     # |is_partial| indicates that an eligible Level 3 line should be used to
     # update |syms[-1].full_name| instead of creating a new symbol.
@@ -493,7 +540,6 @@ class MapFileParserLld:
 
     tokenizer = self.Tokenize(lines)
 
-    in_partitions = False
     in_jump_table = False
     jump_tables_count = 0
     jump_entries_count = 0
@@ -524,10 +570,7 @@ class MapFileParserLld:
           cur_section = tok
           # E.g., Want to convert "(.text._name)" -> "_name" later.
           mangled_start_idx = len(cur_section) + 2
-          cur_section_is_useful = (
-              cur_section in models.BSS_SECTIONS
-              or cur_section in (models.SECTION_RODATA, models.SECTION_TEXT)
-              or cur_section.startswith(models.SECTION_DATA))
+          cur_section_is_useful = _IsUsefulSection(cur_section)
 
       elif cur_section_is_useful:
         # Level 2 data match the "In" column. They specify object paths and
@@ -659,12 +702,8 @@ class MapFileParserLld:
         else:
           logging.error('Problem line: %r', line)
 
-    if promoted_name_count:
-      logging.info('Found %d promoted global names', promoted_name_count)
-    if jump_tables_count:
-      logging.info('Found %d CFI jump tables with %d total entries',
-                   jump_tables_count, jump_entries_count)
-    return self._section_ranges, syms, {'thin_map': thin_map}
+    stats = (promoted_name_count, jump_tables_count, jump_entries_count)
+    return syms, thin_map, stats
 
 
 def _DetectLto(lines):
@@ -723,6 +762,14 @@ def _DetectLinkerName(lines):
   raise Exception('Invalid map file: ' + first_line)
 
 
+def _NormalizeObjectPaths(syms):
+  for sym in syms:
+    if sym.object_path and not sym.object_path.endswith(')'):
+      # Don't want '' to become '.'.
+      # Thin archives' paths will get fixed in |ar.CreateThinObjectPath|.
+      sym.object_path = os.path.normpath(sym.object_path)
+
+
 def ParseLines(lines):
   """Parses a linker map file given an iterable of its lines.
 
@@ -743,20 +790,175 @@ def ParseLines(lines):
 
   next(lines)  # Consume the first line of headers.
   section_ranges, syms, extras = inner_parser.Parse(lines)
-  for sym in syms:
-    if sym.object_path and not sym.object_path.endswith(')'):
-      # Don't want '' to become '.'.
-      # Thin archives' paths will get fixed in |ar.CreateThinObjectPath|.
-      sym.object_path = os.path.normpath(sym.object_path)
+  _NormalizeObjectPaths(syms)
   return section_ranges, syms, extras
 
 
-def ParseFile(path):
+def _FindLldChunks(data, linker_name, chunk_size):
+  """Splits an lld map into ranges that can be parsed independently.
+
+  Chunks start at Level 1 lines (sections) or, to split up large sections,
+  at Level 2 lines (input sections). Only the lines at chunk boundaries are
+  tokenized.
+
+  Args:
+    data: Contents of the map file (e.g. an mmap).
+    linker_name: Coded linker name.
+    chunk_size: Approximate number of bytes per chunk.
+
+  Returns:
+    A list of (start, end, cur_section, in_partitions) tuples. See
+    MapFileParserLld.ParseChunk() for the meaning of the last two.
+  """
+  map_file_version = int(linker_name.split('_v')[1])
+  pattern = MapFileParserLld._LINE_RE[map_file_version]
+
+  def tokenize_line_at(pos):
+    end = data.find(b'\n', pos)
+    if end == -1:
+      end = len(data)
+    line = data[pos:end].decode('utf-8', errors='replace')
+    m = pattern.match(line)
+    if not m:
+      return None, None, end + 1
+    return (len(m.group(4)) // 8) + 1, m.group(5), end + 1
+
+  # Skip the header line, and find the column that Level 1 tokens start at.
+  header_end = data.find(b'\n') + 1
+  level, _, _ = tokenize_line_at(header_end)
+  if level != 1:
+    return [(header_end, len(data), None, False)]
+  first_line = data[header_end:data.find(b'\n', header_end)].decode('utf-8')
+  tok_col = pattern.match(first_line).start(4)
+
+  # Find all Level 1 lines. Their number is small, even for huge maps.
+  level1_regex = re.compile(rb'^[^\n]{%d}[^ \n]' % tok_col, re.MULTILINE)
+  level2_regex = re.compile(rb'^[^\n]{%d} {8}[^ \n]' % tok_col, re.MULTILINE)
+  section_starts = []
+  for m in level1_regex.finditer(data, header_end):
+    level, tok, _ = tokenize_line_at(m.start())
+    if level == 1:
+      section_starts.append((m.start(), tok))
+  section_starts.append((len(data), None))
+
+  ret = []
+  chunk_start = header_end
+  chunk_state = (None, False)
+  in_partitions = False
+  for (section_start, tok), (section_end, _) in zip(section_starts,
+                                                    section_starts[1:]):
+    if section_start - chunk_start >= chunk_size:
+      ret.append((chunk_start, section_start) + chunk_state)
+      chunk_start = section_start
+      chunk_state = (None, in_partitions)
+    # Mirrors MapFileParserLld.ParseChunk().
+    if tok.endswith('_partition'):
+      in_partitions = True
+    elif tok == '.part.end':
+      in_partitions = False
+    cur_section = None if in_partitions else tok
+
+    # Split up large sections at Level 2 lines.
+    pos = max(chunk_start + chunk_size, section_start)
+    while pos < section_end - chunk_size:
+      m = level2_regex.search(data, pos, section_end)
+      if not m:
+        break
+      level, level2_tok, pos = tokenize_line_at(m.start())
+      # CFI jump tables depend on state from the preceding input section.
+      if level == 2 and '.L.cfi.jumptable' not in level2_tok:
+        ret.append((chunk_start, m.start()) + chunk_state)
+        chunk_start = m.start()
+        chunk_state = (cur_section, in_partitions)
+        pos = chunk_start + chunk_size
+  ret.append((chunk_start, len(data)) + chunk_state)
+  return ret
+
+
+# This is a target for BulkForkAndCall().
+def _ParseLldChunk(chunk_idx, start, end, cur_section, in_partitions, *, path,
+                   linker_name):
+  with open(path, 'rb') as f:
+    f.seek(start)
+    lines = f.read(end - start).decode('utf-8').splitlines()
+  parser = MapFileParserLld(linker_name)
+  syms, thin_map, stats = parser.ParseChunk(lines,
+                                            cur_section=cur_section,
+                                            in_partitions=in_partitions)
+  _NormalizeObjectPaths(syms)
+  # Pickling Symbol objects is several times slower than pickling tuples.
+  sym_tuples = [(s.section_name, s.size, s.address, s.full_name, s.object_path,
+                 s.flags) for s in syms]
+  return chunk_idx, parser._section_ranges, sym_tuples, thin_map, stats
+
+
+def _ParseLldFileInParallel(path, linker_name, chunk_size=None):
+  file_size = os.path.getsize(path)
+  if chunk_size is None:
+    chunk_size = max(_MIN_CHUNK_SIZE,
+                     file_size // (multiprocessing.cpu_count() * 4))
+  with open(path, 'rb') as f:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+      chunks = _FindLldChunks(data, linker_name, chunk_size)
+  logging.info('Parsing map file in %d chunks', len(chunks))
+
+  # Symbols are created as chunks arrive, while other chunks are being parsed.
+  results = [None] * len(chunks)
+  arg_tuples = ((i, ) + chunk for i, chunk in enumerate(chunks))
+  for (chunk_idx, chunk_section_ranges, sym_tuples, chunk_thin_map,
+       chunk_stats) in parallel.BulkForkAndCall(_ParseLldChunk,
+                                                arg_tuples,
+                                                path=path,
+                                                linker_name=linker_name):
+    chunk_syms = [
+        models.Symbol(section_name,
+                      size,
+                      address=address,
+                      full_name=full_name,
+                      object_path=object_path,
+                      flags=flags)
+        for section_name, size, address, full_name, object_path, flags in
+        sym_tuples
+    ]
+    results[chunk_idx] = (chunk_section_ranges, chunk_syms, chunk_thin_map,
+                          chunk_stats)
+
+  section_ranges = {}
+  syms = []
+  thin_map = {}
+  stats = [0, 0, 0]
+  for chunk_section_ranges, chunk_syms, chunk_thin_map, chunk_stats in results:
+    section_ranges.update(chunk_section_ranges)
+    syms += chunk_syms
+    thin_map.update(chunk_thin_map)
+    stats = [a + b for a, b in zip(stats, chunk_stats)]
+  _LogLldStats(stats)
+  return section_ranges, syms, {'thin_map': thin_map}
+
+
+def ParseFile(path, chunk_size=None):
   """Parses a linker map file pointed to by |path|.
 
+  Large uncompressed lld maps are parsed in parallel.
+
+  Args:
+    path: Path to the map file.
+    chunk_size: Number of bytes per chunk to use for parallel parsing. When
+        set, parallel parsing is used regardless of the file's size.
+
   Returns:
     A tuple of (section_ranges, symbols, extras).
   """
+  use_parallel = chunk_size or (
+      multiprocessing.cpu_count() > 1
+      and os.path.getsize(path) >= _MIN_PARALLEL_PARSE_SIZE)
+  if use_parallel and not path.endswith('.gz'):
+    with open(path, 'rt') as f:
+      linker_name = _DetectLinkerName(itertools.islice(f, 1000))
+    if linker_name.startswith('lld'):
+      logging.info('Detected map file of type %s', linker_name)
+      return _ParseLldFileInParallel(path, linker_name, chunk_size)
+
   with _OpenMaybeGzAsText(path) as f:
     return ParseLines(f)
 
@@ -6,6 +6,7 @@
 import glob
 import os
 import sys
+import tempfile
 import unittest
 
 import linker_map_parser
@@ -44,6 +45,13 @@ def _ReadMapFile(path):
       yield line
 
 
+def _ParseFileInChunks(path, chunk_size):
+  with tempfile.NamedTemporaryFile('w', suffix='.map') as f:
+    f.writelines(_ReadMapFile(path))
+    f.flush()
+    return linker_map_parser.ParseFile(f.name, chunk_size=chunk_size)
+
+
 def _RenderSectionSizesAndRawSymbols(section_sizes, raw_symbols):
   ret = []
   ret.append('******** section_sizes ********')
@@ -71,6 +79,16 @@ class LinkerMapParserTest(unittest.TestCase):
     section_sizes, raw_symbols, _ = linker_map_parser.ParseLines(lines)
     return _RenderSectionSizesAndRawSymbols(section_sizes, raw_symbols)
 
+  @_CompareWithGolden(name='Parser')
+  def test_ParserInChunks(self):
+    section_sizes, raw_symbols, _ = _ParseFileInChunks(_TEST_MAP_PATH, 1000)
+    return _RenderSectionSizesAndRawSymbols(section_sizes, raw_symbols)
+
+  @_CompareWithGolden(name='ParserCfi')
+  def test_ParserCfiInChunks(self):
+    section_sizes, raw_symbols, _ = _ParseFileInChunks(_TEST_CFI_MAP_PATH, 500)
+    return _RenderSectionSizesAndRawSymbols(section_sizes, raw_symbols)
+
   def test_ParseArmAnnotations(self):
     fun = linker_map_parser.MapFileParserLld.ParseArmAnnotations
 
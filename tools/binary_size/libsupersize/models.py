@@ -13,6 +13,7 @@ import os
 import re
 
 import match_util
+import rollups
 
 
 BUILD_CONFIG_GIT_REVISION = 'git_revision'
@@ -279,6 +280,8 @@ class BaseSizeInfo:
     build_config: A dict of build configurations.
     containers: A list of Containers.
     raw_symbols: A SymbolGroup containing all top-level symbols (no groups).
+        May be passed to the constructor as a function that returns the
+        symbols, in which case they are loaded on first access.
     symbols: A SymbolGroup of all symbols, where symbols have been
         grouped by full_name (where applicable). May be re-assigned when it is
         desirable to show custom groupings while still printing containers.
@@ -288,23 +291,63 @@ class BaseSizeInfo:
   __slots__ = (
       'build_config',
       'containers',
-      'raw_symbols',
+      '_raw_symbols',
+      '_raw_symbols_loader',
       '_symbols',
       '_native_symbols',
       '_pak_symbols',
   )
 
   def __init__(self, build_config, containers, raw_symbols, symbols=None):
-    if isinstance(raw_symbols, list):
-      raw_symbols = SymbolGroup(raw_symbols)
     self.build_config = build_config
     self.containers = containers
-    self.raw_symbols = raw_symbols
+    self._raw_symbols = None
+    self._raw_symbols_loader = None
+    if callable(raw_symbols):
+      self._raw_symbols_loader = raw_symbols
+    else:
+      self.raw_symbols = raw_symbols
     self._symbols = symbols
     self._native_symbols = None
     self._pak_symbols = None
     BaseContainer.AssignShortNames(self.containers)
 
+  @property
+  def raw_symbols(self):
+    if self._raw_symbols_loader is not None:
+      loader = self._raw_symbols_loader
+      logging.debug('Materializing symbols')
+      self.raw_symbols = loader()
+      logging.debug('Done materializing symbols')
+    return self._raw_symbols
+
+  @raw_symbols.setter
+  def raw_symbols(self, value):
+    if isinstance(value, list):
+      value = SymbolGroup(value)
+    self._raw_symbols_loader = None
+    self._raw_symbols = value
+
+  def HasLoadedRawSymbols(self):
+    return self._raw_symbols_loader is None
+
+  def PostProcessRawSymbols(self, func):
+    """Calls |func| with |raw_symbols|, deferring it if they are not loaded.
+
+    Deferred calls happen right after loading, before |raw_symbols| is returned.
+    """
+    loader = self._raw_symbols_loader
+    if loader is None:
+      func(self.raw_symbols)
+      return
+
+    def post_processing_loader():
+      raw_symbols = loader()
+      func(raw_symbols)
+      return raw_symbols
+
+    self._raw_symbols_loader = post_processing_loader
+
   @property
   def symbols(self):
     if self._symbols is None:
@@ -347,9 +390,14 @@ class SizeInfo(BaseSizeInfo):
 
   Fields:
     size_path: Path to .size file this was loaded from (or None).
+    rollups: Precomputed size totals (a rollups.Rollups). Read from the .size
+        file when it contains them, and computed from |raw_symbols| otherwise.
+        Describing with include_symbols=False and the *Sizes() canned queries
+        use them.
   """
   __slots__ = (
       'size_path',
+      '_rollups',
   )
 
   def __init__(self,
@@ -357,9 +405,18 @@ class SizeInfo(BaseSizeInfo):
                containers,
                raw_symbols,
                symbols=None,
-               size_path=None):
+               size_path=None,
+               precomputed_rollups=None):
     super().__init__(build_config, containers, raw_symbols, symbols=symbols)
     self.size_path = size_path
+    self._rollups = precomputed_rollups
+
+  @property
+  def rollups(self):
+    if self._rollups is not None:
+      return self._rollups
+    # Not cached, since |raw_symbols| may be modified.
+    return rollups.Rollups.Compute(self.raw_symbols)
 
   @property
   def metadata_legacy(self):
@@ -1108,27 +1165,31 @@ class SymbolGroup(BaseSymbol):
 
   def WhereObjectPathMatches(self, pattern):
     regex = re.compile(match_util.ExpandRegexIdentifierPlaceholder(pattern))
-    return self.Filter(lambda s: regex.search(s.object_path))
+    search = _SearchPerValue(regex)
+    return self.Filter(lambda s: search(s.object_path))
 
   def WhereSourcePathMatches(self, pattern):
     regex = re.compile(match_util.ExpandRegexIdentifierPlaceholder(pattern))
-    return self.Filter(lambda s: regex.search(s.source_path))
+    search = _SearchPerValue(regex)
+    return self.Filter(lambda s: search(s.source_path))
 
   def WherePathMatches(self, pattern):
     regex = re.compile(match_util.ExpandRegexIdentifierPlaceholder(pattern))
-    return self.Filter(lambda s: (regex.search(s.source_path) or
-                                  regex.search(s.object_path)))
+    search = _SearchPerValue(regex)
+    return self.Filter(lambda s: search(s.source_path) or search(s.object_path))
 
   def WhereComponentMatches(self, pattern):
     regex = re.compile(match_util.ExpandRegexIdentifierPlaceholder(pattern))
-    return self.Filter(lambda s: regex.search(s.component))
+    search = _SearchPerValue(regex)
+    return self.Filter(lambda s: search(s.component))
 
   def WhereMatches(self, pattern):
     """Looks for |pattern| within all paths & names."""
     regex = re.compile(match_util.ExpandRegexIdentifierPlaceholder(pattern))
+    search_path = _SearchPerValue(regex)
     return self.Filter(lambda s: (
-        regex.search(s.source_path) or
-        regex.search(s.object_path) or
+        search_path(s.source_path) or
+        search_path(s.object_path) or
         regex.search(s.full_name) or
         s.full_name is not s.template_name and regex.search(s.template_name) or
         s.full_name is not s.name and regex.search(s.name)))
@@ -1380,10 +1441,9 @@ class SymbolGroup(BaseSymbol):
                  Use a negative value to omit symbols entirely rather than
                  include them outside of a group.
     """
-    def extract_path(symbol):
-      path = symbol.source_path
-      if fallback_to_object_path and not path:
-        path = symbol.object_path
+    # Paths are shared by many symbols, so extract each one only once.
+    @functools.lru_cache(maxsize=None)
+    def extract_token(path):
       path = path or fallback
       if path is None:
         return None
@@ -1392,6 +1452,12 @@ class SymbolGroup(BaseSymbol):
       if shared_idx != -1:
         path = path[:shared_idx + 8]
       return _ExtractPrefixBeforeSeparator(path, os.path.sep, depth)
+
+    def extract_path(symbol):
+      path = symbol.source_path
+      if fallback_to_object_path and not path:
+        path = symbol.object_path
+      return extract_token(path)
     return self.GroupedBy(extract_path, min_count=min_count)
 
 
@@ -1443,6 +1509,15 @@ class DeltaSymbolGroup(SymbolGroup):
     return self.Filter(lambda s: s.diff_status == diff_status)
 
 
+def _SearchPerValue(regex):
+  """Returns a function that returns whether |regex| matches a string.
+
+  Results are cached, so each distinct string is searched only once. This is
+  worthwhile for paths and components, which are shared by many symbols.
+  """
+  return functools.lru_cache(maxsize=None)(lambda v: bool(regex.search(v)))
+
+
 def _ExtractPrefixBeforeSeparator(string, separator, count):
   idx = -len(separator)
   prev_idx = None
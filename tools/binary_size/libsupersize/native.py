@@ -13,11 +13,11 @@ import logging
 import os
 import posixpath
 import re
-import string
 import subprocess
 import sys
 import tempfile
 
+import analysis_cache
 import ar
 import archive_util
 import demangle
@@ -63,6 +63,7 @@ class _OutputDirectoryContext:
   known_inputs: list  # Non-None only when elf_path is.
   output_directory: str
   thin_archives: list
+  obj_analyzer_service: obj_analyzer.ObjectFileAnalyzerService
 
 
 @dataclasses.dataclass
@@ -494,29 +495,6 @@ def _DeduceObjectPathForSwitchTables(raw_symbols, object_paths_by_name):
         num_deduced, num_arbitrations, num_unassigned)
 
 
-def _NameStringLiterals(raw_symbols, elf_path):
-  # Assign ASCII-readable string literals names like "string contents".
-  STRING_LENGTH_CUTOFF = 30
-
-  PRINTABLE_TBL = [False] * 256
-  for ch in string.printable:
-    PRINTABLE_TBL[ord(ch)] = True
-
-  for sym, name in string_extract.ReadStringLiterals(raw_symbols, elf_path):
-    # Newlines and tabs are used as delimiters in file_format.py
-    # At this point, names still have a terminating null byte.
-    name = name.replace(b'\n', b'').replace(b'\t', b'').strip(b'\00')
-    is_printable = all(PRINTABLE_TBL[c] for c in name)
-    if is_printable:
-      name = name.decode('ascii')
-      if len(name) > STRING_LENGTH_CUTOFF:
-        sym.full_name = '"{}[...]"'.format(name[:STRING_LENGTH_CUTOFF])
-      else:
-        sym.full_name = '"{}"'.format(name)
-    else:
-      sym.full_name = models.STRING_LITERAL_NAME
-
-
 def _ParseElfInfo(native_spec, outdir_context=None):
   """Adds ELF section ranges and symbols."""
   assert native_spec.map_path or native_spec.elf_path, (
@@ -542,7 +520,7 @@ def _ParseElfInfo(native_spec, outdir_context=None):
     # Rather than record all paths for each symbol, set the paths to be the
     # common ancestor of all paths.
     if outdir_context and native_spec.map_path:
-      bulk_analyzer = obj_analyzer.BulkObjectFileAnalyzer(
+      bulk_analyzer = outdir_context.obj_analyzer_service.Acquire(
           outdir_context.output_directory,
           track_string_literals=native_spec.track_string_literals)
       bulk_analyzer.AnalyzePaths(outdir_context.elf_object_paths)
@@ -626,7 +604,6 @@ def _ParseElfInfo(native_spec, outdir_context=None):
       if native_spec.track_string_literals:
         logging.info('Waiting for string literal extraction to complete.')
         list_of_positions_by_object_path = bulk_analyzer.GetStringPositions()
-      bulk_analyzer.Close()
 
       if native_spec.track_string_literals:
         logging.info('Deconstructing ** merge strings into literals')
@@ -645,8 +622,9 @@ def _ParseElfInfo(native_spec, outdir_context=None):
     linker_map_parser.DeduceObjectPathsFromThinMap(raw_symbols,
                                                    linker_map_extras)
 
-  if native_spec.elf_path and native_spec.track_string_literals:
-    _NameStringLiterals(raw_symbols, native_spec.elf_path)
+  if (native_spec.elf_path and native_spec.track_string_literals
+      and native_spec.name_string_literals):
+    string_extract.NameStringLiterals(raw_symbols, native_spec.elf_path)
 
   # If we have an ELF file, use its ranges as the source of truth, since some
   # sections can differ from the .map.
@@ -720,7 +698,7 @@ def _AddUnattributedSectionSymbols(raw_symbols, section_ranges, source_path):
   return ret, other_symbols
 
 
-def _ParseNinjaFiles(output_directory, elf_path=None):
+def _ParseNinjaFiles(output_directory, elf_path=None, analysis_cache_dir=None):
   linker_elf_path = elf_path
   if elf_path:
     # For partitioned libraries, the actual link command outputs __combined.so.
@@ -731,8 +709,11 @@ def _ParseNinjaFiles(output_directory, elf_path=None):
   logging.info('Parsing ninja files, looking for %s.',
                (linker_elf_path or 'source mapping only (elf_path=None)'))
 
+  cache = None
+  if analysis_cache_dir:
+    cache = analysis_cache.AnalysisCache(analysis_cache_dir, output_directory)
   source_mapper, ninja_elf_object_paths = ninja_parser.Parse(
-      output_directory, linker_elf_path)
+      output_directory, linker_elf_path, analysis_cache=cache)
 
   logging.debug('Parsed %d .ninja files. Linker inputs=%d',
                 source_mapper.parsed_file_count,
@@ -792,7 +773,9 @@ def CreateSymbols(*,
                   apk_spec,
                   native_spec,
                   output_directory=None,
-                  pak_id_map=None):
+                  pak_id_map=None,
+                  analysis_cache_dir=None,
+                  obj_analyzer_service=None):
   """Creates native symbols for the given native_spec.
 
   Args:
@@ -801,6 +784,10 @@ def CreateSymbols(*,
     output_directory: Build output directory. If None, source_paths and symbol
         alias information will not be recorded.
     pak_id_map: Instance of PakIdMap.
+    analysis_cache_dir: Directory in which to cache per-object-file analysis
+        across runs, or None.
+    obj_analyzer_service: Instance of ObjectFileAnalyzerService to share with
+        other calls. If None, one is created for just this call.
 
   Returns:
     A tuple of (section_ranges, raw_symbols, elf_info).
@@ -819,7 +806,9 @@ def CreateSymbols(*,
   if output_directory and native_spec.map_path:
     # Finds all objects passed to the linker and creates a map of .o -> .cc.
     ninja_source_mapper, ninja_elf_object_paths = _ParseNinjaFiles(
-        output_directory, native_spec.elf_path)
+        output_directory,
+        native_spec.elf_path,
+        analysis_cache_dir=analysis_cache_dir)
   elif native_spec.elf_path:
     logging.info('Parsing source path info via dwarfdump')
     dwarf_source_mapper = dwarfdump.CreateAddressSourceMapper(
@@ -847,23 +836,34 @@ def CreateSymbols(*,
     else:
       thin_archives = None
 
-  outdir_context = None
-  if output_directory:
-    outdir_context = _OutputDirectoryContext(elf_object_paths=elf_object_paths,
-                                             known_inputs=known_inputs,
-                                             output_directory=output_directory,
-                                             thin_archives=thin_archives)
-
-  object_paths_by_name = None
-  if native_spec.elf_path or native_spec.map_path:
-    section_ranges, raw_symbols, object_paths_by_name = _ParseElfInfo(
-        native_spec, outdir_context=outdir_context)
-    if pak_id_map and native_spec.map_path:
-      # For trichrome, pak files are in different apks than native library,
-      # so need to pass along pak_id_map separately and ensure
-      # TrichromeLibrary appears first in .ssargs file.
-      logging.debug('Extracting pak IDs from symbol names')
-      pak_id_map.Update(object_paths_by_name, ninja_source_mapper)
+  owns_obj_analyzer_service = obj_analyzer_service is None
+  if owns_obj_analyzer_service:
+    obj_analyzer_service = obj_analyzer.ObjectFileAnalyzerService(
+        analysis_cache_dir=analysis_cache_dir)
+
+  try:
+    outdir_context = None
+    if output_directory:
+      outdir_context = _OutputDirectoryContext(
+          elf_object_paths=elf_object_paths,
+          known_inputs=known_inputs,
+          output_directory=output_directory,
+          thin_archives=thin_archives,
+          obj_analyzer_service=obj_analyzer_service)
+
+    object_paths_by_name = None
+    if native_spec.elf_path or native_spec.map_path:
+      section_ranges, raw_symbols, object_paths_by_name = _ParseElfInfo(
+          native_spec, outdir_context=outdir_context)
+      if pak_id_map and native_spec.map_path:
+        # For trichrome, pak files are in different apks than native library,
+        # so need to pass along pak_id_map separately and ensure
+        # TrichromeLibrary appears first in .ssargs file.
+        logging.debug('Extracting pak IDs from symbol names')
+        pak_id_map.Update(object_paths_by_name, ninja_source_mapper)
+  finally:
+    if owns_obj_analyzer_service:
+      obj_analyzer_service.Close()
 
   elf_info = None
   if apk_elf_info_result:
@@ -112,17 +112,26 @@ def ParseOneFileForTest(lines, dep_map, elf_path):
   return _ParseOneFile(lines, dep_map, elf_path)
 
 
-def Parse(output_directory, elf_path):
+def Parse(output_directory, elf_path, analysis_cache=None):
   """Parses build.ninja and subninjas.
 
   Args:
     output_directory: Where to find the root build.ninja.
     elf_path: Path to elf file to find inputs for.
+    analysis_cache: An AnalysisCache to reuse results from when no .ninja file
+        has changed since the last parse.
 
   Returns: A tuple of (source_mapper, elf_inputs).
   """
   if elf_path:
     elf_path = os.path.relpath(elf_path, output_directory)
+  if analysis_cache:
+    cached = analysis_cache.GetDerived('ninja', elf_path or '')
+    if cached:
+      dep_map, elf_inputs, parsed_file_count = cached
+      logging.debug('Using cached parse of .ninja files')
+      return _SourceMapper(dep_map, parsed_file_count), elf_inputs
+
   to_parse = ['build.ninja']
   seen_paths = set(to_parse)
   dep_map = {}
@@ -139,6 +148,9 @@ def Parse(output_directory, elf_path):
       seen_paths.add(subpath)
     to_parse.extend(sub_ninjas)
 
+  if analysis_cache:
+    analysis_cache.PutDerived('ninja', elf_path or '', seen_paths,
+                              (dep_map, elf_inputs, len(seen_paths)))
   return _SourceMapper(dep_map, len(seen_paths)), elf_inputs
 
 
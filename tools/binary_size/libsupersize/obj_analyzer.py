@@ -29,7 +29,15 @@ BulkObjectFileAnalyzer:
     Extracts string literals from .o files, and then locates them within the
     "** merge strings" sections within an ELF's .rodata section.
   * GetSymbolNames(): Accessor.
-  * Close(): Disposes data.
+  * Reset(): Clears results for the current ELF so that the analyzer can be
+    used for another one. Results for individual object files are kept, so
+    object files shared between ELFs are analyzed only once.
+  * Close(): Disposes data, and persists results to the analysis cache (when
+    one is used).
+
+ObjectFileAnalyzerService:
+  Shares one BulkObjectFileAnalyzer per output directory across all ELFs of an
+  archive (e.g. the split libraries of a bundle).
 
 This file can also be run stand-alone in order to test out the logic on smaller
 sample sizes.
@@ -48,10 +56,12 @@ import sys
 import threading
 import traceback
 
+import analysis_cache
 import bcanalyzer
 import demangle
 import nm
 import parallel
+import path_util
 import string_extract
 
 
@@ -60,6 +70,8 @@ _MSG_SORT_PATHS = 2
 _MSG_ANALYZE_STRINGS = 3
 _MSG_GET_SYMBOL_NAMES = 4
 _MSG_GET_STRINGS = 5
+_MSG_CLOSE = 6
+_MSG_RESET = 7
 
 _active_pids = None
 
@@ -77,9 +89,62 @@ class _PathsByType:
     self.bc = bc
 
 
+class _AnalysisResults:
+  """Per-path analysis results, backed by an optional AnalysisCache.
+
+  Results are kept in memory for the lifetime of the worker, so that object
+  files shared by multiple ELFs are analyzed only once.
+  """
+
+  def __init__(self, cache):
+    self._cache = cache
+    self._values = {}
+
+  def Partition(self, namespace, paths):
+    """Returns a tuple of (values_by_path, unknown_paths)."""
+    values_by_path = {}
+    unknown_paths = []
+    for path in paths:
+      value = self._values.get((namespace, path))
+      if value is None:
+        unknown_paths.append(path)
+      else:
+        values_by_path[path] = value
+    if self._cache and unknown_paths:
+      cached_values_by_path, unknown_paths = self._cache.Partition(
+          namespace, unknown_paths)
+      for path, value in cached_values_by_path.items():
+        self._values[(namespace, path)] = value
+      values_by_path.update(cached_values_by_path)
+    return values_by_path, unknown_paths
+
+  def Put(self, namespace, path, value):
+    self._values[(namespace, path)] = value
+    if self._cache:
+      self._cache.Put(namespace, path, value)
+
+  def Flush(self):
+    if self._cache:
+      self._cache.Flush()
+
+
 class _BulkObjectFileAnalyzerWorker:
-  def __init__(self, output_directory, track_string_literals=True):
+  def __init__(self,
+               output_directory,
+               track_string_literals=True,
+               analysis_cache_dir=None):
     self._output_directory = output_directory
+    cache = None
+    if analysis_cache_dir:
+      cache = analysis_cache.AnalysisCache(analysis_cache_dir, output_directory)
+    self._results = _AnalysisResults(cache)
+    self._nm_namespace = analysis_cache.ToolNamespace('nm',
+                                                      path_util.GetNmPath(), nm)
+    self._bcanalyzer_namespace = analysis_cache.ToolNamespace(
+        'bcanalyzer', path_util.GetBcAnalyzerPath(), bcanalyzer)
+    self.Reset(track_string_literals)
+
+  def Reset(self, track_string_literals=True):
     self._track_string_literals = track_string_literals
     self._list_of_encoded_elf_string_ranges_by_path = None
     self._paths_by_name = collections.defaultdict(list)
@@ -123,40 +188,108 @@ class _BulkObjectFileAnalyzerWorker:
         batches,
         output_directory=self._output_directory)
 
+  def _AddNmResults(self, symbol_names_by_path, encoded_strs):
+    # Names are still mangled.
+    all_paths_by_name = self._paths_by_name
+    for path, names in symbol_names_by_path.items():
+      for name in names:
+        all_paths_by_name[name].append(path)
+    if encoded_strs != parallel.EMPTY_ENCODED_DICT:
+      self._encoded_string_addresses_by_path_chunks.append(encoded_strs)
+
+  def _AddKnownNmResults(self, arch_paths, obj_paths):
+    """Adds known nm results, and returns paths that still need analysis."""
+    results = self._results
+    cached_archives, arch_paths = results.Partition(self._nm_namespace,
+                                                    arch_paths)
+    cached_objects, obj_paths = results.Partition(self._nm_namespace,
+                                                  obj_paths)
+    # Convert to the same {path: value} form that nm returns.
+    value_by_path = cached_objects
+    for arch_path, value_by_member in cached_archives.items():
+      for member, value in value_by_member.items():
+        value_by_path['%s(%s)' % (arch_path, member)] = value
+
+    symbol_names_by_path = {}
+    string_addresses_by_path = {}
+    num_no_symbols = 0
+    for path, (names, string_addresses) in value_by_path.items():
+      symbol_names_by_path[path] = names
+      if string_addresses:
+        string_addresses_by_path[path] = string_addresses
+      elif not names:
+        num_no_symbols += 1
+    self._AddNmResults(symbol_names_by_path,
+                       parallel.EncodeDictOfLists(string_addresses_by_path))
+    return arch_paths, obj_paths, num_no_symbols
+
+  def _StoreNmResults(self, arch_paths, obj_paths, symbol_names_by_path,
+                      string_addresses_by_path):
+    # Paths with no nm output are cached as well.
+    value_by_member_by_arch = {p: {} for p in arch_paths}
+    value_by_obj = {p: ([], []) for p in obj_paths}
+    for path, names in symbol_names_by_path.items():
+      value = (names, string_addresses_by_path.get(path, []))
+      if path.endswith(')'):
+        # E.g. foo/bar.a(baz.o)
+        start_idx = path.index('(')
+        value_by_member_by_arch[path[:start_idx]][path[start_idx + 1:-1]] = (
+            value)
+      else:
+        value_by_obj[path] = value
+    results = self._results
+    for path, value in value_by_member_by_arch.items():
+      results.Put(self._nm_namespace, path, value)
+    for path, value in value_by_obj.items():
+      results.Put(self._nm_namespace, path, value)
+
   def _RunNm(self, paths_by_type):
     """Calls nm to get symbols and (for non-BC files) string addresses."""
-    # Downstream functions rely upon .a not being grouped.
-    batches = self._MakeBatches(paths_by_type.arch, None)
+    arch_paths = paths_by_type.arch
     # Combine object files and Bitcode files for nm.
+    obj_paths = paths_by_type.obj + paths_by_type.bc
+    arch_paths, obj_paths, total_no_symbols = self._AddKnownNmResults(
+        arch_paths, obj_paths)
+
+    # Downstream functions rely upon .a not being grouped.
+    batches = self._MakeBatches(arch_paths, None)
     BATCH_SIZE = 50  # Arbitrarily chosen.
-    batches.extend(
-        self._MakeBatches(paths_by_type.obj + paths_by_type.bc, BATCH_SIZE))
+    batches.extend(self._MakeBatches(obj_paths, BATCH_SIZE))
     results = self._DoBulkFork(nm.RunNmOnIntermediates, batches)
 
-    # Names are still mangled.
-    all_paths_by_name = self._paths_by_name
-    total_no_symbols = 0
+    all_symbol_names_by_path = {}
+    all_string_addresses_by_path = {}
     for encoded_syms, encoded_strs, num_no_symbols in results:
       total_no_symbols += num_no_symbols
       symbol_names_by_path = parallel.DecodeDictOfLists(encoded_syms)
-      for path, names in symbol_names_by_path.items():
-        for name in names:
-          all_paths_by_name[name].append(path)
-
-      if encoded_strs != parallel.EMPTY_ENCODED_DICT:
-        self._encoded_string_addresses_by_path_chunks.append(encoded_strs)
+      self._AddNmResults(symbol_names_by_path, encoded_strs)
+      all_symbol_names_by_path.update(symbol_names_by_path)
+      all_string_addresses_by_path.update(
+          parallel.DecodeDictOfLists(encoded_strs))
+    self._StoreNmResults(arch_paths, obj_paths, all_symbol_names_by_path,
+                         all_string_addresses_by_path)
     if total_no_symbols:
       logging.warn('nm found no symbols in %d objects.', total_no_symbols)
 
   def _RunLlvmBcAnalyzer(self, paths_by_type):
     """Calls llvm-bcanalyzer to extract string data (for LLD-LTO)."""
+    bc_paths = paths_by_type.bc
+    known_strings_by_path, bc_paths = self._results.Partition(
+        self._bcanalyzer_namespace, bc_paths)
+    if known_strings_by_path:
+      # Values are already escaped by repr().
+      self._encoded_strings_by_path_chunks.append(
+          parallel.EncodeDictOfLists(known_strings_by_path))
+
     BATCH_SIZE = 50  # Arbitrarily chosen.
-    batches = self._MakeBatches(paths_by_type.bc, BATCH_SIZE)
+    batches = self._MakeBatches(bc_paths, BATCH_SIZE)
     results = self._DoBulkFork(
         bcanalyzer.RunBcAnalyzerOnIntermediates, batches)
     for encoded_strs in results:
       if encoded_strs != parallel.EMPTY_ENCODED_DICT:
         self._encoded_strings_by_path_chunks.append(encoded_strs)
+      for path, strings in parallel.DecodeDictOfLists(encoded_strs).items():
+        self._results.Put(self._bcanalyzer_namespace, path, strings)
 
   def AnalyzePaths(self, paths):
     logging.debug('worker: AnalyzePaths() started.')
@@ -238,7 +371,7 @@ class _BulkObjectFileAnalyzerWorker:
     return self._list_of_encoded_elf_string_ranges_by_path
 
   def Close(self):
-    pass
+    self._results.Flush()
 
 
 def _TerminateSubprocesses():
@@ -252,9 +385,13 @@ def _TerminateSubprocesses():
 class _BulkObjectFileAnalyzerHost:
   """Runs BulkObjectFileAnalyzer in a subprocess."""
 
-  def __init__(self, output_directory, track_string_literals=True):
+  def __init__(self,
+               output_directory,
+               track_string_literals=True,
+               analysis_cache_dir=None):
     self._output_directory = output_directory
     self._track_string_literals = track_string_literals
+    self._analysis_cache_dir = analysis_cache_dir
     self._child_pid = None
     self._pipe = None
 
@@ -275,7 +412,8 @@ class _BulkObjectFileAnalyzerHost:
           'obj_analyzer: %(levelname).1s %(relativeCreated)6d %(message)s'))
       worker_analyzer = _BulkObjectFileAnalyzerWorker(
           self._output_directory,
-          track_string_literals=self._track_string_literals)
+          track_string_literals=self._track_string_literals,
+          analysis_cache_dir=self._analysis_cache_dir)
       delegate = _BulkObjectFileAnalyzerDelegate(worker_analyzer, child_conn)
       delegate.Run()
 
@@ -290,6 +428,11 @@ class _BulkObjectFileAnalyzerHost:
   def SortPaths(self):
     self._pipe.send((_MSG_SORT_PATHS,))
 
+  def Reset(self, track_string_literals=True):
+    self._track_string_literals = track_string_literals
+    if self._child_pid is not None:
+      self._pipe.send((_MSG_RESET, track_string_literals))
+
   def AnalyzeStringLiterals(self, elf_path, elf_string_ranges):
     self._pipe.send((_MSG_ANALYZE_STRINGS, elf_path, elf_string_ranges))
 
@@ -311,6 +454,12 @@ class _BulkObjectFileAnalyzerHost:
     ]
 
   def Close(self):
+    if self._child_pid is None:
+      return
+    if self._analysis_cache_dir:
+      self._pipe.send((_MSG_CLOSE,))
+      # Wait for the analysis cache to be written.
+      self._pipe.recv()  # None
     self._pipe.close()
     # Child process should terminate gracefully at this point, but leave it in
     # _active_pids to be killed just in case.
@@ -374,6 +523,15 @@ class _BulkObjectFileAnalyzerDelegate:
       # Send a None packet so that other side can measure IPC transfer time.
       self._pipe.send(None)
       self._pipe.send(self._worker_analyzer.GetEncodedStringPositions())
+    elif message[0] == _MSG_RESET:
+      track_string_literals = message[1]
+      self._job_queue.put(
+          lambda: self._worker_analyzer.Reset(track_string_literals))
+      self._allow_analyze_paths = True
+    elif message[0] == _MSG_CLOSE:
+      self._job_queue.join()
+      self._worker_analyzer.Close()
+      self._pipe.send(None)
 
   def Run(self):
     try:
@@ -396,11 +554,42 @@ if parallel.DISABLE_ASYNC:
   BulkObjectFileAnalyzer = _BulkObjectFileAnalyzerWorker
 
 
+class ObjectFileAnalyzerService:
+  """Shares a BulkObjectFileAnalyzer per output directory across ELF files.
+
+  The split libraries of a bundle are linked from mostly the same object files,
+  so sharing an analyzer (and its subprocess) means each is analyzed only once.
+  """
+
+  def __init__(self, analysis_cache_dir=None):
+    self._analysis_cache_dir = analysis_cache_dir
+    self._analyzers_by_output_directory = {}
+
+  def Acquire(self, output_directory, track_string_literals=True):
+    """Returns an analyzer with no results for previous ELFs."""
+    analyzer = self._analyzers_by_output_directory.get(output_directory)
+    if analyzer is None:
+      analyzer = BulkObjectFileAnalyzer(
+          output_directory,
+          track_string_literals=track_string_literals,
+          analysis_cache_dir=self._analysis_cache_dir)
+      self._analyzers_by_output_directory[output_directory] = analyzer
+    else:
+      analyzer.Reset(track_string_literals)
+    return analyzer
+
+  def Close(self):
+    for analyzer in self._analyzers_by_output_directory.values():
+      analyzer.Close()
+    self._analyzers_by_output_directory = {}
+
+
 def main():
   parser = argparse.ArgumentParser()
   parser.add_argument('--multiprocess', action='store_true')
   parser.add_argument('--output-directory', required=True)
   parser.add_argument('--elf-file', type=os.path.realpath)
+  parser.add_argument('--analysis-cache-dir')
   parser.add_argument('--show-names', action='store_true')
   parser.add_argument('--show-strings', action='store_true')
   parser.add_argument('objects', type=os.path.realpath, nargs='+')
@@ -410,10 +599,12 @@ def main():
                       format='%(levelname).1s %(relativeCreated)6d %(message)s')
 
   if args.multiprocess:
-    bulk_analyzer = _BulkObjectFileAnalyzerHost(args.output_directory)
+    bulk_analyzer = _BulkObjectFileAnalyzerHost(
+        args.output_directory, analysis_cache_dir=args.analysis_cache_dir)
   else:
     parallel.DISABLE_ASYNC = True
-    bulk_analyzer = _BulkObjectFileAnalyzerWorker(args.output_directory)
+    bulk_analyzer = _BulkObjectFileAnalyzerWorker(
+        args.output_directory, analysis_cache_dir=args.analysis_cache_dir)
 
   # Pass individually to test multiple calls.
   for path in args.objects:
@@ -440,6 +631,7 @@ def main():
             args.elf_file, ((offset + addr, size) for addr, size in positions))
         print('{}: {!r}'.format(
             path, [s if len(s) < 20 else s[:20] + '...' for s in strs]))
+  bulk_analyzer.Close()
 
 
 if __name__ == '__main__':
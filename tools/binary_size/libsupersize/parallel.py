@@ -14,6 +14,8 @@ import threading
 import traceback
 
 from multiprocessing import process
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
 
 DISABLE_ASYNC = os.environ.get('SUPERSIZE_DISABLE_ASYNC') == '1'
 if DISABLE_ASYNC:
@@ -26,6 +28,12 @@ _silence_exceptions = False
 _fork_params = None
 _fork_kwargs = None
 
+# Results with str / bytes values at least this large are returned via shared
+# memory rather than by pickling them through a pipe. Values are still encoded,
+# copied into shared memory, and decoded, so this is only faster for large
+# values: ~40% faster for 8MB-100MB strings, but slower below ~2MB.
+_SHARED_MEMORY_MIN_SIZE = 4 * 1024 * 1024
+
 
 # Avoid printing backtrace for every worker for Ctrl-C.
 def _PatchMultiprocessing():
@@ -73,6 +81,94 @@ class _ExceptionWrapper:
                     self.exception_type)('Originally caused by: ' + self.msg)
 
 
+class _SharedMemoryRef:
+  """Placeholder for a str / bytes value stored within shared memory."""
+
+  def __init__(self, start, end, is_str):
+    self.start = start
+    self.end = end
+    self.is_str = is_str
+
+
+class _SharedMemoryResult:
+  """A return value whose large str / bytes values are in shared memory.
+
+  Values are stored back-to-back within a single shared memory block, and
+  |value| refers to them via _SharedMemoryRefs (an offset table).
+  """
+
+  def __init__(self, name, value):
+    self.name = name
+    self.value = value
+
+
+def _MoveToSharedMemory(value):
+  """Returns |value|, or a _SharedMemoryResult if it contains large strings.
+
+  Looks within (nested) tuples and lists, which is how all callers return
+  multiple values.
+  """
+  chunks = []
+  size = 0
+
+  def replace(x):
+    nonlocal size
+    if isinstance(x, (str, bytes)) and len(x) >= _SHARED_MEMORY_MIN_SIZE:
+      is_str = isinstance(x, str)
+      data = x.encode('utf-8') if is_str else x
+      chunks.append(data)
+      ref = _SharedMemoryRef(size, size + len(data), is_str)
+      size += len(data)
+      return ref
+    if type(x) in (tuple, list):
+      return type(x)(replace(y) for y in x)
+    return x
+
+  new_value = replace(value)
+  if not chunks:
+    return value
+
+  shm = shared_memory.SharedMemory(create=True, size=size)
+  offset = 0
+  for data in chunks:
+    shm.buf[offset:offset + len(data)] = data
+    offset += len(data)
+  shm.close()
+  # The memory is registered with the resource tracker of the parent process
+  # (see _MakeProcessPool()). The parent unlinks it once it has read it, and the
+  # resource tracker unlinks it when the parent exits if it was never read.
+  return _SharedMemoryResult(shm.name, new_value)
+
+
+def _MaybeLoadFromSharedMemory(value):
+  """Inverse of _MoveToSharedMemory(). Frees the shared memory."""
+  if not isinstance(value, _SharedMemoryResult):
+    return value
+  shm = shared_memory.SharedMemory(name=value.name)
+
+  def restore(x):
+    if isinstance(x, _SharedMemoryRef):
+      with shm.buf[x.start:x.end] as data:
+        return str(data, 'utf-8') if x.is_str else data.tobytes()
+    if type(x) in (tuple, list):
+      return type(x)(restore(y) for y in x)
+    return x
+
+  try:
+    return restore(value.value)
+  finally:
+    shm.close()
+    shm.unlink()
+
+
+def _FreeSharedMemory(value):
+  """Frees the shared memory of a result that is not going to be read."""
+  if isinstance(value, _SharedMemoryResult):
+    shm = shared_memory.SharedMemory(name=value.name)
+    shm.close()
+    shm.unlink()
+
+
 class _FuncWrapper:
   """Runs on the fork()'ed side to catch exceptions and spread *args."""
 
@@ -83,7 +179,8 @@ class _FuncWrapper:
 
   def __call__(self, index, _=None):
     try:
-      return self._func(*_fork_params[index], **dict(_fork_kwargs))
+      return _MoveToSharedMemory(
+          self._func(*_fork_params[index], **dict(_fork_kwargs)))
     except BaseException as e:
       # Only keep the exception type for builtin exception types or else risk
       # further marshalling exceptions.
@@ -110,6 +207,7 @@ class _WrappedResult:
     self.wait()
     value = self._result.get()
     _CheckForException(value)
+    value = _MaybeLoadFromSharedMemory(value)
     if not self._decode_func or not self._result.successful():
       return value
     return self._decode_func(value)
@@ -142,6 +240,9 @@ def _MakeProcessPool(job_params, **job_kwargs):
   pool_size = min(len(job_params), multiprocessing.cpu_count())
   _fork_params = job_params
   _fork_kwargs = job_kwargs
+  # Start the resource tracker before forking so that children share it, and
+  # shared memory they create outlives them (see _MoveToSharedMemory()).
+  resource_tracker.ensure_running()
   ret = multiprocessing.Pool(pool_size)
   _fork_params = None
   _fork_kwargs = None
@@ -182,12 +283,17 @@ def BulkForkAndCall(func, arg_tuples, **kwargs):
 
   pool = _MakeProcessPool(arg_tuples, **kwargs)
   wrapped_func = _FuncWrapper(func)
+  results = pool.imap_unordered(wrapped_func, range(len(arg_tuples)))
   try:
-    for result in pool.imap_unordered(wrapped_func, range(len(arg_tuples))):
+    for result in results:
       _CheckForException(result)
-      yield result
+      yield _MaybeLoadFromSharedMemory(result)
   finally:
     pool.close()
+    # Free results that were not consumed, e.g. when the caller stopped early,
+    # or when another call raised an exception.
+    for result in results:
+      _FreeSharedMemory(result)
     pool.join()
 
 
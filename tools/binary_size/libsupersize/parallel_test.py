@@ -144,6 +144,60 @@ class ConcurrentTest(unittest.TestCase):
         parent_pid=parent_pid)
     self.assertEqual([3] * 100, list(results))
 
+  def testForkAndCall_sharedMemory(self):
+    parent_pid = os.getpid()
+    big_str = 'a' * parallel._SHARED_MEMORY_MIN_SIZE
+    result = parallel.ForkAndCall(_ForkTestHelper,
+                                  (big_str, '\u00e9', None, self, parent_pid),
+                                  decode_func=len)
+    self.assertEqual(len(big_str) + 1, result.get())
+
+  def testBulkForkAndCall_sharedMemory(self):
+    parent_pid = os.getpid()
+    big_bytes = b'a' * parallel._SHARED_MEMORY_MIN_SIZE
+    args = [((big_bytes, 1), (b'b', [2]), None, self, parent_pid),
+            ((b'c', 3), (big_bytes, [4]), None, self, parent_pid)]
+    results = parallel.BulkForkAndCall(_ForkTestHelper, args)
+    self.assertEqual(
+        sorted([(big_bytes, 1, b'b', [2]), (b'c', 3, big_bytes, [4])]),
+        sorted(results))
+
+  def _ListSharedMemory(self):
+    shm_dir = '/dev/shm'
+    if not os.path.isdir(shm_dir):
+      self.skipTest('No /dev/shm')
+    return set(os.listdir(shm_dir))
+
+  def testBulkForkAndCall_sharedMemoryFreedWhenStoppedEarly(self):
+    before = self._ListSharedMemory()
+    parent_pid = os.getpid()
+    big_str = 'a' * parallel._SHARED_MEMORY_MIN_SIZE
+    args = [(big_str, str(i), None, self, parent_pid) for i in range(4)]
+    results = parallel.BulkForkAndCall(_ForkTestHelper, args)
+    next(results)
+    results.close()
+    self.assertEqual(before, self._ListSharedMemory())
+
+  def testBulkForkAndCall_sharedMemoryFreedOnException(self):
+    before = self._ListSharedMemory()
+    parent_pid = os.getpid()
+    big_str = 'a' * parallel._SHARED_MEMORY_MIN_SIZE
+    args = [(big_str, str(i), None, self, parent_pid) for i in range(3)]
+    args.append((1, 'a', None, self, parent_pid))
+    results = parallel.BulkForkAndCall(_ForkTestHelper, args)
+    self.assertRaises(TypeError, list, results)
+    self.assertEqual(before, self._ListSharedMemory())
+
+  def testSharedMemory_RoundTrip(self):
+    big_str = 'x' * parallel._SHARED_MEMORY_MIN_SIZE
+    value = ('small', [big_str, 1], b'bytes', (big_str + '\u00e9', ))
+    moved = parallel._MoveToSharedMemory(value)
+    self.assertIsInstance(moved, parallel._SharedMemoryResult)
+    self.assertEqual(value, parallel._MaybeLoadFromSharedMemory(moved))
+    # Values without large strings are returned as-is.
+    small_value = ('small', [1])
+    self.assertIs(small_value, parallel._MoveToSharedMemory(small_value))
+
   def testBulkForkAndCall_exception(self):
     parent_pid = os.getpid()
     results = parallel.BulkForkAndCall(_ForkTestHelper,
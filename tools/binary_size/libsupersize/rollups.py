@@ -0,0 +1,128 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""Precomputed size totals, which can be queried without loading symbols.
+
+Totals are stored per (container, section, value), where value is either a
+component or a directory prefix of a given depth. Each dimension partitions all
+symbols, so totals for coarser groupings (e.g. per-section) are sums of the
+finer ones.
+"""
+
+import collections
+import posixpath
+
+# Number of directory prefix depths that totals are stored for.
+DEFAULT_PATH_DEPTH = 3
+
+_COMPONENT = 'component'
+_PATH_PREFIX = 'path/'
+
+Total = collections.namedtuple('Total', ['size', 'pss', 'count'])
+
+
+def _PathDimension(depth):
+  return '%s%d' % (_PATH_PREFIX, depth)
+
+
+def _DirectoryParts(sym):
+  path = sym.source_path or sym.object_path
+  if not path:
+    return []
+  # Group by base of foo/bar/{shared}/2
+  shared_idx = path.find('{shared}')
+  if shared_idx != -1:
+    return path[:shared_idx + 8].split('/')
+  return posixpath.dirname(path).split('/')
+
+
+class Rollups:
+  """Size totals of a SizeInfo, keyed by container, section, and dimension."""
+
+  def __init__(self, path_depth, totals):
+    """Constructor.
+
+    Args:
+      path_depth: Maximum directory depth that totals are available for.
+      totals: Dict of dimension -> [[container, section, value, size, pss,
+          count], ...].
+    """
+    self.path_depth = path_depth
+    self._totals = totals
+
+  @staticmethod
+  def Compute(raw_symbols, path_depth=DEFAULT_PATH_DEPTH):
+    """Returns Rollups for |raw_symbols|."""
+    dimensions = [_COMPONENT] + [
+        _PathDimension(d) for d in range(1, path_depth + 1)
+    ]
+    # Dict of dimension -> (container, section, value) -> [size, pss, count].
+    accumulators = {d: collections.defaultdict(lambda: [0, 0.0, 0])
+                    for d in dimensions}
+    for sym in raw_symbols:
+      container_name = sym.container_name
+      section_name = sym.section_name
+      size = sym.size
+      pss = sym.pss
+      values = [sym.component]
+      parts = _DirectoryParts(sym)
+      values.extend('/'.join(parts[:d]) for d in range(1, path_depth + 1))
+      for dimension, value in zip(dimensions, values):
+        acc = accumulators[dimension][(container_name, section_name, value)]
+        acc[0] += size
+        acc[1] += pss
+        acc[2] += 1
+
+    totals = {
+        dimension: [list(k) + v for k, v in sorted(acc.items())]
+        for dimension, acc in accumulators.items()
+    }
+    return Rollups(path_depth, totals)
+
+  @staticmethod
+  def FromJson(obj):
+    return Rollups(obj['path_depth'], obj['totals'])
+
+  def ToJson(self):
+    return {'path_depth': self.path_depth, 'totals': self._totals}
+
+  def _Sum(self, dimension, container_name, section_name, key_func):
+    sums = collections.defaultdict(lambda: [0, 0.0, 0])
+    for container, section, value, size, pss, count in self._totals[dimension]:
+      if container_name is not None and container != container_name:
+        continue
+      if section_name is not None and section != section_name:
+        continue
+      acc = sums[key_func(container, section, value)]
+      acc[0] += size
+      acc[1] += pss
+      acc[2] += count
+    return {k: Total(*v) for k, v in sums.items()}
+
+  def BySection(self, container_name=None):
+    """Returns a dict of section name -> Total."""
+    return self._Sum(_COMPONENT, container_name, None, lambda c, s, v: s)
+
+  def ByContainerAndSection(self):
+    """Returns a dict of (container name, section name) -> Total."""
+    return self._Sum(_COMPONENT, None, None, lambda c, s, v: (c, s))
+
+  def ByComponent(self, container_name=None, section_name=None):
+    """Returns a dict of component -> Total."""
+    return self._Sum(_COMPONENT, container_name, section_name,
+                     lambda c, s, v: v)
+
+  def ByPath(self, depth=1, container_name=None, section_name=None):
+    """Returns a dict of directory prefix -> Total.
+
+    Args:
+      depth: Number of leading directories to group by. Symbols in shallower
+          directories are grouped by their full directory, and those without a
+          path are grouped under ''.
+      container_name: When set, include only symbols from this container.
+      section_name: When set, include only symbols from this section.
+    """
+    assert 1 <= depth <= self.path_depth, (
+        'Rollups were stored with path_depth=%d' % self.path_depth)
+    return self._Sum(_PathDimension(depth), container_name, section_name,
+                     lambda c, s, v: v)
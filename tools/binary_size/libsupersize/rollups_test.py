@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import json
+import unittest
+
+import models
+import rollups
+
+
+def _MakeSym(container, section, size, source_path, component=''):
+  ret = models.Symbol(section,
+                      size,
+                      full_name='sym',
+                      source_path=source_path)
+  ret.container = container
+  ret.component = component
+  return ret
+
+
+class RollupsTest(unittest.TestCase):
+
+  def setUp(self):
+    self._container_a = models.Container('A', metadata={}, section_sizes={})
+    self._container_b = models.Container('B', metadata={}, section_sizes={})
+    TEXT = models.SECTION_TEXT
+    RODATA = models.SECTION_RODATA
+    self._symbols = [
+        _MakeSym(self._container_a, TEXT, 10, 'base/strings/a.cc', 'Base'),
+        _MakeSym(self._container_a, TEXT, 20, 'base/b.cc', 'Base'),
+        _MakeSym(self._container_a, RODATA, 30, 'ui/gfx/c.cc', 'UI'),
+        _MakeSym(self._container_b, TEXT, 40, 'd.cc'),
+        _MakeSym(self._container_b, TEXT, 50, ''),
+    ]
+    # Aliases should count towards size but be split for pss.
+    self._symbols[0].aliases = self._symbols[:2]
+    self._symbols[1].aliases = self._symbols[:2]
+    self._rollups = rollups.Rollups.Compute(self._symbols, path_depth=2)
+
+  def testBySection(self):
+    self.assertEqual(
+        {
+            '.text': (120, 105, 4),
+            '.rodata': (30, 30, 1)
+        }, self._rollups.BySection())
+    self.assertEqual({'.text': (90, 90, 2)},
+                     self._rollups.BySection(container_name='B'))
+    self.assertEqual(
+        {
+            ('A', '.text'): (30, 15, 2),
+            ('A', '.rodata'): (30, 30, 1),
+            ('B', '.text'): (90, 90, 2),
+        }, self._rollups.ByContainerAndSection())
+
+  def testByComponent(self):
+    self.assertEqual({
+        'Base': (30, 15, 2),
+        'UI': (30, 30, 1),
+        '': (90, 90, 2)
+    }, self._rollups.ByComponent())
+    self.assertEqual({'Base': (30, 15, 2)},
+                     self._rollups.ByComponent(container_name='A',
+                                               section_name='.text'))
+
+  def testByPath(self):
+    self.assertEqual({
+        'base': (30, 15, 2),
+        'ui': (30, 30, 1),
+        '': (90, 90, 2)
+    }, self._rollups.ByPath(depth=1))
+    self.assertEqual(
+        {
+            'base/strings': (10, 5, 1),
+            'base': (20, 10, 1),
+            'ui/gfx': (30, 30, 1),
+        }, self._rollups.ByPath(depth=2, container_name='A'))
+    with self.assertRaises(AssertionError):
+      self._rollups.ByPath(depth=3)
+
+  def testJsonRoundTrip(self):
+    obj = json.loads(json.dumps(self._rollups.ToJson()))
+    new_rollups = rollups.Rollups.FromJson(obj)
+    self.assertEqual(self._rollups.ByPath(depth=2), new_rollups.ByPath(depth=2))
+    self.assertEqual(self._rollups.BySection(), new_rollups.BySection())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -13,6 +13,12 @@ ReadFileChunks():
 ReadStringLiterals():
   Reads the ELF file to find the string contents of a list of string literals.
 
+StringLiteralReader:
+  Reads (and caches) the contents of string literals on demand, via mmap.
+
+NameStringLiterals():
+  Names string literal symbols after their contents.
+
 ResolveStringPiecesIndirect():
   BulkForkAndCall() target: Given {path: [string addresses]} and
   [raw_string_data for each string_section]:
@@ -35,7 +41,9 @@ import ast
 import collections
 import itertools
 import logging
+import mmap
 import os
+import string
 import subprocess
 
 import ar
@@ -43,6 +51,9 @@ import models
 import parallel
 import path_util
 
+# Names of the symbols that linker maps give to sections of string literals.
+_MERGE_STRINGS_NAMES = ('** merge strings', '** lld merge strings')
+
 
 def LookupElfRodataInfo(elf_path):
   """Returns (address, offset, size) for the .rodata section."""
@@ -295,7 +306,64 @@ def ResolveStringPieces(encoded_strings_by_path, string_data):
   return [parallel.EncodeDictOfLists(x) for x in ret]
 
 
-def ReadStringLiterals(symbols, elf_path, all_rodata=False):
+class StringLiteralReader:
+  """Reads .rodata contents of symbols from an ELF file as they are needed.
+
+  The ELF is memory-mapped on first use, and results are cached, so that
+  reading the same literals again (e.g. from the console) is free.
+  """
+
+  def __init__(self, elf_path):
+    self._elf_path = elf_path
+    self._adjust = None
+    self._file = None
+    self._mmap = None
+    self._data_by_range = {}
+
+  def _Open(self):
+    address, offset, _ = LookupElfRodataInfo(self._elf_path)
+    self._adjust = offset - address
+    self._file = open(self._elf_path, 'rb')
+    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+  def Read(self, symbol):
+    """Returns the bytes of |symbol| (excluding padding)."""
+    key = (symbol.address, symbol.size_without_padding)
+    ret = self._data_by_range.get(key)
+    if ret is None:
+      if self._mmap is None:
+        self._Open()
+      start = symbol.address + self._adjust
+      ret = self._mmap[start:start + key[1]]
+      self._data_by_range[key] = ret
+    return ret
+
+  def Close(self):
+    if self._mmap is not None:
+      self._mmap.close()
+      self._file.close()
+      self._mmap = None
+      self._file = None
+
+
+def _SplitMergeStrings(data):
+  """Yields the \0-terminated strings within a ** merge strings symbol."""
+  start = 0
+  while start < len(data):
+    end = data.find(b'\0', start)
+    if end == -1:
+      end = len(data) - 1
+    # Skip the \0s used as alignment between strings.
+    if end > start:
+      yield data[start:end + 1]
+    start = end + 1
+
+
+def ReadStringLiterals(symbols,
+                       elf_path,
+                       all_rodata=False,
+                       reader=None,
+                       merge_strings=False):
   """Returns an iterable of (symbol, string) for all string literal symbols.
 
   Args:
@@ -303,19 +371,59 @@ def ReadStringLiterals(symbols, elf_path, all_rodata=False):
     elf_path: Path to the executable containing the symbols.
     all_rodata: Assume every symbol within .rodata that ends with a \0 is a
          string literal.
+    reader: A StringLiteralReader for |elf_path| to read (and cache) contents
+         with. If None, one is created for just this call.
+    merge_strings: Also yield a (symbol, string) for each literal within
+         "** merge strings" symbols, which are not broken down into literals
+         when archived with --defer-string-literals.
   """
-  address, offset, _ = LookupElfRodataInfo(elf_path)
-  adjust = offset - address
-  with open(elf_path, 'rb') as f:
+  owns_reader = reader is None
+  if owns_reader:
+    reader = StringLiteralReader(elf_path)
+  try:
     for symbol in symbols:
       if symbol.section != 'r':
         continue
-      f.seek(symbol.address + adjust)
-      data = f.read(symbol.size_without_padding)
       # As of Oct 2017, there are ~90 symbols name .L.str(.##). These appear
       # in the linker map file explicitly, and there doesn't seem to be a
       # pattern as to which variables lose their kConstant name (the more
       # common case), or which string literals don't get moved to
       # ** merge strings (less common).
-      if symbol.IsStringLiteral() or (all_rodata and data and data[-1] == 0):
-        yield ((symbol, data))
+      if symbol.IsStringLiteral():
+        yield symbol, reader.Read(symbol)
+      elif merge_strings and symbol.full_name in _MERGE_STRINGS_NAMES:
+        for data in _SplitMergeStrings(reader.Read(symbol)):
+          yield symbol, data
+      elif all_rodata:
+        data = reader.Read(symbol)
+        if data and data[-1] == 0:
+          yield symbol, data
+  finally:
+    if owns_reader:
+      reader.Close()
+
+
+_PRINTABLE_TBL = [chr(i) in string.printable for i in range(256)]
+
+
+def NameStringLiterals(symbols, elf_path, reader=None):
+  """Assigns ASCII-readable string literals names like "string contents"."""
+  STRING_LENGTH_CUTOFF = 30
+
+  for sym, name in ReadStringLiterals(symbols, elf_path, reader=reader):
+    # Newlines and tabs are used as delimiters in file_format.py
+    # At this point, names still have a terminating null byte.
+    name = name.replace(b'\n', b'').replace(b'\t', b'').strip(b'\00')
+    is_printable = all(_PRINTABLE_TBL[c] for c in name)
+    if is_printable:
+      name = name.decode('ascii')
+      if len(name) > STRING_LENGTH_CUTOFF:
+        name = '"{}[...]"'.format(name[:STRING_LENGTH_CUTOFF])
+      else:
+        name = '"{}"'.format(name)
+    else:
+      name = models.STRING_LITERAL_NAME
+    # String literals do not have distinct template_name / name.
+    sym.full_name = name
+    sym.template_name = name
+    sym.name = name
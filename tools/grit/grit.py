@@ -11,6 +11,7 @@ from __future__ import print_function
 import os
 import sys
 
+import grit.daemon
 import grit.grit_runner
 
 sys.path.append(
@@ -23,9 +24,19 @@ except ImportError:
   crbug_1001171 = None
 
 
+def Main(args):
+  # Let a 'grit daemon' run the tool if there is one.
+  daemon_socket = os.environ.get(grit.daemon.SOCKET_ENV_VAR)
+  if daemon_socket:
+    ret = grit.daemon.ForwardToDaemon(daemon_socket, args)
+    if ret is not None:
+      return ret
+  return grit.grit_runner.Main(args)
+
+
 if __name__ == '__main__':
   if crbug_1001171:
     with crbug_1001171.DumpStateOnLookupError():
-      sys.exit(grit.grit_runner.Main(sys.argv[1:]))
+      sys.exit(Main(sys.argv[1:]))
   else:
-    sys.exit(grit.grit_runner.Main(sys.argv[1:]))
+    sys.exit(Main(sys.argv[1:]))
@@ -36,6 +36,20 @@ class UberClique(object):
     # stable results from the BestClique method, see below.
     self.cliques_ = {}
 
+    # A map from message ID to the order in which it was added to
+    # self.cliques_, so that indexed lookups can return results in the same
+    # order as a scan of self.cliques_ would.
+    self.id_ordinals_ = {}
+
+    # A map from the (real content, meaning) of source messages to the IDs of
+    # the cliques that have them, so that BestCliqueByOriginalText does not
+    # need to look at every clique.
+    self.ids_by_text_ = {}
+
+    # The cliques that belong to at least one shortcut group, keyed by id() to
+    # ignore cliques that are added to several groups.
+    self.shortcut_cliques_ = {}
+
     # A map of clique IDs to list of languages to indicate translations where we
     # fell back to English.
     self.fallback_translations_ = {}
@@ -111,8 +125,12 @@ class UberClique(object):
       self.cliques_[message.GetId()].sort(
           key=lambda c:c.GetMessage().GetDescription())
     else:
+      self.id_ordinals_[message.GetId()] = len(self.cliques_)
       self.cliques_[message.GetId()] = [clique]
 
+    key = (message.GetRealContent(), message.GetMeaning())
+    self.ids_by_text_.setdefault(key, {})[message.GetId()] = True
+
     return clique
 
   def FindCliqueAndAddTranslation(self, translation, language):
@@ -177,10 +195,9 @@ class UberClique(object):
     '''Finds the "best" (as in BestClique()) clique that has original text
     'text' and meaning 'meaning'.  Returns None if there is no such clique.
     '''
-    # If needed, this can be optimized by maintaining a map of
-    # fingerprints of original text+meaning to cliques.
-    for c in self.BestCliquePerId():
-      msg = c.GetMessage()
+    ids = self.ids_by_text_.get((text, meaning), {})
+    for id in sorted(ids, key=self.id_ordinals_.get):
+      msg = self.BestClique(id).GetMessage()
       if msg.GetRealContent() == text and msg.GetMeaning() == meaning:
         return msg
     return None
@@ -198,6 +215,23 @@ class UberClique(object):
       for c in cliques:
         yield c
 
+  def _AddToShortcutGroup(self, clique):
+    self.shortcut_cliques_[id(clique)] = clique
+
+  def CliquesInShortcutGroups(self):
+    '''Returns the cliques created using this factory that belong to at least
+    one shortcut group, in the order they are returned by AllCliques().
+    '''
+    cliques = []
+    for c in self.shortcut_cliques_.values():
+      clique_list = self.cliques_.get(c.GetId(), [])
+      for index, other in enumerate(clique_list):
+        if other is c:
+          cliques.append((self.id_ordinals_[c.GetId()], index, c))
+          break
+    cliques.sort(key=lambda entry: entry[:2])
+    return [c for _, _, c in cliques]
+
   def GenerateXtbParserCallback(self, lang, debug=False):
     '''Creates a callback function as required by grit.xtb_reader.Parse().
     This callback will create Translation objects for each message from
@@ -363,6 +397,7 @@ class MessageClique(object):
 
   def AddToShortcutGroup(self, group):
     self.shortcut_groups.append(group)
+    self.uber_clique._AddToShortcutGroup(self)
 
   def SetCustomType(self, custom_type):
     '''Makes this clique use custom_type for validating messages and
@@ -91,6 +91,32 @@ class MessageCliqueUnittest(unittest.TestCase):
         self.failUnless(description == 'ID: IDS_LL')
     self.failUnless(count_best_cliques == 5)
 
+  def testBestCliqueByOriginalText(self):
+    factory = clique.UberClique()
+    factory.MakeClique(tclib.Message(text='Alfur', description='alfaholl'))
+    factory.MakeClique(tclib.Message(text='Troll', meaning='Vaettur'))
+    factory.MakeClique(tclib.Message(text='Troll', description='ID: IDS_T'))
+    factory.MakeClique(tclib.Message(text='Troll', description='trollkona'))
+
+    msg = factory.BestCliqueByOriginalText('Troll', '')
+    self.assertEqual('trollkona', msg.GetDescription())
+    msg = factory.BestCliqueByOriginalText('Troll', 'Vaettur')
+    self.assertEqual('Vaettur', msg.GetMeaning())
+    self.assertEqual(None, factory.BestCliqueByOriginalText('Gryla', ''))
+    self.assertEqual(None, factory.BestCliqueByOriginalText('Alfur', 'Troll'))
+
+  def testCliquesInShortcutGroups(self):
+    factory = clique.UberClique()
+    a = factory.MakeClique(tclib.Message(text='&Alfur', description='b'))
+    factory.MakeClique(tclib.Message(text='&Troll'))
+    c = factory.MakeClique(tclib.Message(text='&Gryla'))
+    d = factory.MakeClique(tclib.Message(text='&Alfur', description='a'))
+    c.AddToShortcutGroup('group')
+    a.AddToShortcutGroup('group')
+    d.AddToShortcutGroup('group')
+    d.AddToShortcutGroup('other_group')
+    self.assertEqual([d, a, c], factory.CliquesInShortcutGroups())
+
   def testAllInUberClique(self):
     resources = grd_reader.Parse(
         StringIO(u'''<?xml version="1.0" encoding="UTF-8"?>
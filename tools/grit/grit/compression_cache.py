@@ -0,0 +1,147 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+'''A content-addressed cache of compressed resources.
+
+Compressing a resource with brotli or "gzip --rsyncable" requires spawning a
+process, which dominates the time it takes to build .grd files with thousands
+of compressed <include>s.  Since most resources do not change between builds,
+compressed data is stored keyed by a hash of the uncompressed data and of the
+command that compressed it, both in memory and (optionally) on disk, so that it
+can be reused by later builds.
+'''
+
+from __future__ import print_function
+
+import collections
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+# Bump whenever the format of cache entries changes.
+_VERSION = b'1'
+
+# Directory in which to persist entries, or None to cache only in memory.
+_cache_dir = None
+
+# Most recently used entries are kept in memory, up to this many bytes, so that
+# resources shared between .grd files are compressed once per build.
+_MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Map of key -> compressed data, least recently used first.
+_memory_cache = collections.OrderedDict()
+_memory_cache_bytes = 0
+_memory_cache_lock = threading.Lock()
+
+
+def SetCacheDir(cache_dir):
+  '''Sets the directory in which to persist compressed data across builds.
+
+  Args:
+    cache_dir: Path to the directory, or None to cache only in memory.
+  '''
+  global _cache_dir
+  _cache_dir = cache_dir
+
+
+def _CommandKey(command):
+  '''Returns a string identifying |command|, including the tools it runs.'''
+  parts = []
+  for i, arg in enumerate(command):
+    parts.append(arg)
+    path = arg
+    if i == 0 and not os.path.isabs(arg):
+      path = shutil.which(arg) or arg
+    # Include the size and mtime of executables given by path, so that
+    # updating them invalidates previously cached results.
+    if os.path.isabs(path) and os.path.isfile(path):
+      st = os.stat(path)
+      parts.append('%s:%d:%d' % (path, st.st_size, st.st_mtime_ns))
+  return '\0'.join(parts)
+
+
+def _EntryPath(key):
+  return os.path.join(_cache_dir, key[:2], key)
+
+
+def _ReadEntry(key):
+  try:
+    with open(_EntryPath(key), 'rb') as f:
+      return f.read()
+  except (IOError, OSError):
+    return None
+
+
+def _WriteEntry(key, data):
+  path = _EntryPath(key)
+  dirname = os.path.dirname(path)
+  if not os.path.isdir(dirname):
+    try:
+      os.makedirs(dirname)
+    except OSError:
+      # Created by a concurrent build.
+      pass
+  fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
+def Compress(command, data, compress_func):
+  '''Returns |data| compressed by |command|, from the cache if possible.
+
+  Args:
+    command: The compression command line (list of strings).  Together with
+      |data|, this determines the result.
+    data: The uncompressed bytes.
+    compress_func: Called with |data| to compress it when not cached.
+  '''
+  h = hashlib.sha256(_VERSION)
+  h.update(_CommandKey(command).encode('utf-8'))
+  h.update(b'\0')
+  h.update(data)
+  key = h.hexdigest()
+
+  with _memory_cache_lock:
+    ret = _memory_cache.get(key)
+    if ret is not None:
+      _memory_cache.move_to_end(key)
+  if ret is not None:
+    return ret
+
+  if _cache_dir:
+    ret = _ReadEntry(key)
+  if ret is None:
+    ret = compress_func(data)
+    if _cache_dir:
+      _WriteEntry(key, ret)
+
+  _AddToMemoryCache(key, ret)
+  return ret
+
+
+def _AddToMemoryCache(key, data):
+  global _memory_cache_bytes
+  with _memory_cache_lock:
+    if key in _memory_cache:
+      return
+    _memory_cache[key] = data
+    _memory_cache_bytes += len(data)
+    while _memory_cache_bytes > _MEMORY_CACHE_MAX_BYTES:
+      _, evicted = _memory_cache.popitem(last=False)
+      _memory_cache_bytes -= len(evicted)
+
+
+def ClearMemoryCache():
+  '''Forgets entries cached in memory (used by tests).'''
+  global _memory_cache_bytes
+  with _memory_cache_lock:
+    _memory_cache.clear()
+    _memory_cache_bytes = 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+'''Unit tests for grit.compression_cache.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+if __name__ == '__main__':
+  sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import tempfile
+import unittest
+
+from grit import compression_cache
+
+
+class CompressionCacheUnittest(unittest.TestCase):
+
+  def setUp(self):
+    self._cache_dir = tempfile.mkdtemp()
+    self._calls = []
+    compression_cache.ClearMemoryCache()
+    compression_cache.SetCacheDir(self._cache_dir)
+
+  def tearDown(self):
+    compression_cache.SetCacheDir(None)
+    compression_cache.ClearMemoryCache()
+    shutil.rmtree(self._cache_dir)
+
+  def _Compress(self, data):
+    self._calls.append(data)
+    return b'compressed ' + data
+
+  def testMemoryCache(self):
+    compression_cache.SetCacheDir(None)
+    for _ in range(2):
+      self.assertEqual(
+          b'compressed a',
+          compression_cache.Compress(['tool'], b'a', self._Compress))
+    self.assertEqual([b'a'], self._calls)
+    self.assertEqual([], os.listdir(self._cache_dir))
+
+  def testMemoryCacheEvictsLeastRecentlyUsed(self):
+    compression_cache.SetCacheDir(None)
+    old_max_bytes = compression_cache._MEMORY_CACHE_MAX_BYTES
+    # Room for two entries.
+    compression_cache._MEMORY_CACHE_MAX_BYTES = 2 * len(b'compressed a')
+    try:
+      compression_cache.Compress(['tool'], b'a', self._Compress)
+      compression_cache.Compress(['tool'], b'b', self._Compress)
+      compression_cache.Compress(['tool'], b'a', self._Compress)
+      compression_cache.Compress(['tool'], b'c', self._Compress)
+      compression_cache.Compress(['tool'], b'a', self._Compress)
+      compression_cache.Compress(['tool'], b'b', self._Compress)
+    finally:
+      compression_cache._MEMORY_CACHE_MAX_BYTES = old_max_bytes
+    self.assertEqual([b'a', b'b', b'c', b'b'], self._calls)
+
+  def testDiskCache(self):
+    compression_cache.Compress(['tool'], b'a', self._Compress)
+    compression_cache.ClearMemoryCache()
+    self.assertEqual(
+        b'compressed a',
+        compression_cache.Compress(['tool'], b'a', self._Compress))
+    self.assertEqual([b'a'], self._calls)
+
+  def testKeyedByCommandAndData(self):
+    compression_cache.Compress(['tool'], b'a', self._Compress)
+    compression_cache.Compress(['tool'], b'b', self._Compress)
+    compression_cache.Compress(['tool', '--best'], b'a', self._Compress)
+    self.assertEqual([b'a', b'b', b'a'], self._calls)
+
+  def testToolChangeInvalidates(self):
+    tool_path = os.path.join(self._cache_dir, 'tool')
+    with open(tool_path, 'w') as f:
+      f.write('v1')
+    compression_cache.Compress([tool_path], b'a', self._Compress)
+    with open(tool_path, 'w') as f:
+      f.write('v2 is longer')
+    compression_cache.Compress([tool_path], b'a', self._Compress)
+    self.assertEqual([b'a', b'a'], self._calls)
+
+
+if __name__ == '__main__':
+  unittest.main()
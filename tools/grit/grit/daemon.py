@@ -0,0 +1,358 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+'''A server that runs GRIT tools while keeping parsed .grd files in memory.
+
+Every grit invocation normally pays for starting Python, importing GRIT and
+parsing its .grd file, even though the same .grd file is parsed by several
+actions of a build.  Serve() listens on a Unix domain socket and runs each
+request in a forked child process, so that the tools start with GRIT already
+imported and with the trees parsed by earlier requests.  Trees are reused only
+while the files they were parsed from are unchanged.
+
+ForwardToDaemon() is the client side, used by grit.py when the
+GRIT_DAEMON_SOCKET environment variable is set.  Since the tools run in the
+client's directory, environment and standard output/error, the results are the
+same as when running them directly.
+'''
+
+from __future__ import print_function
+
+import collections
+import json
+import os
+import pickle
+import selectors
+import socket
+import sys
+import traceback
+
+# The environment variable that grit.py reads the path of the socket from.
+SOCKET_ENV_VAR = 'GRIT_DAEMON_SOCKET'
+
+# The default maximum number of parsed trees kept in memory.
+DEFAULT_MAX_CACHED_TREES = 64
+
+
+def _ReadAll(fileobj_or_socket):
+  chunks = []
+  while True:
+    if isinstance(fileobj_or_socket, socket.socket):
+      chunk = fileobj_or_socket.recv(65536)
+    else:
+      chunk = os.read(fileobj_or_socket, 65536)
+    if not chunk:
+      return b''.join(chunks)
+    chunks.append(chunk)
+
+
+def ForwardToDaemon(socket_path, args):
+  '''Runs grit with |args| in the daemon listening on |socket_path|.
+
+  The tool runs in the current directory and environment, and writes to the
+  stdout and stderr of this process.
+
+  Args:
+    socket_path: Path of the daemon's socket.
+    args: Command line arguments for grit, e.g. ['-i', 'foo.grd', 'build'].
+
+  Returns:
+    The exit code of the tool, or None if no daemon handled the request, in
+    which case the caller should run the tool itself.
+  '''
+  if not hasattr(socket, 'AF_UNIX') or not hasattr(socket, 'send_fds'):
+    return None
+  request = json.dumps({
+      'args': args,
+      'cwd': os.getcwd(),
+      'env': dict(os.environ),
+  }).encode('utf-8')
+  sys.stdout.flush()
+  sys.stderr.flush()
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      sock.connect(socket_path)
+      socket.send_fds(sock, [b'\0'], [1, 2])
+      sock.sendall(request)
+      sock.shutdown(socket.SHUT_WR)
+      response = _ReadAll(sock)
+  except (IOError, OSError):
+    return None
+  if not response:
+    # The daemon declined the request, e.g. because GRIT was updated.
+    return None
+  return int(response)
+
+
+def _Stamp(path):
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  return (st.st_mtime_ns, st.st_size)
+
+
+def _Stamps(paths):
+  return {os.path.abspath(p): _Stamp(p) for p in paths}
+
+
+def _IsUpToDate(stamps):
+  return all(_Stamp(p) == stamp for p, stamp in stamps.items())
+
+
+def _Freeze(value):
+  if isinstance(value, dict):
+    return tuple(sorted((k, _Freeze(v)) for k, v in value.items()))
+  if isinstance(value, (list, set, frozenset, tuple)):
+    return tuple(sorted(_Freeze(v) for v in value))
+  return value
+
+
+class ParseCache(object):
+  '''Trees parsed from .grd files, used by grd_reader.Parse() (see
+  grd_reader.SetParseCache()).
+
+  Trees are only added by Add(), which the daemon calls for the files its
+  children parsed, since trees parsed by a child are lost when it exits.
+  '''
+
+  def __init__(self, max_entries=DEFAULT_MAX_CACHED_TREES):
+    from grit.extern import FP
+    self._max_entries = max_entries
+    # Map of key -> (tree, {path: stamp}) in least recently used order.
+    self._entries = collections.OrderedDict()
+    # The fingerprint function that message IDs in cached trees are based on.
+    self._fingerprint = FP.UnsignedFingerPrint
+    # (filename, kwargs) for each file that Parse() did not find.
+    self.misses = []
+
+  def _IsUsable(self, kwargs):
+    from grit.extern import FP
+    return not kwargs['debug'] and FP.UnsignedFingerPrint is self._fingerprint
+
+  @staticmethod
+  def _Key(filename, kwargs):
+    # Relative paths in |kwargs| are relative to the current directory.
+    return (os.getcwd(), os.path.abspath(filename), _Freeze(kwargs))
+
+  def Parse(self, filename, kwargs):
+    from grit import grd_reader
+    if self._IsUsable(kwargs):
+      key = self._Key(filename, kwargs)
+      entry = self._entries.get(key)
+      if entry is not None and _IsUpToDate(entry[1]):
+        self._entries.move_to_end(key)
+        return entry[0]
+      self.misses.append((filename, kwargs))
+    return grd_reader.ParseWithDependencies(filename, **kwargs)[0]
+
+  def Add(self, filename, kwargs):
+    '''Parses |filename| and keeps the tree for later calls to Parse().'''
+    from grit import grd_reader
+    if not self._IsUsable(kwargs):
+      return
+    key = self._Key(filename, kwargs)
+    entry = self._entries.get(key)
+    if entry is not None and _IsUpToDate(entry[1]):
+      return
+    root, dependencies = grd_reader.ParseWithDependencies(filename, **kwargs)
+    self._entries[key] = (root, _Stamps(dependencies))
+    self._entries.move_to_end(key)
+    while len(self._entries) > self._max_entries:
+      self._entries.popitem(last=False)
+
+
+def _GritSourceStamps():
+  '''Returns the stamps of the loaded GRIT modules.'''
+  grit_dir = os.path.dirname(os.path.abspath(__file__))
+  paths = set()
+  for module in list(sys.modules.values()):
+    path = getattr(module, '__file__', None)
+    if path and os.path.abspath(path).startswith(grit_dir + os.sep):
+      paths.add(path)
+  return _Stamps(paths)
+
+
+def _ExitCode(code):
+  '''Converts a sys.exit() argument or tool result to an exit code.'''
+  if code is None:
+    return 0
+  if isinstance(code, int):
+    return code
+  print(code, file=sys.stderr)
+  return 1
+
+
+def _RunRequest(request, cache, result_fd):
+  '''Runs a request in a child process and returns its exit code.'''
+  from grit import grd_reader
+  from grit import grit_runner
+
+  os.chdir(request['cwd'])
+  os.environ.clear()
+  os.environ.update(request['env'])
+  cache.misses = []
+  grd_reader.SetParseCache(cache)
+  try:
+    ret = _ExitCode(grit_runner.Main(request['args']))
+  except SystemExit as e:
+    ret = _ExitCode(e.code)
+  except BaseException:
+    traceback.print_exc()
+    ret = 1
+  sys.stdout.flush()
+  sys.stderr.flush()
+  with os.fdopen(result_fd, 'wb') as f:
+    pickle.dump((request['cwd'], cache.misses), f)
+  return ret
+
+
+class _Request(object):
+  def __init__(self, conn, pid, result_fd):
+    self.conn = conn
+    self.pid = pid
+    self.result_fd = result_fd
+    self.result = []
+
+
+def Serve(socket_path, max_cached_trees=DEFAULT_MAX_CACHED_TREES):
+  '''Handles requests sent with ForwardToDaemon() until GRIT is modified.
+
+  Args:
+    socket_path: Path of the Unix domain socket to listen on.
+    max_cached_trees: The maximum number of parsed trees to keep in memory.
+  '''
+  from grit import grit_runner
+
+  # Import everything up front, so that requests do not pay for it.
+  grit_runner.ImportTools()
+  source_stamps = _GritSourceStamps()
+  cache = ParseCache(max_cached_trees)
+
+  if os.path.exists(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      if sock.connect_ex(socket_path) == 0:
+        raise Exception('A daemon is already listening on %s' % socket_path)
+    os.unlink(socket_path)
+
+  server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  server.bind(socket_path)
+  server.listen(128)
+  selector = selectors.DefaultSelector()
+  selector.register(server, selectors.EVENT_READ)
+  pending = {}
+  # (cwd, filename, kwargs) of the files to parse once no request is waiting.
+  misses = collections.deque()
+  try:
+    while server or pending:
+      events = selector.select(0 if misses else None)
+      if not events:
+        _AddToCache(cache, *misses.popleft())
+        continue
+      for key, _ in events:
+        if key.fileobj is server:
+          conn, _ = server.accept()
+          if _GritSourceStamps() != source_stamps:
+            # Let clients run the updated GRIT themselves, and exit once the
+            # requests in flight are done.
+            conn.close()
+            selector.unregister(server)
+            server.close()
+            os.unlink(socket_path)
+            server = None
+            break
+          request = _StartRequest(conn, server, pending, cache)
+          if request:
+            pending[request.result_fd] = request
+            selector.register(request.result_fd, selectors.EVENT_READ)
+        else:
+          request = pending[key.fileobj]
+          chunk = os.read(request.result_fd, 65536)
+          if chunk:
+            request.result.append(chunk)
+            continue
+          selector.unregister(request.result_fd)
+          del pending[request.result_fd]
+          misses.extend(_FinishRequest(request))
+  finally:
+    if server:
+      server.close()
+      os.unlink(socket_path)
+
+
+def _StartRequest(conn, server, pending, cache):
+  try:
+    _, fds, _, _ = socket.recv_fds(conn, 1, 2)
+    request = json.loads(_ReadAll(conn).decode('utf-8'))
+  except (IOError, OSError, ValueError):
+    conn.close()
+    return None
+  if len(fds) != 2:
+    for fd in fds:
+      os.close(fd)
+    conn.close()
+    return None
+
+  read_fd, write_fd = os.pipe()
+  sys.stdout.flush()
+  sys.stderr.flush()
+  pid = os.fork()
+  if pid == 0:
+    ret = 1
+    try:
+      # Only the daemon may close the connections of the requests, so that
+      # clients see them close when the daemon sends their exit code.
+      server.close()
+      conn.close()
+      for other in pending.values():
+        other.conn.close()
+        os.close(other.result_fd)
+      os.close(read_fd)
+      os.dup2(fds[0], 1)
+      os.dup2(fds[1], 2)
+      ret = _RunRequest(request, cache, write_fd)
+    finally:
+      os._exit(ret)
+
+  os.close(write_fd)
+  for fd in fds:
+    os.close(fd)
+  return _Request(conn, pid, read_fd)
+
+
+def _FinishRequest(request):
+  '''Sends the exit code of a request's child to the client.
+
+  Returns:
+    A list of (cwd, filename, kwargs) for the files the child had to parse.
+  '''
+  os.close(request.result_fd)
+  _, status = os.waitpid(request.pid, 0)
+  with request.conn:
+    try:
+      request.conn.sendall(str(os.waitstatus_to_exitcode(status)).encode())
+    except (IOError, OSError):
+      pass
+
+  try:
+    cwd, misses = pickle.loads(b''.join(request.result))
+  except Exception:
+    return []
+  return [(cwd, filename, kwargs) for filename, kwargs in misses]
+
+
+def _AddToCache(cache, cwd, filename, kwargs):
+  '''Parses a file a child had to parse, for the next requests.
+
+  This runs in the daemon's only thread, so Serve() only calls it while no
+  request is waiting to be started or finished.
+  '''
+  old_cwd = os.getcwd()
+  try:
+    os.chdir(cwd)
+    cache.Add(filename, kwargs)
+  except Exception:
+    traceback.print_exc()
+  finally:
+    os.chdir(old_cwd)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+'''Unit tests for grit.daemon.
+'''
+
+from __future__ import print_function
+
+import os
+import sys
+if __name__ == '__main__':
+  sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+from grit import daemon
+from grit import grd_reader
+from grit import util
+from grit.node import message
+
+
+_GRD = '''<?xml version="1.0" encoding="UTF-8"?>
+<grit latest_public_release="2" current_release="3" source_lang_id="en">
+  <outputs>
+    <output filename="resource.h" type="rc_header" />
+  </outputs>
+  <release seq="3">
+    <messages>
+      <part file="messages.grdp" />
+    </messages>
+  </release>
+</grit>'''
+
+_GRDP = '''<?xml version="1.0" encoding="UTF-8"?>
+<grit-part>
+  <message name="IDS_%s">Hello</message>
+</grit-part>'''
+
+
+class DaemonUnittest(unittest.TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    self._grd = os.path.join(self._dir, 'test.grd')
+    with open(self._grd, 'w') as f:
+      f.write(_GRD)
+    self._WritePart('GREETING')
+
+  def tearDown(self):
+    grd_reader.SetParseCache(None)
+    shutil.rmtree(self._dir)
+
+  def _WritePart(self, name):
+    with open(os.path.join(self._dir, 'messages.grdp'), 'w') as f:
+      f.write(_GRDP % name)
+
+  def _MessageNames(self, root):
+    return [node.GetTextualIds()[0]
+            for node in root.GetChildrenOfType(message.MessageNode)]
+
+  def testParseCache(self):
+    cache = daemon.ParseCache()
+    grd_reader.SetParseCache(cache)
+    root = grd_reader.Parse(self._grd)
+    self.assertEqual(['IDS_GREETING'], self._MessageNames(root))
+    self.assertEqual(1, len(cache.misses))
+
+    cache.Add(*cache.misses[0])
+    root = grd_reader.Parse(self._grd)
+    self.assertIs(root, grd_reader.Parse(self._grd))
+    self.assertIsNot(root, grd_reader.Parse(self._grd, defines={'foo': '1'}))
+
+    # Changing a <part> file invalidates the tree.
+    self._WritePart('BYE')
+    self.assertEqual(['IDS_BYE'],
+                     self._MessageNames(grd_reader.Parse(self._grd)))
+
+  def _StartDaemon(self, socket_path):
+    process = subprocess.Popen(
+        [sys.executable, util.PathFromRoot('grit.py'), 'daemon', '-s',
+         socket_path])
+    for _ in range(100):
+      if os.path.exists(socket_path):
+        break
+      time.sleep(0.1)
+    return process
+
+  def testForwardToDaemon(self):
+    socket_path = os.path.join(self._dir, 'socket')
+    self.assertIsNone(daemon.ForwardToDaemon(socket_path, ['help']))
+
+    process = self._StartDaemon(socket_path)
+    try:
+      out_dir = os.path.join(self._dir, 'out')
+      for _ in range(2):
+        self.assertEqual(
+            0,
+            daemon.ForwardToDaemon(socket_path,
+                                   ['-i', self._grd, 'build', '-o', out_dir]))
+      with open(os.path.join(out_dir, 'resource.h')) as f:
+        self.assertIn('IDS_GREETING', f.read())
+      self.assertEqual(
+          2, daemon.ForwardToDaemon(socket_path, ['no_such_tool']))
+    finally:
+      process.terminate()
+      process.wait()
+
+  def testConcurrentRequests(self):
+    socket_path = os.path.join(self._dir, 'socket')
+    process = self._StartDaemon(socket_path)
+    try:
+      # The first request leaves the daemon with the .grd file to parse.
+      self.assertEqual(
+          0,
+          daemon.ForwardToDaemon(
+              socket_path,
+              ['-i', self._grd, 'build', '-o', os.path.join(self._dir, 'out')]))
+
+      results = {}
+      def Build(out_dir):
+        results[out_dir] = daemon.ForwardToDaemon(
+            socket_path, ['-i', self._grd, 'build', '-o', out_dir])
+
+      out_dirs = [os.path.join(self._dir, 'out%d' % i) for i in range(2)]
+      threads = [threading.Thread(target=Build, args=(d,)) for d in out_dirs]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+      self.assertEqual({d: 0 for d in out_dirs}, results)
+      for out_dir in out_dirs:
+        with open(os.path.join(out_dir, 'resource.h')) as f:
+          self.assertIn('IDS_GREETING', f.read())
+    finally:
+      process.terminate()
+      process.wait()
+
+
+if __name__ == '__main__':
+  unittest.main()
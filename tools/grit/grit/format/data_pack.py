@@ -10,9 +10,14 @@ files.
 from __future__ import print_function
 
 import collections
+import collections.abc
+import concurrent.futures
+import hashlib
+import mmap
 import os
 import struct
 import sys
+import threading
 if __name__ == '__main__':
   sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
@@ -77,31 +82,157 @@ class DataPackContents(object):
     # DataPackSizes instance.
     self.sizes = sizes
 
+  def close(self):
+    """Releases the file that |resources| are read from, if any."""
+    if isinstance(self.resources, _MappedResources):
+      self.resources.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
+# Compresses resources for Format(), see _GetCompressionExecutor().
+_compression_executor = None
+_compression_executor_pid = None
+_compression_executor_lock = threading.Lock()
+
+
+def _GetCompressionExecutor():
+  '''Returns the thread pool that compresses resources for all Format() calls.
+
+  Only the compression of resources runs on it (see
+  IncludeNode.PrepareDataPackValue()), so that flattening, minifying, and other
+  work that uses state shared between nodes stays on the calling thread.
+  '''
+  global _compression_executor
+  global _compression_executor_pid
+  with _compression_executor_lock:
+    # Threads do not survive fork(), e.g. of "grit build -j" workers, so forked
+    # processes need a pool of their own.
+    if _compression_executor_pid != os.getpid():
+      _compression_executor = concurrent.futures.ThreadPoolExecutor(
+          os.cpu_count())
+      _compression_executor_pid = os.getpid()
+    return _compression_executor
+
+
+def _MayCompress(node):
+  return (isinstance(node, (include.IncludeNode, structure.StructureNode))
+          and node.attrs.get('compress', 'false') != 'false')
+
 
 def Format(root, lang='en', output_dir='.'):
   """Writes out the data pack file format (platform agnostic resource file)."""
   id_map = root.GetIdMap()
   data = {}
   root.info = []
-  for node in root.ActiveDescendants():
-    with node:
+  nodes = [
+      node for node in root.ActiveDescendants()
       if isinstance(node, (include.IncludeNode, message.MessageNode,
-                           structure.StructureNode)):
-        value = node.GetDataPackValue(lang, util.BINARY)
-        if value is not None:
-          resource_id = id_map[node.GetTextualIds()[0]]
-          data[resource_id] = value
-          root.info.append('{},{},{}'.format(
-              node.attrs.get('name'), resource_id, node.source))
+                           structure.StructureNode))
+  ]
+  # Compressing a resource spawns a brotli or gzip process, so compress
+  # resources concurrently rather than one process at a time.
+  executor = _GetCompressionExecutor()
+  values = []
+  for node in nodes:
+    with node:
+      if _MayCompress(node):
+        values.append(
+            executor.submit(node.PrepareDataPackValue(lang, util.BINARY)))
+      else:
+        values.append(node.GetDataPackValue(lang, util.BINARY))
+  for node, value in zip(nodes, values):
+    with node:
+      if isinstance(value, concurrent.futures.Future):
+        value = value.result()
+      if value is not None:
+        resource_id = id_map[node.GetTextualIds()[0]]
+        data[resource_id] = value
+        root.info.append('{},{},{}'.format(
+            node.attrs.get('name'), resource_id, node.source))
   return WriteDataPackToString(data, UTF8)
 
 
+class _MappedResources(collections.abc.Mapping):
+  """Map of resource_id -> bytes, read on demand from a data pack buffer."""
+
+  def __init__(self, buf, ranges):
+    # bytes or mmap.mmap containing the data pack.
+    self._buf = buf
+    # Map of resource_id -> (start, end) offsets in |buf|.
+    self._ranges = ranges
+
+  def __getitem__(self, resource_id):
+    start, end = self._ranges[resource_id]
+    return self._buf[start:end]
+
+  def __iter__(self):
+    return iter(self._ranges)
+
+  def __len__(self):
+    return len(self._ranges)
+
+  def close(self):
+    if isinstance(self._buf, mmap.mmap):
+      self._buf.close()
+
+
+class _MergedResources(collections.abc.Mapping):
+  """Map of resource_id -> bytes, read on demand from the mapping holding it."""
+
+  def __init__(self, resources_by_id):
+    # Map of resource_id -> the (lazy) resources mapping it is read from.
+    self._resources_by_id = resources_by_id
+
+  def __getitem__(self, resource_id):
+    return self._resources_by_id[resource_id][resource_id]
+
+  def __iter__(self):
+    return iter(self._resources_by_id)
+
+  def __len__(self):
+    return len(self._resources_by_id)
+
+
 def ReadDataPack(input_file):
-  return ReadDataPackFromString(util.ReadFile(input_file, util.BINARY))
+  """Reads a data pack file.
+
+  The file is memory-mapped, and resources are read from it only when accessed,
+  until the returned DataPackContents is closed.
+  """
+  with open(input_file, 'rb') as f:
+    if os.fstat(f.fileno()).st_size == 0:
+      return ReadDataPackFromString(b'')
+    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  encoding, version, ranges, aliases, sizes = _ParseDataPack(buf)
+  return DataPackContents(_MappedResources(buf, ranges), encoding, version,
+                          aliases, sizes)
 
 
 def ReadDataPackFromString(data):
   """Reads a data pack file and returns a dictionary."""
+  encoding, version, ranges, aliases, sizes = _ParseDataPack(data)
+  resources = {}
+  for resource_id, (start, end) in ranges.items():
+    if resource_id in aliases:
+      # Aliases share the object of the resource they alias.
+      resources[resource_id] = resources[aliases[resource_id]]
+    else:
+      resources[resource_id] = data[start:end]
+  return DataPackContents(resources, encoding, version, aliases, sizes)
+
+
+def _ParseDataPack(data):
+  """Parses the header and tables of a data pack.
+
+  Returns:
+    A tuple of (encoding, version, ranges, aliases, sizes), where |ranges| maps
+    resource_id -> (start, end) offsets of its data.
+  """
   # Read the header.
   version = struct.unpack('<I', data[:4])[0]
   if version == 4:
@@ -114,7 +245,7 @@ def ReadDataPackFromString(data):
   else:
     raise WrongFileVersion('Found version: ' + str(version))
 
-  resources = {}
+  ranges = {}
   kIndexEntrySize = 2 + 4  # Each entry is a uint16 and a uint32.
   def entry_at_index(idx):
     offset = header_size + idx * kIndexEntrySize
@@ -123,7 +254,7 @@ def ReadDataPackFromString(data):
   prev_resource_id, prev_offset = entry_at_index(0)
   for i in range(1, resource_count + 1):
     resource_id, offset = entry_at_index(i)
-    resources[prev_resource_id] = data[prev_offset:offset]
+    ranges[prev_resource_id] = (prev_offset, offset)
     prev_resource_id, prev_offset = resource_id, offset
 
   id_table_size = (resource_count + 1) * kIndexEntrySize
@@ -138,7 +269,7 @@ def ReadDataPackFromString(data):
     resource_id, index = alias_at_index(i)
     aliased_id = entry_at_index(index)[0]
     aliases[resource_id] = aliased_id
-    resources[resource_id] = resources[aliased_id]
+    ranges[resource_id] = ranges[aliased_id]
 
   alias_table_size = kAliasEntrySize * alias_count
   sizes = DataPackSizes(
@@ -146,26 +277,53 @@ def ReadDataPackFromString(data):
       len(data) - header_size - id_table_size - alias_table_size)
   assert sizes.total == len(data), 'original={} computed={}'.format(
       len(data), sizes.total)
-  return DataPackContents(resources, encoding, version, aliases, sizes)
+  return encoding, version, ranges, aliases, sizes
 
 
-def WriteDataPackToString(resources, encoding):
-  """Returns bytes with a map of id=>data in the data pack format."""
-  ret = []
+def _EncodeData(data):
+  if isinstance(data, six.text_type):
+    return data.encode('utf-8')
+  return data
 
-  # Compute alias map.
+
+def _DigestData(data):
+  # Text and bytes are never aliased to one another.
+  return (isinstance(data, six.text_type),
+          hashlib.sha256(_EncodeData(data)).digest())
+
+
+def _WriteDataPack(resources, encoding, write, dedup_key=None):
+  """Writes a map of id=>data in the data pack format by calling |write|.
+
+  Args:
+    resources: Map of resource_id -> str or bytes.  Values are read twice, and
+        only one at a time is referenced, so they may be read on demand.
+    encoding: Encoding to write to the header.
+    write: Called with each chunk of bytes of the data pack, in order.
+    dedup_key: Function that returns the key by which resources with identical
+        data are aliased.  Defaults to the data itself.
+  """
+  # Compute alias map, where for duplicates lower IDs are used.
   resource_ids = sorted(resources)
-  # Use reversed() so that for duplicates lower IDs clobber higher ones.
-  id_by_data = {resources[k]: k for k in reversed(resource_ids)}
   # Map of resource_id -> resource_id, where value < key.
-  alias_map = {k: id_by_data[v] for k, v in resources.items()
-               if id_by_data[v] != k}
+  alias_map = {}
+  id_by_key = {}
+  data_sizes = []
+  for resource_id in resource_ids:
+    data = resources[resource_id]
+    key = dedup_key(data) if dedup_key else data
+    canonical_id = id_by_key.setdefault(key, resource_id)
+    if canonical_id != resource_id:
+      alias_map[resource_id] = canonical_id
+    else:
+      data_sizes.append(len(_EncodeData(data)))
+  del id_by_key
 
   # Write file header.
   resource_count = len(resources) - len(alias_map)
   # Padding bytes added for alignment.
-  ret.append(struct.pack('<IBxxxHH', PACK_FILE_VERSION, encoding,
-                         resource_count, len(alias_map)))
+  write(struct.pack('<IBxxxHH', PACK_FILE_VERSION, encoding,
+                    resource_count, len(alias_map)))
   HEADER_LENGTH = 4 + 4 + 2 + 2
 
   # Each main table entry is: uint16 + uint32 (and an extra entry at the end).
@@ -174,39 +332,47 @@ def WriteDataPackToString(resources, encoding):
 
   # Write main table.
   index_by_id = {}
-  deduped_data = []
   index = 0
+  table = []
   for resource_id in resource_ids:
     if resource_id in alias_map:
       continue
-    data = resources[resource_id]
-    if isinstance(data, six.text_type):
-      data = data.encode('utf-8')
     index_by_id[resource_id] = index
-    ret.append(struct.pack('<HI', resource_id, data_offset))
-    data_offset += len(data)
-    deduped_data.append(data)
+    table.append(struct.pack('<HI', resource_id, data_offset))
+    data_offset += data_sizes[index]
     index += 1
 
   assert index == resource_count
   # Add an extra entry at the end.
-  ret.append(struct.pack('<HI', 0, data_offset))
+  table.append(struct.pack('<HI', 0, data_offset))
 
   # Write alias table.
   for resource_id in sorted(alias_map):
     index = index_by_id[alias_map[resource_id]]
-    ret.append(struct.pack('<HH', resource_id, index))
+    table.append(struct.pack('<HH', resource_id, index))
+  write(b''.join(table))
 
   # Write data.
-  ret.extend(deduped_data)
+  for resource_id in resource_ids:
+    if resource_id not in alias_map:
+      write(_EncodeData(resources[resource_id]))
+
+
+def WriteDataPackToString(resources, encoding):
+  """Returns bytes with a map of id=>data in the data pack format."""
+  ret = []
+  _WriteDataPack(resources, encoding, ret.append)
   return b''.join(ret)
 
 
 def WriteDataPack(resources, output_file, encoding):
-  """Writes a map of id=>data into output_file as a data pack."""
-  content = WriteDataPackToString(resources, encoding)
+  """Writes a map of id=>data into output_file as a data pack.
+
+  Resources are written one at a time, so |resources| may be a mapping that
+  reads them on demand (e.g. DataPackContents.resources from ReadDataPack()).
+  """
   with open(output_file, 'wb') as file:
-    file.write(content)
+    _WriteDataPack(resources, encoding, file.write, dedup_key=_DigestData)
 
 
 def ReadGrdInfo(grd_file):
@@ -239,7 +405,6 @@ def RePack(output_file,
       KeyError: if there are duplicate keys or resource encoding is
       inconsistent.
   """
-  input_data_packs = [ReadDataPack(filename) for filename in input_files]
   input_info_files = [filename + '.info' for filename in input_files]
   allowlist = None
   if allowlist_file:
@@ -247,10 +412,29 @@ def RePack(output_file,
     if not lines:
       raise Exception('Allowlist file should not be empty')
     allowlist = set(int(x) for x in lines)
-  inputs = [(p.resources, p.encoding) for p in input_data_packs]
-  resources, encoding = RePackFromDataPackStrings(inputs, allowlist,
+  # Write to a temporary file, since |output_file| may be one of the inputs.
+  tmp_file = output_file + '.tmp'
+  try:
+    # Input files are memory-mapped, and resources are copied from them to the
+    # output file one at a time, so memory use does not grow with their size.
+    # They are closed before replacing the output file, which fails on Windows
+    # while it is mapped.
+    input_data_packs = []
+    try:
+      for filename in input_files:
+        input_data_packs.append(ReadDataPack(filename))
+      inputs = [(p.resources, p.encoding) for p in input_data_packs]
+      resources_by_id, encoding = _MergeDataPacks(inputs, allowlist,
                                                   suppress_removed_key_output)
-  WriteDataPack(resources, output_file, encoding)
+      WriteDataPack(_MergedResources(resources_by_id), tmp_file, encoding)
+    finally:
+      for input_data_pack in input_data_packs:
+        input_data_pack.close()
+    os.replace(tmp_file, output_file)
+  except BaseException:
+    if os.path.exists(tmp_file):
+      os.unlink(tmp_file)
+    raise
   if output_info_filepath is None:
     output_info_filepath = output_file + '.info'
   with open(output_info_filepath, 'w') as output_info_file:
@@ -277,6 +461,19 @@ def RePackFromDataPackStrings(inputs,
       KeyError: if there are duplicate keys or resource encoding is
       inconsistent.
   """
+  resources_by_id, encoding = _MergeDataPacks(inputs, allowlist,
+                                              suppress_removed_key_output)
+  resources = {k: v[k] for k, v in resources_by_id.items()}
+  return resources, encoding
+
+
+def _MergeDataPacks(inputs, allowlist, suppress_removed_key_output=False):
+  """Implements RePackFromDataPackStrings() without reading any resources.
+
+  Returns:
+      Returns (resources_by_id, encoding), where resources_by_id maps
+      resource_id -> the input resources_by_id it is found in.
+  """
   resources = {}
   encoding = None
   for input_resources, input_encoding in inputs:
@@ -296,10 +493,8 @@ def RePackFromDataPackStrings(inputs,
                      ' vs ' + str(input_encoding))
 
     if allowlist:
-      allowlisted_resources = dict([(key, input_resources[key])
-                                    for key in input_resources.keys()
-                                    if key in allowlist])
-      resources.update(allowlisted_resources)
+      resources.update((key, input_resources) for key in input_resources
+                       if key in allowlist)
       removed_keys = [
           key for key in input_resources.keys() if key not in allowlist
       ]
@@ -307,7 +502,7 @@ def RePackFromDataPackStrings(inputs,
         for key in removed_keys:
           print('RePackFromDataPackStrings Removed Key:', key)
     else:
-      resources.update(input_resources)
+      resources.update((key, input_resources) for key in input_resources)
 
   # Encoding is 0 for BINARY, 1 for UTF8 and 2 for UTF16
   if encoding is None:
@@ -13,7 +13,9 @@ if __name__ == '__main__':
   sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 import unittest
+from unittest import mock
 
+from grit import util
 from grit.format import data_pack
 
 
@@ -112,6 +114,75 @@ class FormatDataPackUnittest(unittest.TestCase):
     self.assertDictEqual(expected_without_allowlist, output,
                          'Incorrect resource output')
 
+  def testReadDataPackIsLazy(self):
+    resources = {1: b'one', 2: b'two', 3: b'one', 4: b''}
+    tmp_dir = util.TempDir({})
+    pak_path = tmp_dir.GetPath('test.pak')
+    data_pack.WriteDataPack(resources, pak_path, data_pack.BINARY)
+    with open(pak_path, 'rb') as f:
+      self.assertEqual(
+          data_pack.WriteDataPackToString(resources, data_pack.BINARY),
+          f.read())
+
+    with data_pack.ReadDataPack(pak_path) as loaded:
+      self.assertNotIsInstance(loaded.resources, dict)
+      self.assertEqual(resources, dict(loaded.resources))
+      self.assertEqual({3: 1}, loaded.aliases)
+    self.assertRaises(ValueError, loaded.resources.__getitem__, 1)
+    tmp_dir.CleanUp()
+
+  def testRePack(self):
+    inputs = [{1: b'a', 2: b'shared', 3: b'b'}, {10: b'shared', 11: b'c'}]
+    tmp_dir = util.TempDir({})
+    input_paths = []
+    for i, resources in enumerate(inputs):
+      path = tmp_dir.GetPath('input%d.pak' % i)
+      data_pack.WriteDataPack(resources, path, data_pack.UTF8)
+      with open(path + '.info', 'w') as f:
+        f.write('info%d\n' % i)
+      input_paths.append(path)
+
+    for allowlist in (None, [1, 2, 10]):
+      allowlist_path = None
+      if allowlist:
+        allowlist_path = tmp_dir.GetPath('allowlist.txt')
+        with open(allowlist_path, 'w') as f:
+          f.write('\n'.join(str(x) for x in allowlist))
+      output_path = tmp_dir.GetPath('output.pak')
+      data_pack.RePack(output_path, input_paths, allowlist_file=allowlist_path,
+                       suppress_removed_key_output=True)
+
+      expected, _ = data_pack.RePackFromDataPackStrings(
+          [(i, data_pack.UTF8) for i in inputs], allowlist,
+          suppress_removed_key_output=True)
+      with open(output_path, 'rb') as f:
+        self.assertEqual(
+            data_pack.WriteDataPackToString(expected, data_pack.UTF8), f.read())
+      with open(output_path + '.info') as f:
+        self.assertEqual('info0\ninfo1\n', f.read())
+
+    # The output may be one of the inputs.
+    data_pack.RePack(input_paths[0], input_paths)
+    with data_pack.ReadDataPack(input_paths[0]) as output:
+      self.assertEqual([1, 2, 3, 10, 11], sorted(output.resources))
+    tmp_dir.CleanUp()
+
+  def testRePackRemovesTemporaryFileOnError(self):
+    tmp_dir = util.TempDir({})
+    input_path = tmp_dir.GetPath('input.pak')
+    data_pack.WriteDataPack({1: b'a'}, input_path, data_pack.UTF8)
+    output_path = tmp_dir.GetPath('output.pak')
+
+    def WriteAndFail(resources, output_file, encoding):
+      with open(output_file, 'wb') as f:
+        f.write(b'partial')
+      raise IOError('Disk full')
+
+    with mock.patch.object(data_pack, 'WriteDataPack', WriteAndFail):
+      self.assertRaises(IOError, data_pack.RePack, output_path, [input_path])
+    self.assertEqual(['input.pak'], os.listdir(tmp_dir.GetPath()))
+    tmp_dir.CleanUp()
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -10,6 +10,23 @@ import gzip
 import io
 import subprocess
 
+from grit import compression_cache
+
+_GZIP_RSYNCABLE_COMMAND = ['gzip', '--stdout', '--rsyncable', '--best',
+                           '--no-name']
+
+
+def _RunGzipRsyncable(data):
+  gzip_proc = subprocess.Popen(_GZIP_RSYNCABLE_COMMAND,
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+  data, stderr = gzip_proc.communicate(data)
+  if gzip_proc.returncode != 0:
+    raise subprocess.CalledProcessError(gzip_proc.returncode, 'gzip',
+                                        stderr)
+  return data
+
 
 def GzipStringRsyncable(data):
   # Make call to host system's gzip to get access to --rsyncable option. This
@@ -18,18 +35,10 @@ def GzipStringRsyncable(data):
   # Instead, --rsyncable breaks the file into small chunks, so that one doesn't
   # affect the other in compression, and then only that chunk will have to be
   # updated.
-  gzip_proc = subprocess.Popen(['gzip', '--stdout', '--rsyncable',
-                                '--best', '--no-name'],
-                               stdin=subprocess.PIPE,
-                               stdout=subprocess.PIPE,
-                               stderr=subprocess.PIPE)
   if isinstance(data, str):
     data = data.encode('utf8')
-  data, stderr = gzip_proc.communicate(data)
-  if gzip_proc.returncode != 0:
-    raise subprocess.CalledProcessError(gzip_proc.returncode, 'gzip',
-                                        stderr)
-  return data
+  return compression_cache.Compress(_GZIP_RSYNCABLE_COMMAND, data,
+                                    _RunGzipRsyncable)
 
 
 def GzipString(data):
@@ -16,7 +16,10 @@ import os
 import re
 import sys
 import base64
+import hashlib
+import json
 import mimetypes
+import tempfile
 
 from grit import lazy_re
 from grit import util
@@ -80,6 +83,143 @@ _ICON_RE = lazy_re.compile(
     re.MULTILINE)
 
 
+# Directory in which DoInline() results are cached, or None to disable caching.
+_cache_dir = None
+
+# Bump whenever the format of cache entries changes.
+_CACHE_VERSION = 1
+
+# Maximum number of results (e.g. for different defines) to keep per file.
+_MAX_CACHE_ENTRIES_PER_KEY = 4
+
+# Map of cache key -> list of cache entries, most recently stored first.
+_memory_cache = {}
+
+
+def SetCacheDir(cache_dir):
+  """Enables caching of DoInline() results across builds.
+
+  Results are stored along with the size, mtime and content hash of every file
+  they were computed from, and the outcome of every <if> expression that was
+  evaluated, and are reused only while all of these are unchanged.
+
+  Args:
+    cache_dir: Path to the directory to store results in, or None to disable
+        caching.
+  """
+  global _cache_dir
+  _cache_dir = cache_dir
+  _memory_cache.clear()
+
+
+class _ConditionRecorder(object):
+  """Wraps a grd node to record the conditions that were evaluated."""
+
+  def __init__(self, grd_node):
+    self._grd_node = grd_node
+    self.conditions = {}
+
+  def EvaluateCondition(self, expr):
+    ret = self._grd_node.EvaluateCondition(expr)
+    self.conditions[expr] = ret
+    return ret
+
+
+def _FileFingerprint(path, old_fingerprint=None):
+  """Returns [size, mtime, sha1] of |path|, or None if it does not exist.
+
+  If the size and mtime match those of |old_fingerprint|, the file is not
+  re-hashed.
+  """
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  stat_key = [st.st_size, st.st_mtime_ns]
+  if old_fingerprint and old_fingerprint[:2] == stat_key:
+    return old_fingerprint
+  with open(path, 'rb') as f:
+    return stat_key + [hashlib.sha1(f.read()).hexdigest()]
+
+
+def _CacheKey(input_filename, grd_node, **kwargs):
+  key_parts = [
+      _CACHE_VERSION,
+      os.path.abspath(input_filename),
+      grd_node is None,
+      GetDistribution(),
+      minifier.GetMinifierCommands(),
+      sorted(kwargs.items()),
+  ]
+  return hashlib.sha1(json.dumps(key_parts).encode('utf-8')).hexdigest()
+
+
+def _CachePath(key):
+  return os.path.join(_cache_dir, key[:2], key + '.json')
+
+
+def _ReadCacheEntries(key):
+  entries = _memory_cache.get(key)
+  if entries is None:
+    try:
+      with open(_CachePath(key)) as f:
+        entries = json.load(f)
+    except (IOError, OSError, ValueError):
+      entries = []
+    _memory_cache[key] = entries
+  return entries
+
+
+def _IsCacheEntryValid(entry, grd_node):
+  for path, fingerprint in entry['deps'].items():
+    new_fingerprint = _FileFingerprint(path, fingerprint)
+    if (new_fingerprint is None) != (fingerprint is None):
+      return False
+    if fingerprint and new_fingerprint[2] != fingerprint[2]:
+      return False
+  # Evaluating conditions through |grd_node| also records them, when it is
+  # the _ConditionRecorder of an enclosing DoInline().
+  return all(grd_node.EvaluateCondition(expr) == value
+             for expr, value in entry['conditions'].items())
+
+
+def _LookupCache(key, grd_node):
+  for entry in _ReadCacheEntries(key):
+    if _IsCacheEntryValid(entry, grd_node):
+      return InlinedData(entry['inlined_data'], set(entry['inlined_files']))
+  return None
+
+
+def _StoreCache(key, input_filename, conditions, inlined_data):
+  paths = set(os.path.abspath(p) for p in inlined_data.inlined_files)
+  paths.add(os.path.abspath(input_filename))
+  entry = {
+      'deps': {p: _FileFingerprint(p) for p in sorted(paths)},
+      'conditions': conditions,
+      'inlined_data': inlined_data.inlined_data,
+      'inlined_files': sorted(inlined_data.inlined_files),
+  }
+  entries = [entry] + _ReadCacheEntries(key)[:_MAX_CACHE_ENTRIES_PER_KEY - 1]
+  _memory_cache[key] = entries
+
+  path = _CachePath(key)
+  dirname = os.path.dirname(path)
+  if not os.path.isdir(dirname):
+    try:
+      os.makedirs(dirname)
+    except OSError:
+      # Created by a concurrent build.
+      pass
+  fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'w') as f:
+      json.dump(entries, f)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
 def GetDistribution():
   """Helper function that gets the distribution we are building.
 
@@ -350,6 +490,10 @@ def DoInline(
   inline the files they are referring to, then returns the result and
   the set of inlined files.
 
+  If a cache directory has been set (see SetCacheDir()), results are reused
+  when none of their inputs changed.  Since recursive calls are cached too,
+  only the files that changed (and those that inline them) are re-inlined.
+
   Args:
     input_filename: name of file to read in
     grd_node: html node from the grd file for this include tag
@@ -364,6 +508,41 @@ def DoInline(
     a tuple of the inlined data as a string and the set of filenames
     of all the inlined files
   """
+  # Results of arbitrary functions cannot be cached.
+  if _cache_dir is None or rewrite_function or filename_expansion_function:
+    return _DoInline(input_filename, grd_node,
+                     allow_external_script=allow_external_script,
+                     preprocess_only=preprocess_only,
+                     names_only=names_only,
+                     strip_whitespace=strip_whitespace,
+                     rewrite_function=rewrite_function,
+                     filename_expansion_function=filename_expansion_function)
+
+  key = _CacheKey(input_filename, grd_node,
+                  allow_external_script=allow_external_script,
+                  preprocess_only=preprocess_only,
+                  names_only=names_only,
+                  strip_whitespace=strip_whitespace)
+  ret = _LookupCache(key, grd_node)
+  if ret is None:
+    recorder = None
+    if grd_node is not None:
+      recorder = _ConditionRecorder(grd_node)
+    ret = _DoInline(input_filename, recorder,
+                    allow_external_script=allow_external_script,
+                    preprocess_only=preprocess_only,
+                    names_only=names_only,
+                    strip_whitespace=strip_whitespace)
+    _StoreCache(key, input_filename, recorder.conditions if recorder else {},
+                ret)
+  return ret
+
+
+def _DoInline(
+    input_filename, grd_node, allow_external_script=False,
+    preprocess_only=False, names_only=False, strip_whitespace=False,
+    rewrite_function=None, filename_expansion_function=None):
+  """Implements DoInline() (without caching)."""
   if filename_expansion_function:
     input_filename = filename_expansion_function(input_filename)
   input_filepath = os.path.dirname(input_filename)
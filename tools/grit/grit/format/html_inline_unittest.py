@@ -1088,5 +1088,66 @@ L17 /*grit-removed-lines:4*/
 
     tmp_dir.CleanUp()
 
+  def testCache(self):
+    '''Tests that results are reused only while their inputs are unchanged.'''
+
+    files = {
+      'index.html': '''
+      <include src="a.html">
+      <include src="b.html">
+      ''',
+      'a.html': '''<if expr="is_a">A</if>''',
+      'b.html': '''B''',
+    }
+
+    class GrdNode(object):
+      def __init__(self, is_a):
+        self.is_a = is_a
+
+      def EvaluateCondition(self, cond):
+        return eval(cond, {'is_a': self.is_a})
+
+    tmp_dir = util.TempDir(files)
+    cache_dir = util.TempDir({})
+    index_path = tmp_dir.GetPath('index.html')
+    inlined_paths = []
+    orig_do_inline = html_inline._DoInline
+    def RecordingDoInline(input_filename, *args, **kwargs):
+      inlined_paths.append(os.path.basename(input_filename))
+      return orig_do_inline(input_filename, *args, **kwargs)
+
+    html_inline.SetCacheDir(cache_dir.GetPath())
+    html_inline._DoInline = RecordingDoInline
+    try:
+      def Inline(is_a=True):
+        return util.FixLineEnd(
+            html_inline.DoInline(index_path, GrdNode(is_a)).inlined_data, '\n')
+
+      expected = Inline()
+      self.assertIn('A', expected)
+      self.assertEqual(['index.html', 'a.html', 'b.html'], inlined_paths)
+
+      # Unchanged inputs are served from the cache, also in later builds.
+      del inlined_paths[:]
+      html_inline.SetCacheDir(cache_dir.GetPath())
+      self.assertEqual(expected, Inline())
+      self.assertEqual([], inlined_paths)
+
+      # Conditions that evaluate differently invalidate results.
+      self.assertNotIn('A', Inline(is_a=False))
+      self.assertEqual(['index.html', 'a.html'], inlined_paths)
+
+      # Only changed files (and those that include them) are re-inlined.
+      del inlined_paths[:]
+      with open(tmp_dir.GetPath('b.html'), 'w') as f:
+        f.write('Changed B')
+      self.assertIn('Changed B', Inline())
+      self.assertEqual(['index.html', 'b.html'], inlined_paths)
+    finally:
+      html_inline._DoInline = orig_do_inline
+      html_inline.SetCacheDir(None)
+      cache_dir.CleanUp()
+      tmp_dir.CleanUp()
+
 if __name__ == '__main__':
   unittest.main()
@@ -22,6 +22,10 @@ def SetCssMinifier(minifier):
   global __css_minifier
   __css_minifier = minifier.split()
 
+def GetMinifierCommands():
+  """Returns the (JS, CSS) minifier commands, or None where unset."""
+  return __js_minifier, __css_minifier
+
 def Minify(source, filename):
   """Minify |source| (bytes) from |filename| and return bytes."""
   file_type = path.splitext(filename)[1]
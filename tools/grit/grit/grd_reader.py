@@ -21,6 +21,11 @@ from grit.node import mapping
 from grit.node import misc
 
 
+# An object that Parse() uses to look up trees parsed from files, see
+# SetParseCache().
+_parse_cache = None
+
+
 class StopParsingException(Exception):
   '''An exception used to stop parsing.'''
   pass
@@ -46,6 +51,8 @@ class GrdContentHandler(xml.sax.handler.ContentHandler):
     self.target_platform = target_platform
     self.source = source
     self.skip_validation_checks = skip_validation_checks
+    # The paths of the <part> files that have been parsed.
+    self.part_files = []
 
   def startElement(self, name, attrs):
     if self.ignore_depth or name in self.tags_to_ignore:
@@ -95,6 +102,7 @@ class GrdContentHandler(xml.sax.handler.ContentHandler):
       if not os.path.exists(partname):
         raise exception.FileNotFound(partname)
       # Exceptions propagate to the handler in grd_reader.Parse().
+      self.part_files.append(partname)
       oldsource = self.source
       try:
         self.source = partname
@@ -199,7 +207,48 @@ def Parse(filename_or_stream,
   Throws:
     grit.exception.Parsing
   '''
+  if (_parse_cache is not None
+      and isinstance(filename_or_stream, six.string_types)):
+    return _parse_cache.Parse(
+        filename_or_stream,
+        dict(dir=dir,
+             stop_after=stop_after,
+             first_ids_file=first_ids_file,
+             debug=debug,
+             defines=defines,
+             tags_to_ignore=tags_to_ignore,
+             target_platform=target_platform,
+             predetermined_ids_file=predetermined_ids_file,
+             skip_validation_checks=skip_validation_checks))
+
+  return ParseWithDependencies(filename_or_stream,
+                               dir=dir,
+                               stop_after=stop_after,
+                               first_ids_file=first_ids_file,
+                               debug=debug,
+                               defines=defines,
+                               tags_to_ignore=tags_to_ignore,
+                               target_platform=target_platform,
+                               predetermined_ids_file=predetermined_ids_file,
+                               skip_validation_checks=skip_validation_checks)[0]
+
+
+def ParseWithDependencies(filename_or_stream,
+                          dir=None,
+                          stop_after=None,
+                          first_ids_file=None,
+                          debug=False,
+                          defines=None,
+                          tags_to_ignore=None,
+                          target_platform=None,
+                          predetermined_ids_file=None,
+                          skip_validation_checks=False):
+  '''Like Parse(), but never uses the parse cache and also returns the paths
+  of the files that were read to build the tree.
 
+  Return:
+    (grit.node.base.Node, ['file1.grd', 'file2.grdp', ...])
+  '''
   if isinstance(filename_or_stream, six.string_types):
     source = filename_or_stream
     if dir is None:
@@ -233,6 +282,11 @@ def Parse(filename_or_stream,
     assert dir is not None
     handler.root.SetOwnDir(dir)
 
+  dependencies = []
+  if source:
+    dependencies.append(source)
+  dependencies.extend(handler.part_files)
+
   if isinstance(handler.root, misc.GritNode):
     handler.root.SetPredeterminedIdsFile(predetermined_ids_file)
     if first_ids_file:
@@ -246,8 +300,22 @@ def Parse(filename_or_stream,
       handler.root.attrs['first_ids_file'] = first_ids_file
     # Assign first ids to the nodes that don't have them.
     handler.root.AssignFirstIds(filename_or_stream, defines)
+    # The attributes of the root are incomplete when stopping early.
+    if handler.root.attrs.get('first_ids_file'):
+      dependencies.append(handler.root.GetFirstIdsFile())
 
-  return handler.root
+  return handler.root, dependencies
+
+
+def SetParseCache(parse_cache):
+  '''Makes Parse() delegate parsing files given by path to |parse_cache|.
+
+  Args:
+    parse_cache: None, or an object with a Parse(filename, kwargs) method that
+        returns the same tree as ParseWithDependencies(filename, **kwargs).
+  '''
+  global _parse_cache
+  _parse_cache = parse_cache
 
 
 if __name__ == '__main__':
@@ -34,6 +34,10 @@ def ToolFactoryCount():
   import grit.tool.count
   return grit.tool.count.CountMessage()
 
+def ToolFactoryDaemon():
+  import grit.tool.daemon
+  return grit.tool.daemon.Daemon()
+
 def ToolFactoryDiffStructures():
   import grit.tool.diff_structures
   return grit.tool.diff_structures.DiffStructures()
@@ -104,6 +108,10 @@ _TOOLS = [
         _FACTORY: ToolFactoryCount,
         _REQUIRES_INPUT: True
     }],
+    ['daemon', {
+        _FACTORY: ToolFactoryDaemon,
+        _REQUIRES_INPUT: False
+    }],
     [
         'menufromparts',
         {
@@ -158,6 +166,12 @@ _TOOLS = [
 ]
 
 
+def ImportTools():
+  """Imports the modules of all tools, which is otherwise done on first use."""
+  for (_, info) in _TOOLS:
+    info[_FACTORY]()
+
+
 def PrintUsage():
   tool_list = ''
   for (tool, info) in _TOOLS:
@@ -6,6 +6,8 @@
 
 import subprocess
 
+from grit import compression_cache
+
 __brotli_executable = None
 
 
@@ -20,9 +22,14 @@ def BrotliCompress(data):
   if not __brotli_executable:
     raise Exception('Add "use_brotli = true" to you GN grit(...) target ' +
                     'if you want to use brotli.')
-  compress = subprocess.Popen(__brotli_executable + ['-', '-f'],
-                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-  return compress.communicate(data)[0]
+  command = __brotli_executable + ['-', '-f']
+
+  def Run(data):
+    compress = subprocess.Popen(command,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    return compress.communicate(data)[0]
+
+  return compression_cache.Compress(command, data, Run)
 
 def IsInitialized():
   global __brotli_executable
@@ -100,6 +100,16 @@ class IncludeNode(base.Node):
 
   def GetDataPackValue(self, lang, encoding):
     '''Returns bytes or a str represenation for a data_pack entry.'''
+    return self.PrepareDataPackValue(lang, encoding)()
+
+  def PrepareDataPackValue(self, lang, encoding):
+    '''Like GetDataPackValue(), but leaves out compressing the data.
+
+    Returns:
+      A function that returns the data_pack entry.  It only compresses the data,
+      which touches no state shared with other nodes, so it may be called on
+      another thread.
+    '''
     filename = self.ToRealPath(self.GetInputPath())
     if self.attrs['flattenhtml'] == 'true':
       allow_external_script = self.attrs['allowexternalscript'] == 'true'
@@ -115,7 +125,7 @@ class IncludeNode(base.Node):
 
     # Include does not care about the encoding, because it only returns binary
     # data.
-    return self.CompressDataIfNeeded(data)
+    return lambda: self.CompressDataIfNeeded(data)
 
   def Process(self, output_dir):
     """Rewrite file references to be base64 encoded data URLs.  The new file
@@ -192,6 +192,15 @@ class StructureNode(base.Node):
 
   def GetDataPackValue(self, lang, encoding):
     """Returns a bytes representation for a data_pack entry."""
+    return self.PrepareDataPackValue(lang, encoding)()
+
+  def PrepareDataPackValue(self, lang, encoding):
+    """Like GetDataPackValue(), but leaves out compressing the data.
+
+    Returns:
+      A function that returns the data_pack entry, see
+      IncludeNode.PrepareDataPackValue().
+    """
     if self.ExpandVariables():
       text = self.gatherer.GetText()
       data = util.Encode(self._Substitute(text), encoding)
@@ -199,11 +208,16 @@ class StructureNode(base.Node):
       data = self.gatherer.GetData(lang, encoding)
     if encoding != util.BINARY:
       data = data.encode(encoding)
-    data = self.CompressDataIfNeeded(data)
-    # If the asset is in the Lottie format, indicate it by prepending "LOTTIE".
-    if self.attrs['type'] == 'lottie':
-      data = 'LOTTIE'.encode(self.attrs['output_encoding']) + data
-    return data
+
+    def Finish():
+      compressed = self.CompressDataIfNeeded(data)
+      # If the asset is in the Lottie format, indicate it by prepending
+      # "LOTTIE".
+      if self.attrs['type'] == 'lottie':
+        compressed = 'LOTTIE'.encode(self.attrs['output_encoding']) + compressed
+      return compressed
+
+    return Finish
 
   def GetHtmlResourceFilenames(self):
     """Returns a set of all filenames inlined by this node."""
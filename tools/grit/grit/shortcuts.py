@@ -25,16 +25,18 @@ class ShortcutGroup(object):
     self.keys_by_lang = {}
     # List of cliques in this group
     self.cliques = []
+    # Set of the IDs of the cliques in this group
+    self.clique_ids = set()
 
   def AddClique(self, c):
-    for existing_clique in self.cliques:
-      if existing_clique.GetId() == c.GetId():
-        # This happens e.g. when we have e.g.
-        # <if expr1><structure 1></if> <if expr2><structure 2></if>
-        # where only one will really be included in the output.
-        return
+    if c.GetId() in self.clique_ids:
+      # This happens e.g. when we have e.g.
+      # <if expr1><structure 1></if> <if expr2><structure 2></if>
+      # where only one will really be included in the output.
+      return
 
     self.cliques.append(c)
+    self.clique_ids.add(c.GetId())
     for (lang, msg) in c.clique.items():
       if lang not in self.keys_by_lang:
         self.keys_by_lang[lang] = {}
@@ -83,7 +85,7 @@ def GenerateDuplicateShortcutsWarnings(uberclique, tc_project):
   '''
   warnings = []
   groups = {}
-  for c in uberclique.AllCliques():
+  for c in uberclique.CliquesInShortcutGroups():
     for group in c.shortcut_groups:
       if group not in groups:
         groups[group] = ShortcutGroup(group)
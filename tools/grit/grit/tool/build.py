@@ -12,15 +12,19 @@ import codecs
 import filecmp
 import getopt
 import gzip
+import multiprocessing
 import os
 import shutil
 import sys
 
 import six
 
+from grit import compression_cache
 from grit import grd_reader
 from grit import shortcuts
 from grit import util
+from grit import xtb_reader
+from grit.format import html_inline
 from grit.format import minifier
 from grit.node import brotli_util
 from grit.node import include
@@ -58,6 +62,19 @@ def GetFormatter(type):
     return module.GetFormatter(type)
 
 
+# (RcBuilder, list of <output> nodes) being written by forked worker processes.
+_worker_args = None
+
+
+def _ProcessOutputInWorker(index):
+  '''Writes a single output of |_worker_args| from a worker process.'''
+  builder, outputs = _worker_args
+  builder._ProcessOutput(outputs[index])
+  uber_clique = builder.res.UberClique()
+  return (uber_clique.fallback_translations_,
+          uber_clique.missing_translations_)
+
+
 class RcBuilder(interface.Tool):
   '''A tool that builds RC files and resource header files for compilation.
 
@@ -149,6 +166,26 @@ Options:
                     third_party/brotli/BUILD.gn, required if any entries use
                     compress="brotli".
 
+  --compression-cache-dir DIR
+                    Directory in which to store brotli and gzip compressed
+                    resources, keyed by their contents, so that later builds
+                    do not need to compress unchanged resources again.
+
+  --html-inline-cache-dir DIR
+                    Directory in which to store the results of inlining HTML,
+                    CSS and JS files (flattenhtml="true"), so that later builds
+                    only re-inline the files that changed.
+
+  --xtb-cache-dir DIR
+                    Directory in which to store parsed .xtb files, keyed by
+                    their contents, so that other grit invocations reading the
+                    same translations do not need to parse them again.
+
+  -j JOBS           Number of processes to format outputs (e.g. one per
+                    language) with.  The resource tree is parsed and assigned
+                    IDs once, then shared with the worker processes by forking.
+                    Defaults to 1.  Ignored on platforms without fork().
+
 Conditional inclusion of resources only affects the output of files which
 control which resources get linked into a binary, e.g. it affects .rc files
 meant for compilation but it does not affect resource header files (that define
@@ -161,6 +198,9 @@ are exported to translation interchange files (e.g. XMB files), etc.
 
   def Run(self, opts, args):
     brotli_util.SetBrotliCommand(None)
+    compression_cache.SetCacheDir(None)
+    html_inline.SetCacheDir(None)
+    xtb_reader.SetCacheDir(None)
     os.environ['cwd'] = os.getcwd()
     self.output_directory = '.'
     first_ids_file = None
@@ -177,11 +217,13 @@ are exported to translation interchange files (e.g. XMB files), etc.
     css_minifier = None
     replace_ellipsis = True
     (own_opts, args) = getopt.getopt(
-        args, 'a:p:o:D:E:f:w:t:',
+        args, 'a:p:o:D:E:f:w:t:j:',
         ('depdir=', 'depfile=', 'assert-file-list=', 'help',
          'output-all-resource-defines', 'no-output-all-resource-defines',
          'no-replace-ellipsis', 'depend-on-stamp', 'js-minifier=',
-         'css-minifier=', 'write-only-new=', 'allowlist-support', 'brotli='))
+         'css-minifier=', 'write-only-new=', 'allowlist-support', 'brotli=',
+         'compression-cache-dir=', 'html-inline-cache-dir=',
+         'xtb-cache-dir='))
     for (key, val) in own_opts:
       if key == '-a':
         assert_output_files.append(val)
@@ -209,6 +251,8 @@ are exported to translation interchange files (e.g. XMB files), etc.
         predetermined_ids_file = val
       elif key == '-t':
         target_platform = val
+      elif key == '-j':
+        self.jobs = int(val)
       elif key == '--depdir':
         depdir = val
       elif key == '--depfile':
@@ -225,6 +269,12 @@ are exported to translation interchange files (e.g. XMB files), etc.
         allowlist_support = True
       elif key == '--brotli':
         brotli_util.SetBrotliCommand([os.path.abspath(val)])
+      elif key == '--compression-cache-dir':
+        compression_cache.SetCacheDir(os.path.abspath(val))
+      elif key == '--html-inline-cache-dir':
+        html_inline.SetCacheDir(os.path.abspath(val))
+      elif key == '--xtb-cache-dir':
+        xtb_reader.SetCacheDir(os.path.abspath(val))
       elif key == '--help':
         self.ShowUsage()
         sys.exit(0)
@@ -303,6 +353,9 @@ are exported to translation interchange files (e.g. XMB files), etc.
     # Whether to compare outputs to their old contents before writing.
     self.write_only_new = False
 
+    # Number of processes to write outputs with.
+    self.jobs = 1
+
   @staticmethod
   def AddAllowlistTags(start_node, allowlist_names):
     # Walk the tree of nodes added attributes for the nodes that shouldn't
@@ -367,8 +420,98 @@ are exported to translation interchange files (e.g. XMB files), etc.
     # TODO(gfeher) modify here to set utf-8 encoding for admx/adml
     return 'utf_16'
 
+  def _SetOutputContext(self, output):
+    '''Sets the context for conditional inclusion of resources.'''
+    self.res.SetOutputLanguage(output.GetLanguage())
+    self.res.SetOutputContext(output.GetContext())
+    self.res.SetFallbackToDefaultLayout(output.GetFallbackToDefaultLayout())
+    self.res.SetDefines(self.defines)
+
+  def _ProcessOutput(self, output):
+    '''Writes a single output file.'''
+    self.VerboseOut('Creating %s...' % output.GetOutputFilename())
+
+    self._SetOutputContext(output)
+
+    # Make the output directory if it doesn't exist.
+    self.MakeDirectoriesTo(output.GetOutputFilename())
+
+    # Write the results to a temporary file and only overwrite the original
+    # if the file changed.  This avoids unnecessary rebuilds.
+    out_filename = output.GetOutputFilename()
+    tmp_filename = out_filename + '.tmp'
+    tmpfile = self.fo_create(tmp_filename, 'wb')
+
+    output_type = output.GetType()
+    if output_type != 'data_package':
+      encoding = self._EncodingForOutputType(output_type)
+      tmpfile = util.WrapOutputStream(tmpfile, encoding)
+
+    # Iterate in-order through entire resource tree, calling formatters on
+    # the entry into a node and on exit out of it.
+    with tmpfile:
+      self.ProcessNode(self.res, output, tmpfile)
+
+    if output_type == 'chrome_messages_json_gzip':
+      gz_filename = tmp_filename + '.gz'
+      with open(tmp_filename, 'rb') as tmpfile, open(gz_filename, 'wb') as f:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0) as fgz:
+          shutil.copyfileobj(tmpfile, fgz)
+      os.remove(tmp_filename)
+      tmp_filename = gz_filename
+
+    # Now copy from the temp file back to the real output, but on Windows,
+    # only if the real output doesn't exist or the contents of the file
+    # changed.  This prevents identical headers from being written and .cc
+    # files from recompiling (which is painful on Windows).
+    if not os.path.exists(out_filename):
+      os.rename(tmp_filename, out_filename)
+    else:
+      # CHROMIUM SPECIFIC CHANGE.
+      # This clashes with gyp + vstudio, which expect the output timestamp
+      # to change on a rebuild, even if nothing has changed, so only do
+      # it when opted in.
+      if not self.write_only_new:
+        write_file = True
+      else:
+        files_match = filecmp.cmp(out_filename, tmp_filename)
+        write_file = not files_match
+      if write_file:
+        shutil.copy2(tmp_filename, out_filename)
+      os.remove(tmp_filename)
+
+    self.VerboseOut(' done.\n')
+
+  def _ProcessOutputsInParallel(self, outputs):
+    '''Writes |outputs| from forked worker processes.
+
+    Workers inherit the parsed, ID-assigned tree, so only the index of each
+    output is sent to them.  Translations that were missing or fell back to
+    English are recorded on the UberClique of each worker, so they are sent
+    back and merged (in output order, to keep reports stable).
+    '''
+    global _worker_args
+    _worker_args = (self, outputs)
+    try:
+      context = multiprocessing.get_context('fork')
+      with context.Pool(min(self.jobs, len(outputs))) as pool:
+        results = pool.map(_ProcessOutputInWorker, range(len(outputs)),
+                           chunksize=1)
+    finally:
+      _worker_args = None
+
+    uber_clique = self.res.UberClique()
+    for fallback_translations, missing_translations in results:
+      for dest, src in ((uber_clique.fallback_translations_,
+                         fallback_translations),
+                        (uber_clique.missing_translations_,
+                         missing_translations)):
+        for id, langs in src.items():
+          dest.setdefault(id, {}).update(langs)
+
   def Process(self):
-    for output in self.res.GetOutputFiles():
+    outputs = self.res.GetOutputFiles()
+    for output in outputs:
       output.output_filename = os.path.abspath(os.path.join(
         self.output_directory, output.GetOutputFilename()))
 
@@ -377,67 +520,17 @@ are exported to translation interchange files (e.g. XMB files), etc.
     if self.allowlist_names:
       self.AddAllowlistTags(self.res, self.allowlist_names)
 
-    for output in self.res.GetOutputFiles():
-      self.VerboseOut('Creating %s...' % output.GetOutputFilename())
-
-      # Set the context, for conditional inclusion of resources
-      self.res.SetOutputLanguage(output.GetLanguage())
-      self.res.SetOutputContext(output.GetContext())
-      self.res.SetFallbackToDefaultLayout(output.GetFallbackToDefaultLayout())
-      self.res.SetDefines(self.defines)
-
-      # Assign IDs only once to ensure that all outputs use the same IDs.
-      if self.res.GetIdMap() is None:
-        self.res.InitializeIds()
-
-      # Make the output directory if it doesn't exist.
-      self.MakeDirectoriesTo(output.GetOutputFilename())
-
-      # Write the results to a temporary file and only overwrite the original
-      # if the file changed.  This avoids unnecessary rebuilds.
-      out_filename = output.GetOutputFilename()
-      tmp_filename = out_filename + '.tmp'
-      tmpfile = self.fo_create(tmp_filename, 'wb')
-
-      output_type = output.GetType()
-      if output_type != 'data_package':
-        encoding = self._EncodingForOutputType(output_type)
-        tmpfile = util.WrapOutputStream(tmpfile, encoding)
-
-      # Iterate in-order through entire resource tree, calling formatters on
-      # the entry into a node and on exit out of it.
-      with tmpfile:
-        self.ProcessNode(self.res, output, tmpfile)
-
-      if output_type == 'chrome_messages_json_gzip':
-        gz_filename = tmp_filename + '.gz'
-        with open(tmp_filename, 'rb') as tmpfile, open(gz_filename, 'wb') as f:
-          with gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0) as fgz:
-            shutil.copyfileobj(tmpfile, fgz)
-        os.remove(tmp_filename)
-        tmp_filename = gz_filename
-
-      # Now copy from the temp file back to the real output, but on Windows,
-      # only if the real output doesn't exist or the contents of the file
-      # changed.  This prevents identical headers from being written and .cc
-      # files from recompiling (which is painful on Windows).
-      if not os.path.exists(out_filename):
-        os.rename(tmp_filename, out_filename)
-      else:
-        # CHROMIUM SPECIFIC CHANGE.
-        # This clashes with gyp + vstudio, which expect the output timestamp
-        # to change on a rebuild, even if nothing has changed, so only do
-        # it when opted in.
-        if not self.write_only_new:
-          write_file = True
-        else:
-          files_match = filecmp.cmp(out_filename, tmp_filename)
-          write_file = not files_match
-        if write_file:
-          shutil.copy2(tmp_filename, out_filename)
-        os.remove(tmp_filename)
-
-      self.VerboseOut(' done.\n')
+    # Assign IDs only once to ensure that all outputs use the same IDs.
+    if outputs and self.res.GetIdMap() is None:
+      self._SetOutputContext(outputs[0])
+      self.res.InitializeIds()
+
+    if (self.jobs > 1 and len(outputs) > 1
+        and 'fork' in multiprocessing.get_all_start_methods()):
+      self._ProcessOutputsInParallel(outputs)
+    else:
+      for output in outputs:
+        self._ProcessOutput(output)
 
     # Print warnings if there are any duplicate shortcuts.
     warnings = shortcuts.GenerateDuplicateShortcutsWarnings(
@@ -285,6 +285,29 @@ class BuildUnittest(unittest.TestCase):
     self.assertTrue(abs(third_mtime - UNCHANGED) < 5)
     output_dir.CleanUp()
 
+  def testParallelOutputsMatchSerial(self):
+    class DummyOpts(object):
+      def __init__(self):
+        self.input = util.PathFromRoot('grit/testdata/substitute.grd')
+        self.verbose = False
+        self.extra_verbose = False
+
+    def build_outputs(extra_args):
+      output_dir = util.TempDir({})
+      builder = build.RcBuilder()
+      builder.Run(DummyOpts(), ['-o', output_dir.GetPath()] + extra_args)
+      contents = {}
+      for output in builder.res.GetOutputFiles():
+        filename = output.GetOutputFilename()
+        with open(filename, 'rb') as f:
+          contents[os.path.basename(filename)] = f.read()
+      output_dir.CleanUp()
+      return contents
+
+    serial_contents = build_outputs([])
+    self.assertEqual(3, len(serial_contents))
+    self.assertEqual(serial_contents, build_outputs(['-j', '3']))
+
   def testGenerateDepFileWithDependOnStamp(self):
     output_dir = util.TempDir({})
     builder = build.RcBuilder()
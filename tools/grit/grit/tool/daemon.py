@@ -0,0 +1,70 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+'''The 'grit daemon' tool.
+'''
+
+from __future__ import print_function
+
+import getopt
+import os
+import sys
+
+from grit import daemon
+from grit.tool import interface
+
+
+class Daemon(interface.Tool):
+  '''Runs a server that handles grit invocations, keeping parsed .grd files in
+memory between them.
+
+Usage: grit daemon [-s SOCKET] [--max-cached-trees N]
+
+When the GRIT_DAEMON_SOCKET environment variable is set, grit.py sends its
+command line, current directory, environment and standard output/error to the
+daemon listening on that socket, which runs the tool in a child process.  If
+no daemon is listening, grit.py runs the tool itself.
+
+Parsed .grd files are reused by later invocations with the same arguments
+for as long as the .grd file, its <part> files and its first_ids_file are
+unchanged.  The daemon stops accepting requests once any GRIT source file
+changes, and exits when the requests in flight are done.
+
+Options:
+
+  -s SOCKET         Path of the Unix domain socket to listen on.  Defaults to
+                    the value of GRIT_DAEMON_SOCKET.
+
+  --max-cached-trees N
+                    The maximum number of parsed .grd files to keep in
+                    memory.  Defaults to 64.
+'''
+
+  def ShortDescription(self):
+    return 'Serves grit invocations, reusing parsed .grd files.'
+
+  def Run(self, opts, args):
+    self.SetOptions(opts)
+    socket_path = os.environ.get(daemon.SOCKET_ENV_VAR)
+    max_cached_trees = daemon.DEFAULT_MAX_CACHED_TREES
+    (own_opts, args) = getopt.getopt(args, 's:', ('max-cached-trees=', 'help'))
+    for (key, val) in own_opts:
+      if key == '-s':
+        socket_path = val
+      elif key == '--max-cached-trees':
+        max_cached_trees = int(val)
+      elif key == '--help':
+        self.ShowUsage()
+        sys.exit(0)
+    if args:
+      print('This tool takes no arguments.')
+      return 2
+    if not socket_path:
+      print('Specify the socket to listen on with -s or %s.' %
+            daemon.SOCKET_ENV_VAR)
+      return 2
+
+    self.VerboseOut('Listening on %s\n' % socket_path)
+    daemon.Serve(socket_path, max_cached_trees)
+    return 0
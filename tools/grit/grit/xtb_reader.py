@@ -3,16 +3,45 @@
 # found in the LICENSE file.
 
 '''Fast and efficient parser for XTB files.
+
+Parsing XML dominates the cost of loading translations, and the same .xtb files
+are read by many grit invocations.  When a cache directory is set (see
+SetCacheDir()), the translations of each .xtb file are stored in a compact
+binary form keyed by the file's contents, and later loaded with a single read.
+Conditions (<if expr="...">) are stored with the translations and evaluated at
+load time, so one cache entry serves all defines and target platforms.
 '''
 
 from __future__ import print_function
 
+import hashlib
+import io
+import marshal
+import os
 import sys
+import tempfile
 import xml.sax
 import xml.sax.handler
 
 import grit.node.base
 
+# Bump whenever the format of cache entries changes.
+_CACHE_VERSION = 1
+
+# Directory in which parsed .xtb files are cached, or None to disable caching.
+_cache_dir = None
+
+
+def SetCacheDir(cache_dir):
+  '''Enables caching of parsed .xtb files.
+
+  Args:
+    cache_dir: Path to the directory to store them in, or None to disable
+        caching.
+  '''
+  global _cache_dir
+  _cache_dir = cache_dir
+
 
 class XtbContentHandler(xml.sax.handler.ContentHandler):
   '''A content handler that calls a given callback function for each
@@ -94,6 +123,27 @@ class XtbContentHandler(xml.sax.handler.ContentHandler):
       self.current_structure.append((False, content))
 
 
+class _RecordingXtbContentHandler(XtbContentHandler):
+  '''A content handler that records all translations in the XTB file along
+  with the <if> expression they are in (or None).
+  '''
+
+  def __init__(self):
+    XtbContentHandler.__init__(self, callback=None)
+    # List of (message ID, if expression, tuple of (is_placeholder, text)).
+    self.translations = []
+
+  def endElement(self, name):
+    if name == 'translation':
+      assert self.current_id != 0
+      self.translations.append(
+          (self.current_id, self.if_expr, tuple(self.current_structure)))
+      self.current_id = 0
+      self.current_structure = []
+    else:
+      XtbContentHandler.endElement(self, name)
+
+
 class XtbErrorHandler(xml.sax.handler.ErrorHandler):
   def error(self, exception):
     pass
@@ -126,6 +176,9 @@ def Parse(xtb_file, callback_function, defs=None, debug=False,
   Return:
     The language of the XTB, e.g. 'fr'
   '''
+  if _cache_dir is not None:
+    return _ParseCached(xtb_file, callback_function, defs, target_platform)
+
   # Start by advancing the file pointer past the DOCTYPE thing, as the TC
   # uses a path to the DTD that only works in Unix.
   # TODO(joi) Remove this ugly hack by getting the TC gang to change the
@@ -138,3 +191,77 @@ def Parse(xtb_file, callback_function, defs=None, debug=False,
   xml.sax.parse(xtb_file, handler)
   assert handler.language != ''
   return handler.language
+
+
+def _CachePath(key):
+  return os.path.join(_cache_dir, key[:2], key + '.xtbc')
+
+
+def _ReadCacheEntry(key):
+  try:
+    with open(_CachePath(key), 'rb') as f:
+      return marshal.loads(f.read())
+  except (IOError, OSError, EOFError, ValueError, TypeError):
+    return None
+
+
+def _WriteCacheEntry(key, value):
+  path = _CachePath(key)
+  dirname = os.path.dirname(path)
+  if not os.path.isdir(dirname):
+    try:
+      os.makedirs(dirname)
+    except OSError:
+      # Created by a concurrent build.
+      pass
+  fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(marshal.dumps(value))
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
+def _LoadTranslations(data):
+  '''Returns (language, translations) of the XTB file contents |data|.
+
+  |translations| is a list of (message ID, if expression or None, tuple of
+  (is_placeholder, text)).
+  '''
+  h = hashlib.sha1(b'%d %d.%d ' % ((_CACHE_VERSION,) + sys.version_info[:2]))
+  h.update(data)
+  key = h.hexdigest()
+
+  ret = _ReadCacheEntry(key)
+  if ret is None:
+    xtb_file = io.BytesIO(data)
+    # See Parse() for why the DOCTYPE is skipped.
+    xtb_file.seek(data[:1024].find(b'<translationbundle'))
+    handler = _RecordingXtbContentHandler()
+    xml.sax.parse(xtb_file, handler)
+    ret = (handler.language, handler.translations)
+    _WriteCacheEntry(key, ret)
+  return ret
+
+
+def _ParseCached(xtb_file, callback_function, defs, target_platform):
+  '''Implements Parse() using the cache of parsed XTB files.'''
+  language, translations = _LoadTranslations(xtb_file.read())
+  assert language != ''
+
+  defs = defs or {}
+  target_platform = target_platform or sys.platform
+  # Map of if expression -> whether translations within it are used.  Like
+  # XtbContentHandler, translations in empty expressions are always used.
+  results_by_expr = {None: True, '': True}
+  for msg_id, if_expr, structure in translations:
+    should_run_callback = results_by_expr.get(if_expr)
+    if should_run_callback is None:
+      should_run_callback = grit.node.base.Node.EvaluateExpression(
+          if_expr, defs, target_platform)
+      results_by_expr[if_expr] = should_run_callback
+    if should_run_callback:
+      callback_function(msg_id, list(structure))
+  return language
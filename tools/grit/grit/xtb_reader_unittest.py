@@ -105,6 +105,46 @@ and another after a blank line.</translation>
     with open(path, 'rb') as xtb:
       xtb_reader.Parse(xtb, Callback)
 
+  def testCache(self):
+    xtb_data = b'''<?xml version="1.0" encoding="UTF-8"?>
+      <!DOCTYPE translationbundle>
+      <translationbundle lang="fr">
+        <translation id="1">Un <ph name="NAME"/>.</translation>
+        <if expr="is_linux">
+          <translation id="2">Linux</translation>
+        </if>
+        <if expr="pp_ifdef('foo')">
+          <translation id="3">Foo</translation>
+        </if>
+        <if expr="">
+          <translation id="4">Always</translation>
+        </if>
+      </translationbundle>'''
+
+    def ParseAll(**kwargs):
+      messages = []
+      def Callback(id, structure):
+        messages.append((id, structure))
+      lang = xtb_reader.Parse(io.BytesIO(xtb_data), Callback, **kwargs)
+      return lang, messages
+
+    configs = [{'target_platform': 'linux'},
+               {'target_platform': 'darwin', 'defs': {'foo': True}}]
+    expected = [ParseAll(**c) for c in configs]
+    self.assertEqual(['1', '2', '4'], [m[0] for m in expected[0][1]])
+    self.assertEqual(['1', '3', '4'], [m[0] for m in expected[1][1]])
+
+    cache_dir = util.TempDir({})
+    xtb_reader.SetCacheDir(cache_dir.GetPath())
+    try:
+      # The first parse populates the cache, which serves all configurations.
+      for _ in range(2):
+        self.assertEqual(expected, [ParseAll(**c) for c in configs])
+      self.assertTrue(os.listdir(cache_dir.GetPath()))
+    finally:
+      xtb_reader.SetCacheDir(None)
+      cache_dir.CleanUp()
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Measures the performance of GRIT on synthetic inputs.
+
+Generates a strings .grd with a configurable number of messages and locales
+(with one .xtb file per locale), and a resources .grd with a configurable
+number of <include>d HTML pages that are flattened, and then times each phase
+of building them:
+
+  parse: grd_reader.Parse() of both .grd files.
+  xtb: xtb_reader.Parse() of all .xtb files.
+  gather: SetOutputLanguage() + RunGatherers(), which loads translations.
+  build: RcBuilder.Process(), which writes all outputs.
+  html_inline: html_inline.DoInline() of all pages.
+  write_pak: data_pack.WriteDataPack() of all messages and pages.
+
+Reports the wall time of each phase and, with --trace-allocations, the peak
+and retained memory allocated during it.  With --profile-dir, writes the
+cProfile output of each phase to PROFILE_DIR/PHASE.prof.
+
+Example:
+  tools/grit/grit_benchmark.py --messages 20000 --locales 40 \\
+      --profile-dir /tmp/grit_profiles
+"""
+
+from __future__ import print_function
+
+import argparse
+import cProfile
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_HERE_PATH = os.path.dirname(__file__)
+_SRC_PATH = os.path.normpath(os.path.join(_HERE_PATH, '..', '..'))
+sys.path.insert(0, os.path.join(_SRC_PATH, 'third_party', 'six', 'src'))
+
+from grit import grd_reader
+from grit import util
+from grit import xtb_reader
+from grit.format import data_pack
+from grit.format import html_inline
+from grit.node import message
+from grit.tool import build
+
+_ALL_PHASES = ('parse', 'xtb', 'gather', 'build', 'html_inline', 'write_pak')
+
+_LOCALES = ('am', 'ar', 'bg', 'bn', 'ca', 'cs', 'da', 'de', 'el', 'en-GB',
+            'es', 'es-419', 'et', 'fa', 'fi', 'fil', 'fr', 'gu', 'he', 'hi',
+            'hr', 'hu', 'id', 'it', 'ja', 'kn', 'ko', 'lt', 'lv', 'ml', 'mr',
+            'ms', 'nb', 'nl', 'pl', 'pt-BR', 'pt-PT', 'ro', 'ru', 'sk', 'sl',
+            'sr', 'sv', 'sw', 'ta', 'te', 'th', 'tr', 'uk', 'vi', 'zh-CN',
+            'zh-TW')
+
+_WORDS = ('account', 'bookmark', 'browser', 'cancel', 'download', 'extension',
+          'file', 'history', 'password', 'profile', 'settings', 'sync', 'tab',
+          'window')
+
+# Number of stylesheets and scripts shared by the pages.
+_NUM_SHARED_FILES = 20
+
+
+class _SyntheticGenerator(object):
+  """Writes deterministic .grd, .xtb and HTML files."""
+
+  def __init__(self, work_dir, num_messages, num_locales, num_includes, seed):
+    self._work_dir = work_dir
+    self._num_messages = num_messages
+    self._locales = _LOCALES[:num_locales]
+    self._num_includes = num_includes
+    self._rand = random.Random(seed)
+    self.strings_grd = os.path.join(work_dir, 'benchmark_strings.grd')
+    self.resources_grd = os.path.join(work_dir, 'benchmark_resources.grd')
+    self.xtb_files = [self._XtbPath(lang) for lang in self._locales]
+    self.pages = [
+        os.path.join(work_dir, 'pages', 'page%d.html' % i)
+        for i in range(num_includes)
+    ]
+
+  def _XtbPath(self, lang):
+    return os.path.join(self._work_dir, 'xtb', 'benchmark_%s.xtb' % lang)
+
+  def _Sentence(self, num_words):
+    return ' '.join(self._rand.choice(_WORDS) for _ in range(num_words))
+
+  def _WriteFile(self, path, contents):
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(contents)
+
+  def _WriteStringsGrd(self):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<grit latest_public_release="0" current_release="1">',
+        '  <outputs>',
+        '    <output filename="benchmark_strings.h" type="rc_header">',
+        '      <emit emit_type="prepend"></emit>',
+        '    </output>',
+        '    <output filename="benchmark_strings_en-US.pak" '
+        'type="data_package" lang="en-US" />',
+    ]
+    for lang in self._locales:
+      lines.append('    <output filename="benchmark_strings_%s.pak" '
+                   'type="data_package" lang="%s" />' % (lang, lang))
+    lines.append('  </outputs>')
+    lines.append('  <translations>')
+    for lang in self._locales:
+      lines.append('    <file path="xtb/benchmark_%s.xtb" lang="%s" />' %
+                   (lang, lang))
+    lines.append('  </translations>')
+    lines.append('  <release seq="1">')
+    lines.append('    <messages fallback_to_english="true">')
+    self._message_texts = []
+    for i in range(self._num_messages):
+      text = self._Sentence(self._rand.randrange(2, 12))
+      self._message_texts.append(text)
+      lines.append('      <message name="IDS_BENCHMARK_%d" desc="Message %d">'
+                   '%s <ph name="COUNT">$1<ex>3</ex></ph> %d</message>' %
+                   (i, i, text, i))
+    lines.append('    </messages>')
+    lines.append('  </release>')
+    lines.append('</grit>')
+    self._WriteFile(self.strings_grd, '\n'.join(lines) + '\n')
+
+  def _WriteXtbs(self):
+    # Message IDs are fingerprints of the source messages, so get them from the
+    # parsed .grd file.
+    root = grd_reader.Parse(self.strings_grd)
+    message_ids = [
+        node.GetCliques()[0].GetId()
+        for node in root.GetChildrenOfType(message.MessageNode)
+    ]
+    for lang in self._locales:
+      lines = [
+          '<?xml version="1.0" ?>',
+          '<!DOCTYPE translationbundle>',
+          '<translationbundle lang="%s">' % lang,
+      ]
+      for i, (message_id, text) in enumerate(
+          zip(message_ids, self._message_texts)):
+        lines.append('<translation id="%s">[%s] %s <ph name="COUNT"/> %d'
+                     '</translation>' % (message_id, lang, text.upper(), i))
+      lines.append('</translationbundle>')
+      self._WriteFile(self._XtbPath(lang), '\n'.join(lines) + '\n')
+
+  def _WritePages(self):
+    for i in range(_NUM_SHARED_FILES):
+      self._WriteFile(
+          os.path.join(self._work_dir, 'pages', 'style%d.css' % i),
+          ''.join('.c%d-%d { color: #%06x; }\n' %
+                  (i, j, self._rand.randrange(1 << 24)) for j in range(50)))
+      self._WriteFile(
+          os.path.join(self._work_dir, 'pages', 'script%d.js' % i),
+          ''.join('function f%d_%d() { return "%s"; }\n' %
+                  (i, j, self._Sentence(5)) for j in range(50)))
+    for path in self.pages:
+      shared = self._rand.sample(range(_NUM_SHARED_FILES), 4)
+      body = ''.join('<p class="c%d-%d">%s</p>\n' %
+                     (shared[0], j, self._Sentence(8)) for j in range(40))
+      self._WriteFile(
+          path, '<!doctype html>\n<html>\n<head>\n'
+          '<link rel="stylesheet" href="style%d.css">\n'
+          '<link rel="stylesheet" href="style%d.css">\n'
+          '<script src="script%d.js"></script>\n'
+          '<script src="script%d.js"></script>\n'
+          '</head>\n<body>\n%s</body>\n</html>\n' % (tuple(shared) + (body, )))
+
+  def _WriteResourcesGrd(self):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<grit latest_public_release="0" current_release="1">',
+        '  <outputs>',
+        '    <output filename="benchmark_resources.h" type="rc_header">',
+        '      <emit emit_type="prepend"></emit>',
+        '    </output>',
+        '    <output filename="benchmark_resources.pak" '
+        'type="data_package" />',
+        '  </outputs>',
+        '  <release seq="1">',
+        '    <includes>',
+    ]
+    for i in range(self._num_includes):
+      lines.append('      <include name="IDR_BENCHMARK_PAGE_%d" '
+                   'file="pages/page%d.html" type="BINDATA" '
+                   'flattenhtml="true" />' % (i, i))
+    lines.append('    </includes>')
+    lines.append('  </release>')
+    lines.append('</grit>')
+    self._WriteFile(self.resources_grd, '\n'.join(lines) + '\n')
+
+  def Generate(self):
+    self._WriteStringsGrd()
+    self._WriteXtbs()
+    self._WritePages()
+    self._WriteResourcesGrd()
+
+
+class _Options(object):
+  """The global options that tools expect (see grit_runner.Options)."""
+
+  def __init__(self):
+    self.verbose = False
+    self.extra_verbose = False
+    self.output_stream = sys.stdout
+
+
+class _PhaseRunner(object):
+  """Records the wall time (and optionally allocations) of named phases."""
+
+  def __init__(self, profile_dir=None, trace_allocations=False):
+    self._profile_dir = profile_dir
+    self._trace_allocations = trace_allocations
+    self.results = []
+
+  def Run(self, name, func, *args, **kwargs):
+    gc.collect()
+    profile = None
+    if self._profile_dir:
+      profile = cProfile.Profile()
+    if self._trace_allocations:
+      tracemalloc.start()
+    start = time.time()
+    if profile:
+      ret = profile.runcall(func, *args, **kwargs)
+    else:
+      ret = func(*args, **kwargs)
+    duration = time.time() - start
+    result = {'phase': name, 'seconds': round(duration, 3)}
+    if self._trace_allocations:
+      current, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      result['alloc_peak_mb'] = round(peak / 1e6, 1)
+      result['alloc_retained_mb'] = round(current / 1e6, 1)
+    if profile:
+      profile.dump_stats(os.path.join(self._profile_dir, name + '.prof'))
+    self.results.append(result)
+    return ret
+
+
+def _Build(roots, output_dir):
+  for root in roots:
+    builder = build.RcBuilder()
+    builder.SetOptions(_Options())
+    builder.output_directory = output_dir
+    builder.res = root
+    builder.Process()
+
+
+def _InlinePages(pages):
+  for page in pages:
+    html_inline.DoInline(page, None)
+
+
+def RunBenchmarks(work_dir,
+                  phases,
+                  num_messages=5000,
+                  num_locales=10,
+                  num_includes=200,
+                  seed=0,
+                  profile_dir=None,
+                  trace_allocations=False):
+  """Generates inputs in |work_dir| and runs |phases| on them.
+
+  Returns:
+    A list of dicts with keys: phase, seconds, and (when tracing allocations)
+    alloc_peak_mb, alloc_retained_mb.
+  """
+  generator = _SyntheticGenerator(work_dir, num_messages, num_locales,
+                                  num_includes, seed)
+  generator.Generate()
+  grds = [generator.strings_grd, generator.resources_grd]
+  runner = _PhaseRunner(profile_dir, trace_allocations)
+
+  if 'parse' in phases:
+    runner.Run('parse', lambda: [grd_reader.Parse(grd) for grd in grds])
+
+  if 'xtb' in phases:
+    def LoadXtbs():
+      for xtb_file in generator.xtb_files:
+        with open(xtb_file, 'rb') as f:
+          xtb_reader.Parse(f, lambda id, structure: None)
+    runner.Run('xtb', LoadXtbs)
+
+  if 'gather' in phases or 'build' in phases:
+    roots = [grd_reader.Parse(grd) for grd in grds]
+
+    def Gather():
+      for root in roots:
+        root.SetOutputLanguage('en')
+        root.RunGatherers()
+    runner.Run('gather', Gather)
+
+    if 'build' in phases:
+      output_dir = os.path.join(work_dir, 'out')
+      runner.Run('build', _Build, roots, output_dir)
+    del roots
+
+  if 'html_inline' in phases:
+    runner.Run('html_inline', _InlinePages, generator.pages)
+
+  if 'write_pak' in phases:
+    root = grd_reader.Parse(generator.strings_grd)
+    root.SetOutputLanguage('en')
+    resources = {}
+    for node in root.GetChildrenOfType(message.MessageNode):
+      resources[len(resources) + 1] = node.GetDataPackValue('en', util.BINARY)
+    for page in generator.pages:
+      with open(page, 'rb') as f:
+        resources[len(resources) + 1] = f.read()
+    pak_path = os.path.join(work_dir, 'benchmark.pak')
+    runner.Run('write_pak', data_pack.WriteDataPack, resources, pak_path,
+               data_pack.UTF8)
+
+  return runner.results
+
+
+def _FormatResults(results):
+  columns = [('phase', '%-12s', '%-12s'), ('seconds', '%10s', '%10.3f'),
+             ('alloc_peak_mb', '%14s', '%14.1f'),
+             ('alloc_retained_mb', '%18s', '%18.1f')]
+  columns = [c for c in columns if c[0] in results[0]] if results else []
+  lines = [''.join(header % name for name, header, _ in columns)]
+  for r in results:
+    lines.append(''.join(fmt % r[name] for name, _, fmt in columns))
+  return '\n'.join(lines)
+
+
+def main(argv):
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--messages', type=int, default=5000,
+                      help='Number of messages in the strings .grd file.')
+  parser.add_argument('--locales', type=int, default=10,
+                      help='Number of locales to translate messages into '
+                      '(at most %d).' % len(_LOCALES))
+  parser.add_argument('--includes', type=int, default=200,
+                      help='Number of HTML pages in the resources .grd file.')
+  parser.add_argument('--phases', default=','.join(_ALL_PHASES),
+                      help='Comma-separated subset of: %s' %
+                      ', '.join(_ALL_PHASES))
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--work-dir',
+                      help='Directory for generated files (kept afterwards). '
+                      'Defaults to a temporary directory.')
+  parser.add_argument('--profile-dir',
+                      help='Write the cProfile output of each phase to '
+                      'PROFILE_DIR/PHASE.prof.')
+  parser.add_argument('--trace-allocations', action='store_true',
+                      help='Report memory allocated by each phase (slower).')
+  parser.add_argument('--json-output', help='Write results to this file.')
+  args = parser.parse_args(argv)
+
+  phases = args.phases.split(',')
+  unknown_phases = set(phases) - set(_ALL_PHASES)
+  if unknown_phases:
+    parser.error('Unknown phases: ' + ', '.join(sorted(unknown_phases)))
+  if not 0 <= args.locales <= len(_LOCALES):
+    parser.error('--locales must be at most %d' % len(_LOCALES))
+  if args.profile_dir and not os.path.isdir(args.profile_dir):
+    os.makedirs(args.profile_dir)
+
+  work_dir = args.work_dir or tempfile.mkdtemp(prefix='grit_benchmark')
+  if not os.path.isdir(work_dir):
+    os.makedirs(work_dir)
+  try:
+    results = RunBenchmarks(work_dir,
+                            phases,
+                            num_messages=args.messages,
+                            num_locales=args.locales,
+                            num_includes=args.includes,
+                            seed=args.seed,
+                            profile_dir=args.profile_dir,
+                            trace_allocations=args.trace_allocations)
+  finally:
+    if not args.work_dir:
+      shutil.rmtree(work_dir)
+
+  print(_FormatResults(results))
+  if args.json_output:
+    with open(args.json_output, 'w') as f:
+      json.dump({
+          'messages': args.messages,
+          'locales': args.locales,
+          'includes': args.includes,
+          'results': results,
+      }, f, indent=2)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv[1:]))
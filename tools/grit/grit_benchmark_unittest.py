@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import grit_benchmark
+
+
+class GritBenchmarkTest(unittest.TestCase):
+  def setUp(self):
+    self._work_dir = tempfile.mkdtemp()
+    self._profile_dir = os.path.join(self._work_dir, 'profiles')
+    os.mkdir(self._profile_dir)
+
+  def tearDown(self):
+    shutil.rmtree(self._work_dir)
+
+  def test_all_phases(self):
+    results = grit_benchmark.RunBenchmarks(os.path.join(self._work_dir, 'gen'),
+                                           grit_benchmark._ALL_PHASES,
+                                           num_messages=20,
+                                           num_locales=2,
+                                           num_includes=3,
+                                           profile_dir=self._profile_dir,
+                                           trace_allocations=True)
+    self.assertEqual(list(grit_benchmark._ALL_PHASES),
+                     [r['phase'] for r in results])
+    self.assertIn('alloc_peak_mb', results[0])
+    self.assertEqual(
+        sorted(p + '.prof' for p in grit_benchmark._ALL_PHASES),
+        sorted(os.listdir(self._profile_dir)))
+    out_dir = os.path.join(self._work_dir, 'gen', 'out')
+    self.assertIn('benchmark_strings_am.pak', os.listdir(out_dir))
+    self.assertIn('benchmark_resources.pak', os.listdir(out_dir))
+
+
+if __name__ == '__main__':
+  unittest.main()
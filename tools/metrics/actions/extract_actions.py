@@ -45,6 +45,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
 import presubmit_util
 import diff_util
 import pretty_print_xml
+import source_scanner
 
 USER_METRICS_ACTION_RE = re.compile(r"""
   [^a-zA-Z]                   # Preceded by a non-alphabetical character.
@@ -91,6 +92,13 @@ USER_METRICS_ACTION_RE_DEVTOOLS = re.compile(r"""
 COMPUTED_ACTION_RE = re.compile(r'RecordComputedAction')
 QUOTED_STRING_RE = re.compile(r"""('[^']+'|"[^"]+")$""")
 
+# Files which contain none of these can't match USER_METRICS_ACTION_RE,
+# USER_METRICS_ACTION_RE_JS or COMPUTED_ACTION_RE, so they aren't scanned.
+USER_METRICS_SUBSTRINGS = (b'UserMetricsAction', b'RecordUserAction.record',
+                           b'RecordComputedAction')
+# Likewise for USER_METRICS_ACTION_RE_DEVTOOLS.
+DEVTOOLS_SUBSTRINGS = (b'InspectorFrontendHost.recordUserMetricsAction', )
+
 # Files that are known to use content::RecordComputedAction(), which means
 # they require special handling code in this script.
 # To add a new file, add it to this list and add the appropriate logic to
@@ -113,8 +121,6 @@ KNOWN_COMPUTED_USERS = (
 # The path to the root of the repository.
 REPOSITORY_ROOT = os.path.join(os.path.dirname(__file__), '..', '..', '..')
 
-number_of_files_total = 0
-
 # Tags that need to be inserted to each 'action' tag and their default content.
 TAGS = {'description': 'Please enter the description of the metric.',
         'owner': ('Please list the metric\'s owners. Add more owner tags as '
@@ -290,16 +296,41 @@ class ActionNameFinder:
       (self.__path, line_number, statement))
 
 
-def GrepForActions(path, actions):
-  """Grep a source file for calls to UserMetrics functions.
+def _FindActions(path, contents, action_re, actions, warnings):
+  """Adds the actions found with |action_re| in |contents| to |actions|, and
+  the invalid statements found to |warnings|."""
+  finder = ActionNameFinder(path, contents, action_re)
+  while True:
+    try:
+      action_name = finder.FindNextAction()
+      if not action_name:
+        break
+      actions.add(action_name)
+    except InvalidStatementException as e:
+      warnings.append(str(e))
+
+def _AddScanResult(result, actions):
+  """Adds the actions of a scanner's result to |actions|, and logs its warnings.
+  """
+  found_actions, warnings = result
+  actions.update(found_actions)
+  for warning in warnings:
+    logging.warning(warning)
+
+def _ReadFile(path):
+  with open(path, encoding='utf-8') as f:
+    return f.read()
+
+def _ScanForActions(path, contents):
+  """Scans a source file for calls to UserMetrics functions.
 
   Arguments:
     path: path to the file
-    actions: set of actions to add to
-  """
-  global number_of_files_total
-  number_of_files_total = number_of_files_total + 1
+    contents: contents of the file
 
+  Returns:
+    A list of the actions found, and a list of warnings about the calls.
+  """
   # Check the extension, using the regular expression for C++ syntax by default.
   ext = os.path.splitext(path)[1].lower()
   if ext == '.js':
@@ -307,28 +338,27 @@ def GrepForActions(path, actions):
   else:
     action_re = USER_METRICS_ACTION_RE
 
-  finder = ActionNameFinder(path,
-                            open(path, encoding='utf-8').read(), action_re)
-  while True:
-    try:
-      action_name = finder.FindNextAction()
-      if not action_name:
-        break
-      actions.add(action_name)
-    except InvalidStatementException as e:
-      logging.warning(str(e))
+  actions = set()
+  warnings = []
+  _FindActions(path, contents, action_re, actions, warnings)
+
+  if action_re == USER_METRICS_ACTION_RE:
+    for line_number, line in enumerate(contents.split('\n'), 1):
+      if COMPUTED_ACTION_RE.search(line):
+        # Warn if this file shouldn't be calling RecordComputedAction.
+        if os.path.basename(path) not in KNOWN_COMPUTED_USERS:
+          warnings.append('%s has RecordComputedAction statement on line %d' %
+                          (path, line_number))
+  return sorted(actions), warnings
 
-  if action_re != USER_METRICS_ACTION_RE:
-    return
+def GrepForActions(path, actions):
+  """Grep a source file for calls to UserMetrics functions.
 
-  line_number = 0
-  for line in open(path, encoding='utf-8'):
-    line_number = line_number + 1
-    if COMPUTED_ACTION_RE.search(line):
-      # Warn if this file shouldn't be calling RecordComputedAction.
-      if os.path.basename(path) not in KNOWN_COMPUTED_USERS:
-        logging.warning('%s has RecordComputedAction statement on line %d' %
-                        (path, line_number))
+  Arguments:
+    path: path to the file
+    actions: set of actions to add to
+  """
+  _AddScanResult(_ScanForActions(path, _ReadFile(path)), actions)
 
 class WebUIActionsParser(HTMLParser):
   """Parses an HTML file, looking for all tags with a 'metric' attribute.
@@ -367,17 +397,21 @@ class WebUIActionsParser(HTMLParser):
     else:
       self.actions.add(attrs['metric'])
 
-def GrepForWebUIActions(path, actions):
-  """Grep a WebUI source file for elements with associated metrics.
+def _ScanForWebUIActions(path, contents):
+  """Scans a WebUI source file for elements with associated metrics.
 
   Arguments:
     path: path to the file
-    actions: set of actions to add to
+    contents: contents of the file
+
+  Returns:
+    A list of the actions found, and an empty list of warnings.
   """
+  actions = set()
   close_called = False
   try:
     parser = WebUIActionsParser(actions)
-    parser.feed(open(path, encoding='utf-8').read())
+    parser.feed(contents)
     # An exception can be thrown by parser.close(), so do it in the try to
     # ensure the path of the file being parsed gets printed if that happens.
     close_called = True
@@ -388,34 +422,47 @@ def GrepForWebUIActions(path, actions):
   finally:
     if not close_called:
       parser.close()
+  return sorted(actions), []
 
-def GrepForDevToolsActions(path, actions):
-  """Grep a DevTools source file for calls to UserMetrics functions.
+def GrepForWebUIActions(path, actions):
+  """Grep a WebUI source file for elements with associated metrics.
 
   Arguments:
     path: path to the file
     actions: set of actions to add to
   """
-  global number_of_files_total
-  number_of_files_total = number_of_files_total + 1
+  _AddScanResult(_ScanForWebUIActions(path, _ReadFile(path)), actions)
 
+def _ScanForDevToolsActions(path, contents):
+  """Scans a DevTools source file for calls to UserMetrics functions.
+
+  Arguments:
+    path: path to the file
+    contents: contents of the file
+
+  Returns:
+    A list of the actions found, and a list of warnings about the calls.
+  """
+  actions = set()
+  warnings = []
   ext = os.path.splitext(path)[1].lower()
-  if ext != '.js':
-    return
+  if ext == '.js':
+    _FindActions(path, contents, USER_METRICS_ACTION_RE_DEVTOOLS, actions,
+                 warnings)
+  return sorted(actions), warnings
 
-  finder = ActionNameFinder(path,
-                            open(path, encoding='utf-8').read(),
-                            USER_METRICS_ACTION_RE_DEVTOOLS)
-  while True:
-    try:
-      action_name = finder.FindNextAction()
-      if not action_name:
-        break
-      actions.add(action_name)
-    except InvalidStatementException as e:
-      logging.warning(str(e))
+def GrepForDevToolsActions(path, actions):
+  """Grep a DevTools source file for calls to UserMetrics functions.
+
+  Arguments:
+    path: path to the file
+    actions: set of actions to add to
+  """
+  _AddScanResult(_ScanForDevToolsActions(path, _ReadFile(path)), actions)
 
-def WalkDirectory(root_path, actions, extensions, callback):
+def _ListFiles(root_path, extensions):
+  """Yields the paths of the non-test files under |root_path| with one of
+  |extensions|."""
   for path, dirs, files in os.walk(root_path):
     if '.svn' in dirs:
       dirs.remove('.svn')
@@ -424,7 +471,36 @@ def WalkDirectory(root_path, actions, extensions, callback):
     for file in files:
       filename, ext = os.path.splitext(file)
       if ext in extensions and not filename.endswith('test'):
-        callback(os.path.join(path, file), actions)
+        yield os.path.join(path, file)
+
+def ScanFilesForActions(paths, actions, scanner, substrings=None):
+  """Adds the actions found by |scanner| in |paths| to |actions|.
+
+  The files are scanned in parallel, see source_scanner.ScanFiles().
+
+  Arguments:
+    paths: paths of the files to scan
+    actions: set of actions to add to
+    scanner: _ScanForActions, _ScanForWebUIActions or _ScanForDevToolsActions
+    substrings: byte strings which files must contain for |scanner| to find
+      anything in them, or None
+  """
+  for _, result in source_scanner.ScanFiles(paths, scanner, substrings):
+    if result is not None:
+      _AddScanResult(result, actions)
+
+def WalkDirectory(root_path, actions, extensions, scanner, substrings=None):
+  """Adds the actions found by |scanner| in the files under |root_path|.
+
+  Arguments:
+    root_path: the directory to scan the files of
+    actions: set of actions to add to
+    extensions: extensions of the files to scan
+    scanner: see ScanFilesForActions()
+    substrings: see ScanFilesForActions()
+  """
+  ScanFilesForActions(_ListFiles(root_path, extensions), actions, scanner,
+                      substrings)
 
 def AddLiteralActions(actions):
   """Add literal actions specified via calls to UserMetrics functions.
@@ -435,26 +511,23 @@ def AddLiteralActions(actions):
   EXTENSIONS = ('.cc', '.cpp', '.mm', '.c', '.m', '.java')
 
   # Walk the source tree to process all files.
-  ash_root = os.path.normpath(os.path.join(REPOSITORY_ROOT, 'ash'))
-  WalkDirectory(ash_root, actions, EXTENSIONS, GrepForActions)
-  chrome_root = os.path.normpath(os.path.join(REPOSITORY_ROOT, 'chrome'))
-  WalkDirectory(chrome_root, actions, EXTENSIONS, GrepForActions)
-  content_root = os.path.normpath(os.path.join(REPOSITORY_ROOT, 'content'))
-  WalkDirectory(content_root, actions, EXTENSIONS, GrepForActions)
-  components_root = os.path.normpath(os.path.join(REPOSITORY_ROOT,
-                    'components'))
-  WalkDirectory(components_root, actions, EXTENSIONS, GrepForActions)
-  net_root = os.path.normpath(os.path.join(REPOSITORY_ROOT, 'net'))
-  WalkDirectory(net_root, actions, EXTENSIONS, GrepForActions)
   webkit_root = os.path.normpath(os.path.join(REPOSITORY_ROOT, 'webkit'))
-  WalkDirectory(os.path.join(webkit_root, 'glue'), actions, EXTENSIONS,
-                GrepForActions)
-  WalkDirectory(os.path.join(webkit_root, 'port'), actions, EXTENSIONS,
-                GrepForActions)
-  webkit_core_root = os.path.normpath(
-                     os.path.join(REPOSITORY_ROOT,
-                                  'third_party/blink/renderer/core'))
-  WalkDirectory(webkit_core_root, actions, EXTENSIONS, GrepForActions)
+  roots = [
+      os.path.normpath(os.path.join(REPOSITORY_ROOT, 'ash')),
+      os.path.normpath(os.path.join(REPOSITORY_ROOT, 'chrome')),
+      os.path.normpath(os.path.join(REPOSITORY_ROOT, 'content')),
+      os.path.normpath(os.path.join(REPOSITORY_ROOT, 'components')),
+      os.path.normpath(os.path.join(REPOSITORY_ROOT, 'net')),
+      os.path.join(webkit_root, 'glue'),
+      os.path.join(webkit_root, 'port'),
+      os.path.normpath(
+          os.path.join(REPOSITORY_ROOT, 'third_party/blink/renderer/core')),
+  ]
+  # Scan all the roots in one go, so that the files are shared evenly by the
+  # processes.
+  paths = [path for root in roots for path in _ListFiles(root, EXTENSIONS)]
+  ScanFilesForActions(paths, actions, _ScanForActions,
+                      USER_METRICS_SUBSTRINGS)
 
 def AddWebUIActions(actions):
   """Add user actions defined in WebUI files.
@@ -464,8 +537,9 @@ def AddWebUIActions(actions):
   """
   resources_root = os.path.join(REPOSITORY_ROOT, 'chrome', 'browser',
                                 'resources')
-  WalkDirectory(resources_root, actions, ('.html'), GrepForWebUIActions)
-  WalkDirectory(resources_root, actions, ('.js'), GrepForActions)
+  WalkDirectory(resources_root, actions, ('.html'), _ScanForWebUIActions)
+  WalkDirectory(resources_root, actions, ('.js'), _ScanForActions,
+                USER_METRICS_SUBSTRINGS)
 
 def AddDevToolsActions(actions):
   """Add user actions defined in DevTools frontend files.
@@ -475,7 +549,8 @@ def AddDevToolsActions(actions):
   """
   resources_root = os.path.join(REPOSITORY_ROOT, 'third_party', 'blink',
                                 'renderer', 'devtools', 'front_end')
-  WalkDirectory(resources_root, actions, ('.js'), GrepForDevToolsActions)
+  WalkDirectory(resources_root, actions, ('.js'), _ScanForDevToolsActions,
+                DEVTOOLS_SUBSTRINGS)
 
 def AddHistoryPageActions(actions):
   """Add actions that are used in History page.
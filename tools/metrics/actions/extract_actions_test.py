@@ -3,6 +3,9 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import action_utils
@@ -653,6 +656,32 @@ class ActionXmlTest(unittest.TestCase):
         extract_actions.USER_METRICS_ACTION_RE_JS)
     self.assertFalse(finder.FindNextAction())
 
+  def testWalkDirectory(self):
+    root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, root)
+    files = {
+        'a.cc': 'base::UserMetricsAction("Foo.A");',
+        'b.cc': 'RecordComputedAction(name);\nbase::UserMetricsAction(FOO);',
+        'c.cc': 'int main() {}',
+        'c_unittest.cc': 'base::UserMetricsAction("Foo.Test");',
+        'd.js': "chrome.send('coreOptionsUserMetricsAction', ['Foo.D']);",
+    }
+    for name, contents in files.items():
+      with open(os.path.join(root, name), 'w') as f:
+        f.write(contents)
+
+    actions = set()
+    with self.assertLogs(level='WARNING') as logs:
+      extract_actions.WalkDirectory(root, actions, ('.cc', '.js'),
+                                    extract_actions._ScanForActions,
+                                    extract_actions.USER_METRICS_SUBSTRINGS)
+    self.assertEqual({'Foo.A', 'Foo.D'}, actions)
+    self.assertEqual(2, len(logs.output))
+    self.assertIn('b.cc uses UserMetricsAction incorrectly on line 2',
+                  logs.output[0])
+    self.assertIn('b.cc has RecordComputedAction statement on line 1',
+                  logs.output[1])
+
 
 if __name__ == '__main__':
   unittest.main()
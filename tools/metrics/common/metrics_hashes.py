@@ -0,0 +1,132 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Hashes metric names like //base/metrics/metrics_hashes.cc.
+
+HashNames() hashes a batch of names at once. A HashIndex keeps the hashes of
+the names it was given, optionally in a file, so that only new names are hashed
+when the metadata changes, and so that hashes can be decoded back into names.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+# Bump whenever the format of HashIndex files changes.
+_INDEX_VERSION = 1
+
+
+def HashName(name):
+  """Returns the 64 bit hash of |name|, like HashMetricName() in C++."""
+  # The first 8 bytes of the MD5 digest, big endian.
+  return int.from_bytes(hashlib.md5(name.encode()).digest()[:8], 'big')
+
+
+def HashNameAs32Bits(name):
+  """Returns the 32 bit hash of |name|, like HashMetricNameAs32Bits() in C++.
+  """
+  return HashName(name) >> 32
+
+
+def HashNames(names, index=None):
+  """Returns the HashName() of each of |names|.
+
+  Args:
+    names: An iterable of names, which may contain duplicates.
+    index: A HashIndex to get the hashes from, which gets the hashes of new
+      names added, or None.
+
+  Returns:
+    A dict of each name to its hash, in the order of |names|.
+  """
+  if index is not None:
+    return index.Hash(names)
+  md5 = hashlib.md5
+  from_bytes = int.from_bytes
+  hashes = {}
+  for name in names:
+    if name not in hashes:
+      hashes[name] = from_bytes(md5(name.encode()).digest()[:8], 'big')
+  return hashes
+
+
+class HashIndex(object):
+  """An index of metric names to their HashName().
+
+  Attributes:
+    path: The file the index is loaded from and saved to, or None to only keep
+      it in memory.
+  """
+
+  def __init__(self, path=None):
+    self.path = path
+    self._hashes = {}
+    self._names_by_hash = None
+    self._modified = False
+    if path:
+      try:
+        with open(path, 'r', encoding='utf-8') as f:
+          contents = json.load(f)
+      except (IOError, ValueError):
+        contents = None
+      if contents and contents.get('version') == _INDEX_VERSION:
+        self._hashes = contents['hashes']
+
+  def __len__(self):
+    return len(self._hashes)
+
+  def __contains__(self, name):
+    return name in self._hashes
+
+  def Hash(self, names):
+    """Like HashNames(), but only hashes the names missing from the index, and
+    adds them to it."""
+    names = list(names)
+    new_hashes = HashNames([name for name in names if name not in self._hashes])
+    if new_hashes:
+      self._hashes.update(new_hashes)
+      self._names_by_hash = None
+      self._modified = True
+    hashes = self._hashes
+    return {name: hashes[name] for name in names}
+
+  def Retain(self, names):
+    """Removes the names which aren't in |names| from the index."""
+    names = set(names)
+    removed = [name for name in self._hashes if name not in names]
+    for name in removed:
+      del self._hashes[name]
+    if removed:
+      self._names_by_hash = None
+      self._modified = True
+
+  def Lookup(self, hash_value):
+    """Returns the sorted names in the index with the given hash.
+
+    Args:
+      hash_value: A 64 bit hash, or a 32 bit hash as HashNameAs32Bits()
+        returns.
+    """
+    if self._names_by_hash is None:
+      self._names_by_hash = {}
+      for name, name_hash in self._hashes.items():
+        self._names_by_hash.setdefault(name_hash, []).append(name)
+        self._names_by_hash.setdefault(name_hash >> 32, []).append(name)
+    return sorted(self._names_by_hash.get(hash_value, []))
+
+  def Save(self):
+    """Writes the index to |path|, if it changed since it was loaded."""
+    if not self.path or not self._modified:
+      return
+    directory = os.path.dirname(os.path.abspath(self.path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    try:
+      with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'version': _INDEX_VERSION, 'hashes': self._hashes}, f)
+      os.replace(tmp_path, self.path)
+    except BaseException:
+      os.unlink(tmp_path)
+      raise
+    self._modified = False
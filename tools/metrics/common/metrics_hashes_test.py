@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import metrics_hashes
+
+
+class MetricsHashesTest(unittest.TestCase):
+
+  def testHashName(self):
+    # Must match those in //base/metrics/metrics_hashes_unittest.cc.
+    self.assertEqual(0x0557fa923dcee4d0, metrics_hashes.HashName('Back'))
+    self.assertEqual(0x67d2f6740a8eaebf, metrics_hashes.HashName('Forward'))
+    self.assertEqual(0x290eb683f96572f1, metrics_hashes.HashName('NewTab'))
+    self.assertEqual(0x0557fa92, metrics_hashes.HashNameAs32Bits('Back'))
+
+  def testHashNames(self):
+    hashes = metrics_hashes.HashNames(['NewTab', 'Back', 'NewTab'])
+    self.assertEqual(['NewTab', 'Back'], list(hashes))
+    self.assertEqual(metrics_hashes.HashName('Back'), hashes['Back'])
+
+  def testHashIndex(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    path = os.path.join(directory, 'index.json')
+
+    index = metrics_hashes.HashIndex(path)
+    self.assertEqual(0, len(index))
+    self.assertEqual(metrics_hashes.HashNames(['Back', 'Forward']),
+                     metrics_hashes.HashNames(['Back', 'Forward'], index))
+    self.assertEqual(['Back'], index.Lookup(0x0557fa923dcee4d0))
+    self.assertEqual(['Back'], index.Lookup(0x0557fa92))
+    self.assertEqual([], index.Lookup(0x290eb683))
+    index.Save()
+
+    # Only the names missing from the index are hashed.
+    index = metrics_hashes.HashIndex(path)
+    self.assertEqual(2, len(index))
+    with mock.patch.object(metrics_hashes,
+                           'HashNames',
+                           wraps=metrics_hashes.HashNames) as hash_names:
+      index.Hash(['Back', 'NewTab'])
+      self.assertEqual(['NewTab'], list(hash_names.call_args[0][0]))
+    index.Retain(['Back', 'NewTab'])
+    self.assertNotIn('Forward', index)
+    self.assertEqual(['NewTab'], index.Lookup(0x290eb683))
+    index.Save()
+    self.assertEqual(['Back', 'NewTab'],
+                     sorted(metrics_hashes.HashIndex(path)._hashes))
+
+
+if __name__ == '__main__':
+  unittest.main()
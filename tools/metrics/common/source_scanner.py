@@ -0,0 +1,208 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Scans source files for uses of metrics, in parallel.
+
+Tools like extract_actions and find_unmapped_histograms look for metrics in
+tens of thousands of source files. ScanFiles() memory-maps each file, skips it
+unless it contains one of a few literal strings, and only then decodes it and
+runs the tool's scanner over it, in a pool of processes. The results can be
+cached per file, keyed on the git blob hash of the file, so files which haven't
+changed since the last scan are not even read.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import subprocess
+import tempfile
+
+# The environment variable with the default for ScanFiles()'s |cache_dir|.
+CACHE_DIR_ENV_VAR = 'METRICS_SOURCE_SCAN_CACHE_DIR'
+
+# Bump whenever the format of cached results changes.
+_CACHE_VERSION = 1
+
+# The number of files each process scans at a time.
+_SHARD_SIZE = 64
+
+
+def _ReadIfContains(path, substrings):
+  """Returns the contents of a file if it contains any of |substrings|.
+
+  Args:
+    path: The path to the file.
+    substrings: A tuple of byte strings, or None to always read the file.
+
+  Returns:
+    The decoded contents of the file, with universal newlines as with open(),
+    or None if the file doesn't contain any of |substrings|.
+  """
+  with open(path, 'rb') as f:
+    if os.fstat(f.fileno()).st_size == 0:
+      # Empty files can't be mapped.
+      data = b''
+    else:
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if substrings is not None and all(
+            mapped.find(s) == -1 for s in substrings):
+          return None
+        data = mapped[:]
+  if not data and substrings is not None:
+    return None
+  return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _ScanShard(args):
+  scanner, substrings, paths = args
+  results = []
+  for path in paths:
+    contents = _ReadIfContains(path, substrings)
+    results.append(None if contents is None else scanner(path, contents))
+  return results
+
+
+def _GetGitBlobHashes(paths):
+  """Returns a dict of the paths in |paths| unchanged in git to their blob hash.
+
+  Files which are untracked, or have been modified since they were last added
+  to the index, are left out. Returns an empty dict if the files are not in a
+  git checkout.
+  """
+  abs_paths = set(os.path.realpath(p) for p in paths)
+  if not abs_paths:
+    return {}
+  cwd = os.path.commonpath(list(abs_paths))
+  if not os.path.isdir(cwd):
+    cwd = os.path.dirname(cwd)
+  try:
+    top = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'],
+                                  cwd=cwd,
+                                  stderr=subprocess.DEVNULL).decode('utf-8')
+    top = top.rstrip('\n')
+    # Entries are '<mode> <blob hash> <stage>\t<path>'.
+    staged = subprocess.check_output(['git', 'ls-files', '-s', '-z'],
+                                     cwd=top).decode('utf-8')
+    modified = subprocess.check_output(
+        ['git', 'diff-files', '--name-only', '-z'], cwd=top).decode('utf-8')
+  except (OSError, subprocess.CalledProcessError):
+    return {}
+
+  modified = set(modified.split('\0'))
+  hashes = {}
+  for entry in staged.split('\0'):
+    if not entry:
+      continue
+    info, name = entry.split('\t', 1)
+    path = os.path.join(top, os.path.normpath(name))
+    if path in abs_paths and name not in modified:
+      hashes[path] = info.split()[1]
+  return hashes
+
+
+def _CachePath(cache_dir, scanner):
+  """Returns the path to cache the results of |scanner| at.
+
+  The path depends on the source of the module defining |scanner|, so that
+  changes to it invalidate the results.
+  """
+  h = hashlib.sha256(b'%d\0%s\0' % (_CACHE_VERSION,
+                                    scanner.__qualname__.encode('utf-8')))
+  with open(inspect.getsourcefile(scanner), 'rb') as f:
+    h.update(f.read())
+  return os.path.join(cache_dir, h.hexdigest() + '.json')
+
+
+def _ReadCache(path):
+  try:
+    with open(path, 'r', encoding='utf-8') as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return {}
+
+
+def _WriteCache(path, cache):
+  fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      json.dump(cache, f)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
+def ScanFiles(paths, scanner, substrings=None, jobs=None, cache_dir=None):
+  """Runs |scanner| over the files which contain any of |substrings|.
+
+  Args:
+    paths: An iterable of the paths of the files to scan.
+    scanner: A module level function taking the path and the contents of a
+      file, and returning a JSON serializable result. The result must only
+      depend on these arguments, and on the module defining |scanner|, since
+      it may be cached.
+    substrings: A tuple of byte strings which |scanner| can only find anything
+      in files containing. Other files are skipped without being decoded. None
+      to scan all files.
+    jobs: The number of processes to scan the files in, or None for one per
+      CPU.
+    cache_dir: A directory in which to cache the results of the files, so that
+      only the files that changed since they were last scanned are read again.
+      Defaults to $METRICS_SOURCE_SCAN_CACHE_DIR, if set.
+
+  Returns:
+    A list of (path, result) for each of |paths|, in order, where |result| is
+    None for skipped files. Cached results come back as they were loaded from
+    JSON, e.g. with lists in place of tuples.
+  """
+  paths = list(paths)
+  if substrings is not None:
+    substrings = tuple(substrings)
+  if cache_dir is None:
+    cache_dir = os.environ.get(CACHE_DIR_ENV_VAR)
+  if jobs is None:
+    jobs = multiprocessing.cpu_count()
+
+  results = [None] * len(paths)
+  missing = list(range(len(paths)))
+  if cache_dir:
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = _CachePath(cache_dir, scanner)
+    cached = _ReadCache(cache_path)
+    blob_hashes = _GetGitBlobHashes(paths)
+    keys = [None] * len(paths)
+    missing = []
+    for i, path in enumerate(paths):
+      blob_hash = blob_hashes.get(os.path.realpath(path))
+      if blob_hash:
+        keys[i] = '%s:%s' % (blob_hash, path)
+      if keys[i] in cached:
+        results[i] = cached[keys[i]]
+      else:
+        missing.append(i)
+    logging.info('Scanning %d of %d files, the others are cached.',
+                 len(missing), len(paths))
+
+  shards = [(scanner, substrings,
+             [paths[i] for i in missing[start:start + _SHARD_SIZE]])
+            for start in range(0, len(missing), _SHARD_SIZE)]
+  if jobs > 1 and len(shards) > 1:
+    with multiprocessing.Pool(min(jobs, len(shards))) as pool:
+      shard_results = pool.imap(_ScanShard, shards)
+      scanned = [r for shard in shard_results for r in shard]
+  else:
+    scanned = [r for shard in shards for r in _ScanShard(shard)]
+  for i, result in zip(missing, scanned):
+    results[i] = result
+
+  if cache_dir:
+    # Only keep the results of the files scanned this time, so that the cache
+    # doesn't grow with every change.
+    _WriteCache(cache_path,
+                {key: r for key, r in zip(keys, results) if key is not None})
+  return list(zip(paths, results))
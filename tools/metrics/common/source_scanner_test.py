@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import source_scanner
+
+_scanned_paths = []
+
+
+def _CountFoos(path, contents):
+  _scanned_paths.append(os.path.basename(path))
+  return [contents.count('foo'), contents.count('\r')]
+
+
+class SourceScannerTest(unittest.TestCase):
+
+  def setUp(self):
+    self._dir = tempfile.mkdtemp()
+    del _scanned_paths[:]
+
+  def tearDown(self):
+    shutil.rmtree(self._dir)
+
+  def _WriteFile(self, name, contents):
+    path = os.path.join(self._dir, name)
+    with open(path, 'wb') as f:
+      f.write(contents)
+    return path
+
+  def testScanFiles(self):
+    paths = [
+        self._WriteFile('a.cc', b'foo foo\r\n'),
+        self._WriteFile('b.cc', b'bar'),
+        self._WriteFile('c.cc', b''),
+    ]
+    self.assertEqual([(paths[0], [2, 0]), (paths[1], None), (paths[2], None)],
+                     source_scanner.ScanFiles(paths,
+                                              _CountFoos,
+                                              substrings=(b'foo', ),
+                                              jobs=1))
+    self.assertEqual(['a.cc'], _scanned_paths)
+
+    self.assertEqual([(paths[0], [2, 0]), (paths[1], [0, 0]),
+                      (paths[2], [0, 0])],
+                     source_scanner.ScanFiles(paths, _CountFoos, jobs=1))
+
+  def testScanFilesInParallel(self):
+    paths = [
+        self._WriteFile('%d.cc' % i, b'foo' * (i % 3))
+        for i in range(3 * source_scanner._SHARD_SIZE)
+    ]
+    self.assertEqual([(path, [i % 3, 0] if i % 3 else None)
+                      for i, path in enumerate(paths)],
+                     source_scanner.ScanFiles(paths,
+                                              _CountFoos,
+                                              substrings=(b'foo', ),
+                                              jobs=2))
+
+  def testCacheIsKeyedOnGitBlobHash(self):
+    try:
+      subprocess.check_output(['git', 'init', '-q', self._dir])
+    except (OSError, subprocess.CalledProcessError):
+      self.skipTest('git is not available')
+    paths = [
+        self._WriteFile('a.cc', b'foo'),
+        self._WriteFile('b.cc', b'foo foo'),
+        self._WriteFile('untracked.cc', b'foo'),
+    ]
+    subprocess.check_call(['git', 'add', 'a.cc', 'b.cc'], cwd=self._dir)
+    cache_dir = os.path.join(self._dir, 'cache')
+
+    def Scan():
+      del _scanned_paths[:]
+      return source_scanner.ScanFiles(paths,
+                                      _CountFoos,
+                                      substrings=(b'foo', ),
+                                      jobs=1,
+                                      cache_dir=cache_dir)
+
+    expected = [(paths[0], [1, 0]), (paths[1], [2, 0]), (paths[2], [1, 0])]
+    self.assertEqual(expected, Scan())
+    self.assertEqual(['a.cc', 'b.cc', 'untracked.cc'], _scanned_paths)
+    self.assertEqual(expected, Scan())
+    self.assertEqual(['untracked.cc'], _scanned_paths)
+
+    # Modified files are scanned again until they are added to the index.
+    self._WriteFile('b.cc', b'foo')
+    expected[1] = (paths[1], [1, 0])
+    self.assertEqual(expected, Scan())
+    self.assertEqual(['b.cc', 'untracked.cc'], _scanned_paths)
+    subprocess.check_call(['git', 'add', 'b.cc'], cwd=self._dir)
+    self.assertEqual(expected, Scan())
+    self.assertEqual(['b.cc', 'untracked.cc'], _scanned_paths)
+    self.assertEqual(expected, Scan())
+    self.assertEqual(['untracked.cc'], _scanned_paths)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -10,6 +10,7 @@ import os
 import subprocess
 import sys
 import re
+import tempfile
 
 _EMAIL_PATTERN = r'^[\w\-\+\%\.]+\@[\w\-\+\%\.]+$'
 _OWNERS = 'OWNERS'
@@ -19,6 +20,15 @@ _OWNERS = 'OWNERS'
 # directory levels from the histograms directory.
 DIR_ABOVE_TOOLS = [os.path.dirname(__file__), '..', '..', '..']
 SRC = 'src/'
+_FILE_DIRECTIVE = 'file://'
+_DIR_METADATA = 'DIR_METADATA'
+# The name of the file in which components are cached across runs.
+_COMPONENTS_CACHE = 'dirmd_components.json'
+# Bump whenever the format of the cached components changes.
+_COMPONENTS_CACHE_VERSION = 1
+# The maximum number of directories to pass to a single dirmd invocation.
+_MAX_DIRMD_DIRECTORIES = 500
+_MIXIN_PATTERN = re.compile(r'^\s*mixins:\s*"//([^"]+)"', re.MULTILINE)
 
 
 class Error(Exception):
@@ -170,9 +180,35 @@ def _ExtractEmailAddressesFromOWNERS(path, depth=0):
     raise Error('_ExtractEmailAddressesFromOWNERS has been called {} times. The'
                 ' path {} may be part of an OWNERS loop.'.format(limit, path))
 
-  directive = 'file://'
-  email_pattern = re.compile(_EMAIL_PATTERN)
   extracted_emails = []
+  for email, directive in _resolver.ReadOwnersFile(path):
+    if email:
+      extracted_emails.append(email)
+      continue
+
+    next_path = _GetOwnersFilePath(
+        os.path.join(SRC, directive[len(_FILE_DIRECTIVE):]))
+    if os.path.exists(next_path) and os.path.isfile(next_path):
+      extracted_emails.extend(
+          _ExtractEmailAddressesFromOWNERS(next_path, depth + 1))
+    else:
+      raise Error('The path derived from {} does not exist. '
+                  'Derived path: {}'.format(directive, next_path))
+
+  return extracted_emails
+
+
+def _ParseOwnersFile(path):
+  """Returns the (email, file directive) of the lines of an OWNERS file.
+
+  For each line that has an email address or a file:// directive, the other
+  element of the tuple is None.
+
+  Args:
+    path: The path to an OWNERS file.
+  """
+  email_pattern = re.compile(_EMAIL_PATTERN)
+  entries = []
 
   with open(path, 'r') as owners_file:
     for line in [line.lstrip()
@@ -181,20 +217,11 @@ def _ExtractEmailAddressesFromOWNERS(path, depth=0):
       first_word = line[:index] if index != -1 else line
 
       if email_pattern.match(first_word):
-        extracted_emails.append(first_word)
-
-      elif first_word.startswith(directive):
-        next_path = _GetOwnersFilePath(
-            os.path.join(SRC, first_word[len(directive):]))
+        entries.append((first_word, None))
+      elif first_word.startswith(_FILE_DIRECTIVE):
+        entries.append((None, first_word))
 
-        if os.path.exists(next_path) and os.path.isfile(next_path):
-          extracted_emails.extend(
-              _ExtractEmailAddressesFromOWNERS(next_path, depth + 1))
-        else:
-          raise Error('The path derived from {} does not exist. '
-                      'Derived path: {}'.format(first_word, next_path))
-
-  return extracted_emails
+  return entries
 
 
 def _ComponentFromDirmd(json_data, subpath):
@@ -213,56 +240,215 @@ def _ComponentFromDirmd(json_data, subpath):
                                                {}).get('component', '')
 
 
-# Memoize decorator from: https://stackoverflow.com/a/1988826
-# TODO(asvitkine): Replace with @functools.cache once we're on Python 3.9+.
-class Memoize:
-  def __init__(self, f):
-    self.f = f
-    self.memo = {}
+def _GetRootPath():
+  return os.path.abspath(os.path.join(*DIR_ABOVE_TOOLS))
 
-  def __call__(self, *args):
-    if not args in self.memo:
-      self.memo[args] = self.f(*args)
-    return self.memo[args]
 
+def _GetSubpath(root_path, path):
+  """Returns the path of a directory relative to the root, e.g. 'content'.
 
-@Memoize
-def _ExtractComponentViaDirmd(path):
-  """Returns the component for monorail issues at the given path.
-
-  Examples are 'Blink>Storage>FileAPI' and 'UI'.
-
-  Uses dirmd in third_party/depot_tools to parse metadata and walk parent
-  directories up to the top level of the repo.
-
-  Returns an empty string if no component can be extracted.
-
-  Args:
-    path: The path to a directory to query, e.g. 'src/storage'.
+  Raises:
+    Error: Raised if the path is not in the root directory.
   """
   # Verify that the paths are absolute and the root is a parent of the
   # passed in path.
-  root_path = os.path.abspath(os.path.join(*DIR_ABOVE_TOOLS))
   path = os.path.abspath(path)
   if not path.startswith(root_path):
     raise Error('Path {} is not a subpath of the root path {}.'.format(
         path, root_path))
-  subpath = path[len(root_path) + 1:] or '.'  # E.g. content/public.
+  return path[len(root_path) + 1:] or '.'
+
+
+def _RunDirmd(root_path, paths):
+  """Returns the output of dirmd for the given directories.
+
+  Uses dirmd in third_party/depot_tools to parse metadata and walk parent
+  directories up to the top level of the repo.
+
+  Args:
+    root_path: The absolute path to the root of the repo.
+    paths: A list of absolute paths to directories to query.
+  """
   dirmd_exe = 'dirmd'
   if sys.platform == 'win32':
     dirmd_exe = 'dirmd.bat'
   dirmd_path = os.path.join(*(DIR_ABOVE_TOOLS +
                               ['third_party', 'depot_tools', dirmd_exe]))
-  dirmd_command = [dirmd_path, 'read', '-form', 'sparse', root_path, path]
+  dirmd_command = [dirmd_path, 'read', '-form', 'sparse', root_path] + paths
   dirmd = subprocess.Popen(
       dirmd_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-  if dirmd.wait() != 0:
-    raise Error('dirmd failed: ' + dirmd.stderr.read())
-  json_out = json.load(dirmd.stdout)
-  # On Windows, dirmd output still uses Unix path separators.
-  if sys.platform == 'win32':
-    subpath = subpath.replace('\\', '/')
-  return _ComponentFromDirmd(json_out, subpath)
+  stdout, stderr = dirmd.communicate()
+  if dirmd.returncode != 0:
+    raise Error('dirmd failed: ' + stderr.decode('utf-8', 'replace'))
+  return json.loads(stdout)
+
+
+def _Stamp(path):
+  try:
+    st = os.stat(path)
+  except OSError:
+    return None
+  return [st.st_mtime_ns, st.st_size]
+
+
+class DirectoryMetadataResolver(object):
+  """Resolves the owners and components of directories.
+
+  OWNERS files are parsed once per modification, and the components of
+  directories are looked up with dirmd in batches: the first component that
+  is looked up is looked up together with all the directories passed to
+  AddDirectories() so far.
+
+  When a cache directory is set, components are also cached there across
+  runs. A cached component is reused as long as the DIR_METADATA files of the
+  directory, of its parent directories, and of the mixins they import, are
+  unchanged.
+  """
+
+  def __init__(self, cache_dir=None):
+    self._root_path = _GetRootPath()
+    # Maps paths to (stamp, entries) of parsed OWNERS files.
+    self._owners_files = {}
+    # Maps subpaths to their components.
+    self._components = {}
+    # Subpaths whose component hasn't been looked up yet.
+    self._pending_subpaths = set()
+    # Maps subpaths to the stamps of the DIR_METADATA files they depend on.
+    self._metadata_stamps = {}
+    self._cache_dir = None
+    self._cached_components = {}
+    self._cache_is_dirty = False
+    self.SetCacheDir(cache_dir)
+
+  def SetCacheDir(self, cache_dir):
+    """Sets the directory in which to cache components across runs."""
+    if cache_dir == self._cache_dir:
+      return
+    self._cache_dir = cache_dir
+    self._cached_components = {}
+    if not cache_dir:
+      return
+    try:
+      with open(os.path.join(cache_dir, _COMPONENTS_CACHE), 'r') as f:
+        data = json.load(f)
+      if data.get('version') == _COMPONENTS_CACHE_VERSION:
+        self._cached_components = data['components']
+    except (IOError, ValueError, KeyError):
+      pass
+
+  def SaveCache(self):
+    """Saves the components looked up so far in the cache directory."""
+    if not self._cache_dir or not self._cache_is_dirty:
+      return
+    os.makedirs(self._cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, prefix='.tmp')
+    try:
+      with os.fdopen(fd, 'w') as f:
+        json.dump(
+            {
+                'version': _COMPONENTS_CACHE_VERSION,
+                'components': self._cached_components,
+            }, f)
+      os.replace(tmp_path, os.path.join(self._cache_dir, _COMPONENTS_CACHE))
+    except BaseException:
+      os.unlink(tmp_path)
+      raise
+    self._cache_is_dirty = False
+
+  def ReadOwnersFile(self, path):
+    """Returns the entries of an OWNERS file, see _ParseOwnersFile()."""
+    stamp = _Stamp(path)
+    cached = self._owners_files.get(path)
+    if cached is None or cached[0] != stamp:
+      cached = self._owners_files[path] = (stamp, _ParseOwnersFile(path))
+    return cached[1]
+
+  def AddDirectories(self, paths):
+    """Adds directories whose components are about to be looked up."""
+    for path in paths:
+      if not os.path.abspath(path).startswith(self._root_path):
+        continue
+      subpath = _GetSubpath(self._root_path, path)
+      if subpath not in self._components:
+        self._pending_subpaths.add(subpath)
+
+  def GetComponent(self, path):
+    """Returns the component of the given directory, or an empty string."""
+    subpath = _GetSubpath(self._root_path, path)
+    if subpath not in self._components:
+      self._LookUpPendingComponents(subpath)
+    return self._components[subpath]
+
+  def _GetMetadataStamps(self, subpath):
+    """Returns the stamps of the DIR_METADATA files a directory depends on."""
+    stamps = self._metadata_stamps.get(subpath)
+    if stamps is not None:
+      return stamps
+    if subpath == '.':
+      stamps = {}
+    else:
+      stamps = dict(self._GetMetadataStamps(os.path.dirname(subpath) or '.'))
+    paths = [os.path.join(subpath, _DIR_METADATA)]
+    while paths:
+      path = paths.pop()
+      if path in stamps:
+        continue
+      full_path = os.path.join(self._root_path, path)
+      stamps[path] = _Stamp(full_path)
+      if stamps[path] is None:
+        continue
+      with open(full_path, 'r') as f:
+        mixins = _MIXIN_PATTERN.findall(f.read())
+      paths.extend(os.path.normpath(mixin) for mixin in mixins)
+    self._metadata_stamps[subpath] = stamps
+    return stamps
+
+  def _LookUpPendingComponents(self, requested_subpath):
+    # Directories added by earlier calls may be gone by now.
+    pending_subpaths = set(
+        subpath for subpath in self._pending_subpaths
+        if os.path.isdir(os.path.join(self._root_path, subpath)))
+    pending_subpaths.add(requested_subpath)
+    subpaths_to_run = []
+    for subpath in sorted(pending_subpaths):
+      cached = self._cached_components.get(subpath)
+      if cached and cached['stamps'] == self._GetMetadataStamps(subpath):
+        self._components[subpath] = cached['component']
+      else:
+        subpaths_to_run.append(subpath)
+    self._pending_subpaths = set()
+
+    for i in range(0, len(subpaths_to_run), _MAX_DIRMD_DIRECTORIES):
+      batch = subpaths_to_run[i:i + _MAX_DIRMD_DIRECTORIES]
+      json_out = _RunDirmd(
+          self._root_path,
+          [os.path.join(self._root_path, subpath) for subpath in batch])
+      for subpath in batch:
+        # On Windows, dirmd output still uses Unix path separators.
+        component = _ComponentFromDirmd(json_out, subpath.replace('\\', '/'))
+        self._components[subpath] = component
+        if self._cache_dir:
+          self._cached_components[subpath] = {
+              'stamps': self._GetMetadataStamps(subpath),
+              'component': component,
+          }
+          self._cache_is_dirty = True
+
+
+_resolver = DirectoryMetadataResolver()
+
+
+def _ExtractComponentViaDirmd(path):
+  """Returns the component for monorail issues at the given path.
+
+  Examples are 'Blink>Storage>FileAPI' and 'UI'.
+
+  Returns an empty string if no component can be extracted.
+
+  Args:
+    path: The path to a directory to query, e.g. 'src/storage'.
+  """
+  return _resolver.GetComponent(path)
 
 
 def _MakeOwners(document, path, emails_with_dom_elements):
@@ -346,7 +532,7 @@ def AddHistogramComponent(histogram, component):
   histogram.insertBefore(component_element, node_to_insert_before)
 
 
-def ExpandHistogramsOWNERS(histograms):
+def ExpandHistogramsOWNERS(histograms, cache_dir=None):
   """Updates the given DOM Element's descendants, if necessary.
 
   When a histogram has an owner node whose text is an OWNERS file path rather
@@ -362,6 +548,7 @@ def ExpandHistogramsOWNERS(histograms):
 
   Args:
     histograms: The DOM Element whose descendants may be updated.
+    cache_dir: A directory in which to cache components across runs.
 
   Raises:
     Error: Raised if the OWNERS file with the given path does not exist.
@@ -369,6 +556,18 @@ def ExpandHistogramsOWNERS(histograms):
   email_pattern = re.compile(_EMAIL_PATTERN)
   iter_matches = extract_histograms.IterElementsWithTag
 
+  # Look up the components of all OWNERS files at once.
+  owners_dirs = set()
+  for histogram in iter_matches(histograms, 'histogram'):
+    for owner in iter_matches(histogram, 'owner', 1):
+      owner_text = owner.childNodes[0].data.strip()
+      if _IsWellFormattedFilePath(owner_text):
+        path = _GetOwnersFilePath(owner_text)
+        if os.path.isfile(path):
+          owners_dirs.add(os.path.dirname(path))
+  _resolver.SetCacheDir(cache_dir)
+  _resolver.AddDirectories(sorted(owners_dirs))
+
   for histogram in iter_matches(histograms, 'histogram'):
     owners = [owner for owner in iter_matches(histogram, 'owner', 1)]
 
@@ -406,3 +605,5 @@ def ExpandHistogramsOWNERS(histograms):
       if component and component not in components_with_dom_elements:
         components_with_dom_elements.add(component)
         AddHistogramComponent(histogram, component)
+
+  _resolver.SaveCache()
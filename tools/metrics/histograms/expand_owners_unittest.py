@@ -614,6 +614,68 @@ class ExpandOwnersTest(unittest.TestCase):
     else:
       self.assertEqual(result, '')
 
+  def testReadOwnersFileIsMemoized(self):
+    """Checks that OWNERS files are only parsed again once they change."""
+    absolute_path = _MakeOwnersFile('OWNERS', self.temp_dir)
+    with open(absolute_path, 'w') as owners_file:
+      owners_file.write('joe@chromium.org')
+
+    resolver = expand_owners.DirectoryMetadataResolver()
+    with mock.patch('expand_owners._ParseOwnersFile',
+                    wraps=expand_owners._ParseOwnersFile) as mock_parse:
+      for _ in range(2):
+        self.assertEqual([('joe@chromium.org', None)],
+                         resolver.ReadOwnersFile(absolute_path))
+      self.assertEqual(1, mock_parse.call_count)
+
+      with open(absolute_path, 'w') as owners_file:
+        owners_file.write('amy@chromium.org\nfile://OWNERS')
+      self.assertEqual([('amy@chromium.org', None), (None, 'file://OWNERS')],
+                       resolver.ReadOwnersFile(absolute_path))
+      self.assertEqual(2, mock_parse.call_count)
+
+  @mock.patch('expand_owners._RunDirmd')
+  def testComponentsAreLookedUpInBatchesAndCached(self, mock_run_dirmd):
+    """Checks that dirmd runs once for all directories and is cached."""
+    dirs = [os.path.join(self.temp_dir, name) for name in ['bees', 'wasps']]
+    subpaths = [_GetSrcRelativePath(d)[len(expand_owners.SRC):] for d in dirs]
+    for d in dirs:
+      os.mkdir(d)
+    mock_run_dirmd.return_value = {
+        'dirs': {
+            subpaths[0]: {
+                'monorail': {
+                    'component': 'Bees'
+                }
+            },
+            subpaths[1]: {},
+        }
+    }
+    cache_dir = os.path.join(self.temp_dir, 'cache')
+
+    resolver = expand_owners.DirectoryMetadataResolver(cache_dir)
+    resolver.AddDirectories(dirs)
+    self.assertEqual('Bees', resolver.GetComponent(dirs[0]))
+    self.assertEqual('', resolver.GetComponent(dirs[1]))
+    mock_run_dirmd.assert_called_once_with(_GetToolsParentDir(), dirs)
+    resolver.SaveCache()
+
+    # Components are cached until the DIR_METADATA files change.
+    resolver = expand_owners.DirectoryMetadataResolver(cache_dir)
+    self.assertEqual('Bees', resolver.GetComponent(dirs[0]))
+    self.assertEqual(1, mock_run_dirmd.call_count)
+
+    with open(os.path.join(dirs[1], 'DIR_METADATA'), 'w') as md:
+      md.write('monorail {\n  component: "Wasps"\n}')
+    mock_run_dirmd.return_value['dirs'][subpaths[1]] = {
+        'monorail': {
+            'component': 'Wasps'
+        }
+    }
+    resolver = expand_owners.DirectoryMetadataResolver(cache_dir)
+    self.assertEqual('Wasps', resolver.GetComponent(dirs[1]))
+    self.assertEqual(2, mock_run_dirmd.call_count)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -55,6 +55,7 @@ XML below will generate the following five histograms:
 """
 
 import bisect
+import collections.abc
 import copy
 import datetime
 import itertools
@@ -69,6 +70,8 @@ import logging
 import re
 import xml.dom.minidom
 
+import light_dom
+
 BASIC_EMAIL_REGEXP = r'^[\w\-\+\%\.]+\@[\w\-\+\%\.]+$'
 
 OWNER_PLACEHOLDER = (
@@ -200,14 +203,14 @@ def _NormalizeAllAttributeValues(node):
   """Recursively normalizes all tag attribute values in the given tree.
 
   Args:
-    node: The minidom node to be normalized.
+    node: The minidom or light_dom node to be normalized.
 
   Returns:
-    The normalized minidom node.
+    The normalized node.
   """
   if node.nodeType == _ELEMENT_NODE:
-    for a in node.attributes.keys():
-      node.attributes[a].value = NormalizeString(node.attributes[a].value)
+    for a in list(node.attributes.keys()):
+      node.setAttribute(a, NormalizeString(node.getAttribute(a)))
 
   for c in node.childNodes:
     _NormalizeAllAttributeValues(c)
@@ -420,10 +423,14 @@ def _ValidateMilestoneString(milestone_str):
 
 def _ProcessBaseHistogramAttribute(node, histogram_entry):
   if node.hasAttribute('base'):
-    is_base = node.getAttribute('base').lower() == 'true'
-    histogram_entry['base'] = is_base
-    if is_base and 'obsolete' not in histogram_entry:
-      histogram_entry['obsolete'] = DEFAULT_BASE_HISTOGRAM_OBSOLETE_REASON
+    _SetBaseHistogram(node.getAttribute('base').lower() == 'true',
+                      histogram_entry)
+
+
+def _SetBaseHistogram(is_base, histogram_entry):
+  histogram_entry['base'] = is_base
+  if is_base and 'obsolete' not in histogram_entry:
+    histogram_entry['obsolete'] = DEFAULT_BASE_HISTOGRAM_OBSOLETE_REASON
 
 # The following code represents several concepts as JSON objects
 #
@@ -693,13 +700,15 @@ def _GetObsoleteReason(node):
 def _UpdateHistogramsWithSuffixes(tree, histograms):
   """Processes <histogram_suffixes> tags and combines with affected histograms.
 
-  The histograms dictionary will be updated in-place by adding new histograms
+  The histograms index will be updated in-place by adding new histograms
   created by combining histograms themselves with histogram_suffixes targeting
   these histograms.
 
   Args:
     tree: XML dom tree.
-    histograms: a dictionary of histograms previously extracted from the tree;
+    histograms: a dictionary of histograms previously extracted from the tree.
+      If it is a HistogramIndex, the entries of new histograms are only built
+      when they are looked up.
 
   Returns:
     True if any errors were found.
@@ -763,14 +772,12 @@ def _UpdateHistogramsWithSuffixes(tree, histograms):
 
     name = histogram_suffixes.getAttribute('name')
     suffix_nodes = list(IterElementsWithTag(histogram_suffixes, suffix_tag, 1))
-    suffix_labels = {}
     for suffix in suffix_nodes:
       suffix_name = suffix.getAttribute('name')
       if not suffix.hasAttribute('label'):
         logging.error('suffix %s in histogram_suffixes %s should have a label',
                       suffix_name, name)
         have_errors = True
-      suffix_labels[suffix_name] = suffix.getAttribute('label')
     # Find owners list under current histogram_suffixes tag.
     owners, _ = _ExtractOwners(histogram_suffixes)
 
@@ -794,27 +801,6 @@ def _UpdateHistogramsWithSuffixes(tree, histograms):
         try:
           new_histogram_name = _ExpandHistogramNameWithSuffixes(
               suffix_name, histogram_name, histogram_suffixes)
-          if new_histogram_name != histogram_name:
-            new_histogram = copy.deepcopy(histograms[histogram_name])
-            # Do not copy forward base histogram state to suffixed
-            # histograms. Any suffixed histograms that wish to remain base
-            # histograms must explicitly re-declare themselves as base
-            # histograms.
-            if new_histogram.get('base', False):
-              del new_histogram['base']
-              if (new_histogram.get(
-                  'obsolete', '') == DEFAULT_BASE_HISTOGRAM_OBSOLETE_REASON):
-                del new_histogram['obsolete']
-            histograms[new_histogram_name] = new_histogram
-
-          suffix_label = suffix_labels.get(suffix_name, '')
-
-          histogram_entry = histograms[new_histogram_name]
-
-          # If no owners are added for this histogram-suffixes, it inherits the
-          # owners of its parents.
-          if owners:
-            histogram_entry['owners'] = owners
 
           # If a suffix has an obsolete node, it's marked as obsolete for the
           # specified reason, overwriting its group's obsoletion reason if the
@@ -825,12 +811,22 @@ def _UpdateHistogramsWithSuffixes(tree, histograms):
           if not obsolete_reason:
             obsolete_reason = group_obsolete_reason
 
-          # If the suffix has an obsolete tag, all histograms it generates
-          # inherit it.
-          if obsolete_reason:
-            histogram_entry['obsolete'] = obsolete_reason
-
-          _ProcessBaseHistogramAttribute(suffix, histogram_entry)
+          is_base = None
+          if suffix.hasAttribute('base'):
+            is_base = suffix.getAttribute('base').lower() == 'true'
+
+          is_new = new_histogram_name != histogram_name
+          if isinstance(histograms, HistogramIndex):
+            # The entry is only built if it is looked up, from the entry that
+            # |histogram_name| has at this point.
+            histograms._SetUnbuilt(
+                new_histogram_name,
+                _SuffixedEntry(histograms._GetUnbuilt(histogram_name), is_new,
+                               owners, obsolete_reason, is_base))
+          else:
+            histograms[new_histogram_name] = _SuffixedEntry(
+                histograms[histogram_name], is_new, owners, obsolete_reason,
+                is_base).Build()
 
         except Error:
           have_errors = True
@@ -856,15 +852,159 @@ def _GetTokenAssignments(tokens):
     tokens: The list of Tokens to create assignments for.
 
   Returns:
-    A list of TokenAssignments.
+    An iterator of TokenAssignments.
   """
   token_keys = [token['key'] for token in tokens]
   token_variants = [token['variants'] for token in tokens]
 
-  return [
-      TokenAssignment(pairings=dict(zip(token_keys, selected_variants)))
-      for selected_variants in itertools.product(*token_variants)
-  ]
+  return (TokenAssignment(pairings=dict(zip(token_keys, selected_variants)))
+          for selected_variants in itertools.product(*token_variants))
+
+
+class _TokenEntry(object):
+  """Builds the entry of a histogram generated from a TokenAssignment."""
+  __slots__ = ('histogram_entry', 'token_assignment')
+
+  def __init__(self, histogram_entry, token_assignment):
+    self.histogram_entry = histogram_entry
+    self.token_assignment = token_assignment
+
+  def Build(self):
+    new_obsolete_reason = ''
+    new_owners = []
+    # Dictionary of pairings used for string formatting of the summary.
+    token_summary_pairings = {}
+
+    for token_key, variant in self.token_assignment.pairings.items():
+      token_summary_pairings[token_key] = variant['summary']
+
+      # If a variant has an obsolete reason, the new reason overwrites the
+      # obsolete reason of the original histogram.
+      if 'obsolete' in variant:
+        new_obsolete_reason = variant['obsolete']
+
+      # If a variant has owner(s), append to |new_owners|, overwriting the
+      # owners of the original histogram.
+      if 'owners' in variant:
+        new_owners += variant['owners']
+
+    # Replace token in summary with variant summary.
+    new_summary_text = self.histogram_entry['summary'].format(
+        **token_summary_pairings)
+    new_histogram_node = dict(self.histogram_entry, summary=new_summary_text)
+    # Do not copy the <token> nodes to the generated histograms.
+    del new_histogram_node['tokens']
+
+    if new_obsolete_reason:
+      new_histogram_node['obsolete'] = new_obsolete_reason
+
+    if new_owners:
+      new_histogram_node['owners'] = new_owners
+
+    return new_histogram_node
+
+
+class _SuffixedEntry(object):
+  """Builds the entry of a histogram updated by a histogram suffix.
+
+  Attributes:
+    parent: The unbuilt entry of the affected histogram.
+    is_new: Whether the suffix generates a new histogram rather than updating
+      the affected one, i.e. whether the suffix name is not empty.
+    owners: The owners of the histogram_suffixes, if any.
+    obsolete_reason: The obsolete reason of the suffix, if any.
+    is_base: The value of the suffix's base attribute, or None.
+  """
+  __slots__ = ('parent', 'is_new', 'owners', 'obsolete_reason', 'is_base')
+
+  def __init__(self, parent, is_new, owners, obsolete_reason, is_base):
+    self.parent = parent
+    self.is_new = is_new
+    self.owners = owners
+    self.obsolete_reason = obsolete_reason
+    self.is_base = is_base
+
+  def Build(self):
+    # Built entries are deep copies, so that they share no mutable values with
+    # the entries of other histograms.
+    return copy.deepcopy(self._BuildShallow())
+
+  def _BuildShallow(self):
+    if isinstance(self.parent, _SuffixedEntry):
+      histogram_entry = self.parent._BuildShallow()
+    else:
+      histogram_entry = dict(_BuildEntry(self.parent))
+    if self.is_new and histogram_entry.get('base', False):
+      # Do not copy forward base histogram state to suffixed histograms. Any
+      # suffixed histograms that wish to remain base histograms must explicitly
+      # re-declare themselves as base histograms.
+      del histogram_entry['base']
+      if (histogram_entry.get('obsolete',
+                              '') == DEFAULT_BASE_HISTOGRAM_OBSOLETE_REASON):
+        del histogram_entry['obsolete']
+
+    # If no owners are added for this histogram-suffixes, it inherits the
+    # owners of its parents.
+    if self.owners:
+      histogram_entry['owners'] = self.owners
+
+    # If the suffix has an obsolete tag, all histograms it generates inherit
+    # it.
+    if self.obsolete_reason:
+      histogram_entry['obsolete'] = self.obsolete_reason
+
+    if self.is_base is not None:
+      _SetBaseHistogram(self.is_base, histogram_entry)
+    return histogram_entry
+
+
+def _BuildEntry(entry):
+  """Returns the histogram entry for an entry of a HistogramIndex."""
+  if isinstance(entry, dict):
+    return entry
+  return entry.Build()
+
+
+class HistogramIndex(collections.abc.MutableMapping):
+  """A dictionary of all histograms, built by ExtractHistogramsFromDom().
+
+  Tokens and histogram suffixes can generate hundreds of thousands of
+  histograms, while most tools only need some of them, or only their names.
+  The index has the names of all histograms, but the entries of generated
+  histograms are only built when they are first looked up.
+  """
+
+  def __init__(self, histograms=None):
+    # A dictionary of names to entries, or to _TokenEntry or _SuffixedEntry
+    # objects to build the entries from.
+    self._entries = dict(histograms or {})
+
+  def __getitem__(self, name):
+    entry = self._entries[name]
+    if not isinstance(entry, dict):
+      entry = self._entries[name] = entry.Build()
+    return entry
+
+  def __setitem__(self, name, histogram_entry):
+    self._entries[name] = histogram_entry
+
+  def __delitem__(self, name):
+    del self._entries[name]
+
+  def __contains__(self, name):
+    return name in self._entries
+
+  def __iter__(self):
+    return iter(self._entries)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def _GetUnbuilt(self, name):
+    return self._entries[name]
+
+  def _SetUnbuilt(self, name, entry):
+    self._entries[name] = entry
 
 
 def _GenerateNewHistogramsFromTokens(histogram_name, histograms_dict,
@@ -874,8 +1014,8 @@ def _GenerateNewHistogramsFromTokens(histogram_name, histograms_dict,
   Args:
     histogram_name: The name of the histogram.
     histograms_dict: The dictionary of all histograms extracted from the tree.
-    new_histograms_dict: The dictionary of histograms to add newly generated
-        histograms to.
+    new_histograms_dict: The HistogramIndex to add newly generated histograms
+        to.
 
   Returns:
     A boolean that is True if a generated histogram name already exists in the
@@ -883,7 +1023,6 @@ def _GenerateNewHistogramsFromTokens(histogram_name, histograms_dict,
   """
   have_error = False
   histogram_node = histograms_dict[histogram_name]
-  summary_text = histogram_node['summary']
 
   # |token_assignments| contains all the cross-product combinations of token
   # variants, representing all the possible histogram names that could be
@@ -893,31 +1032,12 @@ def _GenerateNewHistogramsFromTokens(histogram_name, histograms_dict,
   # Each |token_assignment| contains one of the cross-product combinations and
   # corresponds to one new generated histogram.
   for token_assignment in token_assignments:
-    new_obsolete_reason = ''
-    new_owners = []
-    # Dictionaries of pairings used for string formatting of histogram name and
-    # summary.
-    token_name_pairings = {}
-    token_summary_pairings = {}
-
-    for token_key, variant in token_assignment.pairings.items():
-      token_name_pairings[token_key] = variant['name']
-      token_summary_pairings[token_key] = variant['summary']
-
-      # If a variant has an obsolete reason, the new reason overwrites the
-      # obsolete reason of the original histogram.
-      if 'obsolete' in variant:
-        new_obsolete_reason = variant['obsolete']
-
-      # If a variant has owner(s), append to |new_owners|, overwriting the
-      # owners of the original histogram.
-      if 'owners' in variant:
-        new_owners += variant['owners']
-
     # Replace token in histogram name with variant name.
-    new_histogram_name = histogram_name.format(**token_name_pairings)
-    # Replace token in summary with variant summary.
-    new_summary_text = summary_text.format(**token_summary_pairings)
+    new_histogram_name = histogram_name.format(
+        **{
+            token_key: variant['name']
+            for token_key, variant in token_assignment.pairings.items()
+        })
 
     if new_histogram_name in new_histograms_dict:
       logging.error(
@@ -927,17 +1047,8 @@ def _GenerateNewHistogramsFromTokens(histogram_name, histograms_dict,
       have_error = True
       continue
 
-    new_histogram_node = dict(histogram_node, summary=new_summary_text)
-    # Do not copy the <token> nodes to the generated histograms.
-    del new_histogram_node['tokens']
-
-    if new_obsolete_reason:
-      new_histogram_node['obsolete'] = new_obsolete_reason
-
-    if new_owners:
-      new_histogram_node['owners'] = new_owners
-
-    new_histograms_dict[new_histogram_name] = new_histogram_node
+    new_histograms_dict._SetUnbuilt(
+        new_histogram_name, _TokenEntry(histogram_node, token_assignment))
 
   return have_error
 
@@ -949,15 +1060,15 @@ def _UpdateHistogramsWithTokens(histograms_dict):
     histograms_dict: A dictionary of all the histograms extracted from the tree.
 
   Returns:
-    A tuple where the first element is the replacement histograms dictionary,
+    A tuple where the first element is the replacement HistogramIndex,
         containing the original histograms without tokens and histograms
         whose tokens are replaced by newly variant combinations.
         The second element is a boolean is there is error.
   """
   have_error = False
-  # Create new dict instead of modify in place because newly generated
+  # Create new index instead of modify in place because newly generated
   # histograms will be added when iterating through |histograms_dict|.
-  new_histograms_dict = {}
+  new_histograms_dict = HistogramIndex()
   for histogram_name, histogram_node in histograms_dict.items():
     if 'tokens' in histogram_node:
       have_error = have_error or _GenerateNewHistogramsFromTokens(
@@ -996,7 +1107,7 @@ def ExtractHistogramsFromDom(tree):
     tree: A DOM tree of XML content.
 
   Returns:
-    a tuple of (histograms, status) where histograms is a dictionary mapping
+    a tuple of (histograms, status) where histograms is a HistogramIndex mapping
     histogram names to dictionaries containing histogram descriptions and status
     is a boolean indicating if errros were encountered in processing.
   """
@@ -1029,7 +1140,7 @@ def ExtractHistograms(filename):
     Error: if the file is not well-formatted.
   """
   with open(filename, 'r') as f:
-    tree = xml.dom.minidom.parse(f)
+    tree = light_dom.Parse(f)
     histograms, had_errors = ExtractHistogramsFromDom(tree)
     if had_errors:
       logging.error('Error parsing %s', filename)
@@ -320,6 +320,58 @@ class ExtractHistogramsTest(unittest.TestCase):
         'This suffix group is obsolete',
         histograms['Test.Test2_NonObsoleteSuffixObsoleteGroup2']['obsolete'])
 
+  def testEntriesAreBuiltOnDemand(self):
+    histograms, had_errors = extract_histograms.ExtractHistogramsFromDom(
+        xml.dom.minidom.parseString(TEST_SUFFIX_OBSOLETION_XML_CONTENT))
+    self.assertFalse(had_errors)
+    self.assertIsInstance(histograms, extract_histograms.HistogramIndex)
+    name = 'Test.Test1_ObsoleteSuffixGroup1'
+    self.assertIn(name, histograms)
+    self.assertNotIsInstance(histograms._GetUnbuilt(name), dict)
+
+    entry = histograms[name]
+    self.assertIsInstance(histograms._GetUnbuilt(name), dict)
+    self.assertIs(entry, histograms[name])
+
+  def testSuffixesApplyInOrder(self):
+    histograms, had_errors = extract_histograms.ExtractHistogramsFromDom(
+        xml.dom.minidom.parseString("""
+<histogram-configuration>
+<histograms>
+  <histogram name="Test.Histogram" units="units" expires_after="M100">
+    <owner>me@chromium.org</owner>
+    <summary>Summary.</summary>
+  </histogram>
+</histograms>
+<histogram_suffixes_list>
+  <histogram_suffixes name="Named" separator=".">
+    <suffix name="Named" label="Named"/>
+    <affected-histogram name="Test.Histogram"/>
+  </histogram_suffixes>
+  <histogram_suffixes name="Unnamed" separator=".">
+    <suffix name="" label="Unnamed">
+      <obsolete>Removed.</obsolete>
+    </suffix>
+    <affected-histogram name="Test.Histogram"/>
+  </histogram_suffixes>
+</histogram_suffixes_list>
+</histogram-configuration>
+"""))
+    self.assertFalse(had_errors)
+    # The empty suffix updates the histogram after the named suffix copied it.
+    self.assertEqual('Removed.', histograms['Test.Histogram']['obsolete'])
+    self.assertNotIn('obsolete', histograms['Test.Histogram.Named'])
+
+  def testSuffixedEntriesShareNoMutableValues(self):
+    histograms, had_errors = extract_histograms.ExtractHistogramsFromDom(
+        xml.dom.minidom.parseString(TEST_SUFFIX_OBSOLETION_XML_CONTENT))
+    self.assertFalse(had_errors)
+    suffixed = histograms['Test.Test1_ObsoleteSuffixGroup1']
+    suffixed['owners'].append('other@chromium.org')
+    self.assertNotIn('other@chromium.org', histograms['Test.Test1']['owners'])
+    self.assertNotIn('other@chromium.org',
+                     histograms['Test.Test1_ObsoleteSuffixGroup2']['owners'])
+
   def testBaseHistograms(self):
     histograms, had_errors = extract_histograms.ExtractHistogramsFromDom(
         xml.dom.minidom.parseString(TEST_BASE_HISTOGRAM_XML_CONTENT))
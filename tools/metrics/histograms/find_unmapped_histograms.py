@@ -22,6 +22,7 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
 import path_util
+import source_scanner
 
 import extract_histograms
 import histogram_paths
@@ -224,12 +225,42 @@ def logNonLiteralHistogram(filename, histogram):
                   histogram)
 
 
-def readChromiumHistograms():
+def scanForHistogramMacros(filename, contents):
+  """Scans a source file for invocations of the UMA_HISTOGRAM_* macros.
+
+  Args:
+    filename: The filename of the file, e.g. 'chrome/browser/memory_details.cc'
+    contents: The contents of the file.
+
+  Returns:
+    A list of [line number, full macro name, macro name suffix, first argument]
+    for each invocation, e.g.
+    [[420, 'UMA_HISTOGRAM_COUNTS_100', 'COUNTS_100', '"FooGroup.FooName"']]
+  """
+  contents = removeComments(contents)
+  invocations = []
+  line_number = 1
+  position = 0
+  for match in HISTOGRAM_REGEX.finditer(contents):
+    line_number += contents.count('\n', position, match.start())
+    position = match.start()
+    invocations.append(
+        [line_number, match.group(1), match.group(2), match.group(3)])
+  return invocations
+
+
+def readChromiumHistograms(jobs=None, cache_dir=None):
   """Searches the Chromium source for all histogram names.
 
   Also prints warnings for any invocations of the UMA_HISTOGRAM_* macros with
   names that might vary during a single run of the app.
 
+  Args:
+    jobs: The number of processes to scan the source in, or None for one per
+      CPU.
+    cache_dir: A directory to cache the histograms found in each file in, see
+      source_scanner.ScanFiles().
+
   Returns:
     A tuple of
       a set containing any found literal histogram names, and
@@ -237,40 +268,41 @@ def readChromiumHistograms():
   """
   logging.info('Scanning Chromium source for histograms...')
 
-  # Use git grep to find all invocations of the UMA_HISTOGRAM_* macros.
+  # Scan the files which invoke the UMA_HISTOGRAM_* macros.
   # Examples:
   #   'path/to/foo.cc:420:  UMA_HISTOGRAM_COUNTS_100("FooGroup.FooName",'
   #   'path/to/bar.cc:632:  UMA_HISTOGRAM_ENUMERATION('
-  locations = RunGit(['gs', 'UMA_HISTOGRAM']).split('\n')
-  all_filenames = set(location.split(':')[0] for location in locations);
-  filenames = [f for f in all_filenames
-               if C_FILENAME.match(f) and not TEST_FILENAME.match(f)]
+  all_filenames = RunGit(['ls-files']).decode('utf-8').split('\n')
+  # Files deleted from the worktree but not from the index can't be scanned.
+  deleted_filenames = set(
+      RunGit(['ls-files', '--deleted']).decode('utf-8').split('\n'))
+  filenames = sorted(f for f in all_filenames
+                     if C_FILENAME.match(f) and not TEST_FILENAME.match(f)
+                     and f not in deleted_filenames)
+  scanned = source_scanner.ScanFiles(filenames,
+                                     scanForHistogramMacros,
+                                     substrings=(b'UMA_HISTOGRAM_', ),
+                                     jobs=jobs,
+                                     cache_dir=cache_dir)
 
   histograms = set()
   location_map = dict()
   unknown_macros = set()
   all_suffixes = STANDARD_HISTOGRAM_SUFFIXES | STANDARD_LIKE_SUFFIXES
   all_others = OTHER_STANDARD_HISTOGRAMS | OTHER_STANDARD_LIKE_HISTOGRAMS
-  for filename in filenames:
-    contents = ''
-    with open(filename, 'r') as f:
-      contents = removeComments(f.read())
-
+  for filename, invocations in scanned:
     # TODO(isherman): Look for histogram function calls like
     # base::UmaHistogramSparse() in addition to macro invocations.
-    for match in HISTOGRAM_REGEX.finditer(contents):
-      line_number = contents[:match.start()].count('\n') + 1
-      if (match.group(2) not in all_suffixes and
-          match.group(1) not in all_others):
-        full_macro_name = match.group(1)
+    for line_number, full_macro_name, suffix, histogram in invocations or []:
+      if (suffix not in all_suffixes and full_macro_name not in all_others):
         if (full_macro_name not in unknown_macros):
           logging.warning('%s:%d: Unknown macro name: <%s>' %
-                          (filename, line_number, match.group(1)))
+                          (filename, line_number, full_macro_name))
           unknown_macros.add(full_macro_name)
 
         continue
 
-      histogram = match.group(3).strip()
+      histogram = histogram.strip()
       histogram = collapseAdjacentCStrings(histogram)
 
       # Must begin and end with a quotation mark.
@@ -297,7 +329,7 @@ def readAllXmlHistograms():
   Returns:
     A set containing the parsed histogram names.
   """
-  merged = merge_xml.MergeFiles(histogram_paths.ALL_XMLS)
+  merged = merge_xml.MergeFiles(histogram_paths.ALL_XMLS, lightweight=True)
   histograms, _ = extract_histograms.ExtractHistogramsFromDom(merged)
   return set(extract_histograms.ExtractNames(histograms))
 
@@ -378,6 +410,15 @@ def main():
       help=(
           'output as csv for ease of parsing ' +
           '[optional, defaults to %default]'))
+  parser.add_option(
+      '--cache-dir', dest='cache_dir', default=None,
+      help=('cache the histograms found in each source file in DIRECTORY ' +
+            '[optional, defaults to $%s]' % source_scanner.CACHE_DIR_ENV_VAR),
+      metavar='DIRECTORY')
+  parser.add_option(
+      '-j', '--jobs', type='int', dest='jobs', default=None,
+      help='scan the source in N processes [optional, defaults to one per CPU]',
+      metavar='N')
   parser.add_option(
       '--verbose', action='store_true', dest='verbose', default=False,
       help=(
@@ -396,7 +437,8 @@ def main():
   except EnvironmentError as e:
     logging.error("Could not change to root directory: %s", e)
     sys.exit(1)
-  chromium_histograms, location_map = readChromiumHistograms()
+  chromium_histograms, location_map = readChromiumHistograms(
+      jobs=options.jobs, cache_dir=options.cache_dir)
   xml_histograms = readAllXmlHistograms()
   unmapped_histograms = chromium_histograms - xml_histograms
 
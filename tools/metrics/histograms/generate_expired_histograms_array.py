@@ -5,7 +5,6 @@
 
 import argparse
 import datetime
-import hashlib
 import logging
 import os
 import re
@@ -15,6 +14,9 @@ import extract_histograms
 import merge_xml
 import histogram_paths
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import metrics_hashes
+
 _DATE_FILE_RE = re.compile(r".*MAJOR_BRANCH_DATE=(.+).*")
 _CURRENT_MILESTONE_RE = re.compile(r"MAJOR=([0-9]{2,3})\n")
 _MILESTONE_EXPIRY_RE = re.compile(r"\AM([0-9]{2,3})")
@@ -150,15 +152,19 @@ def _GetCurrentMilestone(content, regex):
 def _HashName(name):
   """Returns hash for the given histogram |name|."""
   # This corresponds to HashMetricNameAs32Bits() in C++
-  return "0x" + hashlib.md5(name.encode()).hexdigest()[:8]
+  return "0x%08x" % metrics_hashes.HashNameAs32Bits(name)
 
 
-def _GetHashToNameMap(histograms_names):
-  """Returns dictionary {hash: histogram_name}."""
-  hash_to_name_map = dict()
-  for name in histograms_names:
-    hash_to_name_map[_HashName(name)] = name
-  return hash_to_name_map
+def _GetHashToNameMap(histograms_names, hash_index=None):
+  """Returns dictionary {hash: histogram_name}.
+
+  Args:
+    histograms_names: A list of histogram names.
+    hash_index: A metrics_hashes.HashIndex to get the hashes from, or None.
+  """
+  hashes = metrics_hashes.HashNames(histograms_names, hash_index)
+  # HashNameAs32Bits() is the top half of the 64 bit hash.
+  return {"0x%08x" % (value >> 32): name for name, value in hashes.items()}
 
 
 def _GenerateHeaderFileContent(header_filename, namespace,
@@ -190,8 +196,12 @@ def _GenerateHeaderFileContent(header_filename, namespace,
       hashes_size=len(histograms_map))
 
 
-def _GenerateFileContent(descriptions, branch_file_content,
-                         mstone_file_content, header_filename, namespace):
+def _GenerateFileContent(descriptions,
+                         branch_file_content,
+                         mstone_file_content,
+                         header_filename,
+                         namespace,
+                         hash_index=None):
   """Generates header file containing array with hashes of expired histograms.
 
   Args:
@@ -200,6 +210,7 @@ def _GenerateFileContent(descriptions, branch_file_content,
     mstone_file_content: Content of file with milestone information.
     header_filename: A filename of the generated header file.
     namespace: A namespace to contain generated array.
+    hash_index: A metrics_hashes.HashIndex to get the hashes from, or None.
 
   Raises:
     Error if there is an error in input xml files.
@@ -216,7 +227,8 @@ def _GenerateFileContent(descriptions, branch_file_content,
 
   expired_histograms_names = _GetExpiredHistograms(
       histograms, base_date, current_milestone)
-  expired_histograms_map = _GetHashToNameMap(expired_histograms_names)
+  expired_histograms_map = _GetHashToNameMap(expired_histograms_names,
+                                             hash_index)
   header_file_content = _GenerateHeaderFileContent(
       header_filename, namespace, expired_histograms_map)
   return header_file_content
@@ -241,6 +253,8 @@ def _GenerateFile(arguments):
       arguments.output_dir: A directory to put the generated file.
       arguments.major_branch_date_filepath: File path for base date.
       arguments.milestone_filepath: File path for milestone information.
+      arguments.hash_index_filepath: File path for an index of the hashes of
+        histogram names, or None.
   """
   # Assert that the |--inputs| is the same as |histogram_paths.ALL_XMLS| to make
   # sure we have the most updated list of histogram descriptions. Otherwise,
@@ -252,15 +266,17 @@ def _GenerateFile(arguments):
       "components/metrics/generate_expired_histograms_array.gni.\n"
       "  add: %s\n  remove: %s" % (', '.join(to_add), ', '.join(to_remove)))
 
-  descriptions = merge_xml.MergeFiles(arguments.inputs)
+  descriptions = merge_xml.MergeFiles(arguments.inputs, lightweight=True)
   with open(arguments.major_branch_date_filepath, "r") as date_file:
     branch_file_content = date_file.read()
   with open(arguments.milestone_filepath, "r") as milestone_file:
     mstone_file_content = milestone_file.read()
 
+  hash_index = metrics_hashes.HashIndex(arguments.hash_index_filepath)
   header_file_content = _GenerateFileContent(
       descriptions, branch_file_content, mstone_file_content,
-      arguments.header_filename, arguments.namespace)
+      arguments.header_filename, arguments.namespace, hash_index)
+  hash_index.Save()
 
   with open(os.path.join(arguments.output_dir, arguments.header_filename),
             "w") as generated_file:
@@ -297,6 +313,11 @@ def _ParseArguments():
       "-m",
       required=True,
       help="A path to the file with the milestone information.")
+  arg_parser.add_argument(
+      "--hash_index_filepath",
+      default=None,
+      help="A path to an index of the hashes of histogram names, which is "
+      "updated with the new names (optional).")
   arg_parser.add_argument(
       "inputs",
       nargs="+",
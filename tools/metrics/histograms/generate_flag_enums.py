@@ -10,12 +10,9 @@ import re
 import subprocess
 import sys
 
-# Import the UKM codegen library for its hashing function, which is the same
-# hashing function as used for flag names.
-# TODO(crbug.com/1371214) Move `codegen.HashName()` somewhere common so we don't
-#  depend on 'ukm'.
-sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, 'ukm'))
-import codegen
+# The hashing function of metric names is the same as the one of flag names.
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, 'common'))
+import metrics_hashes
 
 sys.path.append(
     os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
@@ -43,7 +40,7 @@ def get_entries_from_feature_string(feature: str) -> list[str]:
   entries = []
   for suffix in ['disabled', 'enabled']:
     label = f'{feature}:{suffix}'
-    value_64 = codegen.HashName(label)
+    value_64 = metrics_hashes.HashName(label)
     value_32 = ctypes.c_int32(value_64).value
     entries.append(f'<int value="{value_32}" label="{label}"/>')
   return entries
@@ -0,0 +1,238 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A compact replacement for xml.dom.minidom trees of histograms metadata.
+
+minidom nodes take several KB each, which adds up to gigabytes for the merged
+histograms metadata. The trees built here only implement the part of the DOM
+API that extract_histograms, populate_enums and merge_xml use to read and merge
+the metadata, and are built from a streaming expat parser. Tools which edit
+and pretty-print the metadata must keep using minidom.
+"""
+
+import xml.dom
+import xml.etree.ElementTree as ET
+
+
+class Node(object):
+  """The base class of the nodes of a tree."""
+  __slots__ = ()
+
+  ELEMENT_NODE = xml.dom.Node.ELEMENT_NODE
+  TEXT_NODE = xml.dom.Node.TEXT_NODE
+  COMMENT_NODE = xml.dom.Node.COMMENT_NODE
+  DOCUMENT_NODE = xml.dom.Node.DOCUMENT_NODE
+
+  childNodes = ()
+  localName = None
+  nodeValue = None
+
+  @property
+  def firstChild(self):
+    return self.childNodes[0] if self.childNodes else None
+
+  @property
+  def lastChild(self):
+    return self.childNodes[-1] if self.childNodes else None
+
+  def toxml(self):
+    """Returns the XML of the node, as minidom's toxml() does."""
+    parts = []
+    self._WriteXml(parts)
+    return ''.join(parts)
+
+
+def _Escape(data):
+  return data.replace('&', '&amp;').replace('<', '&lt;').replace(
+      '"', '&quot;').replace('>', '&gt;')
+
+
+class Text(Node):
+  __slots__ = ('data', )
+  nodeType = Node.TEXT_NODE
+
+  def __init__(self, data):
+    self.data = data
+
+  @property
+  def nodeValue(self):
+    return self.data
+
+  def _WriteXml(self, parts):
+    parts.append(_Escape(self.data))
+
+
+class Comment(Node):
+  __slots__ = ('data', )
+  nodeType = Node.COMMENT_NODE
+
+  def __init__(self, data):
+    self.data = data
+
+  @property
+  def nodeValue(self):
+    return self.data
+
+  def _WriteXml(self, parts):
+    parts.append('<!--%s-->' % self.data)
+
+
+class _ParentNode(Node):
+  __slots__ = ()
+
+  def appendChild(self, node):
+    self.childNodes.append(node)
+    return node
+
+  def insertBefore(self, node, ref_node):
+    if ref_node is None:
+      return self.appendChild(node)
+    self.childNodes.insert(self.childNodes.index(ref_node), node)
+    return node
+
+  def getElementsByTagName(self, tag):
+    """Returns the descendant elements with the given tag, in document order."""
+    matches = []
+    stack = [iter(self.childNodes)]
+    while stack:
+      for child in stack[-1]:
+        if child.nodeType == Node.ELEMENT_NODE:
+          if child.tagName == tag:
+            matches.append(child)
+          stack.append(iter(child.childNodes))
+          break
+      else:
+        stack.pop()
+    return matches
+
+
+class Element(_ParentNode):
+  __slots__ = ('tagName', 'attributes', 'childNodes', 'ownerDocument')
+  nodeType = Node.ELEMENT_NODE
+
+  def __init__(self, tag, attributes, owner_document):
+    self.tagName = tag
+    # Unlike with minidom, the attributes are a dict of names to values.
+    self.attributes = attributes
+    self.childNodes = []
+    self.ownerDocument = owner_document
+
+  @property
+  def localName(self):
+    return self.tagName
+
+  def getAttribute(self, name):
+    return self.attributes.get(name, '')
+
+  def hasAttribute(self, name):
+    return name in self.attributes
+
+  def setAttribute(self, name, value):
+    self.attributes[name] = value
+
+  def _WriteXml(self, parts):
+    parts.append('<' + self.tagName)
+    for name, value in self.attributes.items():
+      parts.append(' %s="%s"' % (name, _Escape(value)))
+    if not self.childNodes:
+      parts.append('/>')
+      return
+    parts.append('>')
+    for child in self.childNodes:
+      child._WriteXml(parts)
+    parts.append('</%s>' % self.tagName)
+
+
+class Document(_ParentNode):
+  __slots__ = ('childNodes', )
+  nodeType = Node.DOCUMENT_NODE
+
+  def __init__(self):
+    self.childNodes = []
+
+  @property
+  def documentElement(self):
+    for child in self.childNodes:
+      if child.nodeType == Node.ELEMENT_NODE:
+        return child
+    return None
+
+  def createElement(self, tag):
+    return Element(tag, {}, self)
+
+  def createTextNode(self, data):
+    return Text(data)
+
+  def _WriteXml(self, parts):
+    parts.append('<?xml version="1.0" ?>')
+    for child in self.childNodes:
+      child._WriteXml(parts)
+
+
+class _TreeBuilder(object):
+  """An xml.etree.ElementTree.XMLParser target that builds a Document."""
+
+  def __init__(self):
+    self._document = Document()
+    self._stack = [self._document]
+
+  def _Append(self, node):
+    self._stack[-1].childNodes.append(node)
+
+  def start(self, tag, attributes):
+    element = Element(tag, attributes, self._document)
+    self._Append(element)
+    self._stack.append(element)
+
+  def end(self, tag):
+    self._stack.pop()
+
+  def data(self, data):
+    # Like minidom, merge adjacent text into a single node.
+    children = self._stack[-1].childNodes
+    if children and children[-1].nodeType == Node.TEXT_NODE:
+      children[-1].data += data
+    else:
+      self._Append(Text(data))
+
+  def comment(self, data):
+    self._Append(Comment(data))
+
+  def close(self):
+    return self._document
+
+
+def _ReadChunks(f):
+  while True:
+    chunk = f.read(1 << 16)
+    if not chunk:
+      return
+    yield chunk
+
+
+def _Parse(chunks):
+  parser = ET.XMLParser(target=_TreeBuilder())
+  for chunk in chunks:
+    parser.feed(chunk)
+  return parser.close()
+
+
+def Parse(filename_or_file):
+  """Parses an XML file, like xml.dom.minidom.parse().
+
+  Args:
+    filename_or_file: The filename, or the file object, to parse.
+
+  Returns:
+    A Document.
+  """
+  if isinstance(filename_or_file, str):
+    with open(filename_or_file, 'rb') as f:
+      return Parse(f)
+  return _Parse(_ReadChunks(filename_or_file))
+
+
+def ParseString(string):
+  """Parses an XML string or bytes, like xml.dom.minidom.parseString()."""
+  return _Parse([string])
@@ -0,0 +1,75 @@
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import unittest
+import xml.dom.minidom
+
+import histogram_paths
+import light_dom
+
+TEST_XML = """<?xml version="1.0" encoding="utf-8"?>
+<!-- Top level comment -->
+<histogram-configuration>
+<histograms>
+  <histogram name="Test.&quot;Quoted&quot;" units="a &amp; b">
+    <owner>person@chromium.org</owner>
+    <summary>
+      Some
+      words.
+
+      <!-- Comment. -->
+
+      Words &lt;b&gt; <b>bold</b> &#8212; café.
+    </summary>
+  </histogram>
+</histograms>
+</histogram-configuration>
+"""
+
+
+class LightDomTest(unittest.TestCase):
+
+  def testToXmlMatchesMinidom(self):
+    self.assertEqual(
+        xml.dom.minidom.parseString(TEST_XML.encode('utf-8')).toxml(),
+        light_dom.ParseString(TEST_XML).toxml())
+    for filename in histogram_paths.ALL_TEST_XMLS:
+      self.assertEqual(
+          xml.dom.minidom.parse(filename).toxml(),
+          light_dom.Parse(filename).toxml())
+
+  def testNodes(self):
+    doc = light_dom.ParseString(TEST_XML)
+    self.assertEqual('histogram-configuration', doc.documentElement.tagName)
+    histogram, = doc.getElementsByTagName('histogram')
+    self.assertEqual('Test."Quoted"', histogram.getAttribute('name'))
+    self.assertTrue(histogram.hasAttribute('units'))
+    self.assertFalse(histogram.hasAttribute('enum'))
+    self.assertEqual('', histogram.getAttribute('enum'))
+
+    owner, = histogram.getElementsByTagName('owner')
+    self.assertEqual('person@chromium.org', owner.firstChild.nodeValue)
+
+    # Text around comments is kept in separate nodes, like with minidom.
+    summary, = histogram.getElementsByTagName('summary')
+    self.assertEqual([
+        light_dom.Node.TEXT_NODE, light_dom.Node.COMMENT_NODE,
+        light_dom.Node.TEXT_NODE, light_dom.Node.ELEMENT_NODE,
+        light_dom.Node.TEXT_NODE
+    ], [child.nodeType for child in summary.childNodes])
+
+  def testEdits(self):
+    doc = light_dom.ParseString('<histogram><owner/></histogram>')
+    histogram = doc.documentElement
+    component = doc.createElement('component')
+    component.appendChild(doc.createTextNode('A>B'))
+    histogram.insertBefore(component, histogram.firstChild)
+    histogram.setAttribute('name', 'Test')
+    self.assertEqual(
+        '<histogram name="Test"><component>A&gt;B</component><owner/>'
+        '</histogram>', histogram.toxml())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Looks up the names of the metrics with the given hashes.
+
+Logs and telemetry dumps identify metrics by the HashMetricName() of histogram
+names and UKM event and metric names, or by the HashMetricNameAs32Bits() of
+histogram names. Hashes are given in hex with a leading 0x, or in decimal, on
+the command line or on stdin, e.g.
+
+  lookup_hashes.py --index=/tmp/metrics_hashes.json 0x0557fa923dcee4d0
+
+With --index, the names in the metadata are only hashed the first time, and
+--update then only hashes the names added since.
+"""
+
+import argparse
+import os
+import sys
+
+import extract_histograms
+import histogram_paths
+import light_dom
+import merge_xml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import metrics_hashes
+
+
+def GetMetadataNames(xml_paths=None, ukm_xml_path=None):
+  """Returns the names of the histograms, and of the UKM events and metrics.
+
+  Args:
+    xml_paths: The histograms metadata files, by default all of them.
+    ukm_xml_path: The UKM metadata file, by default ukm.xml.
+
+  Returns:
+    A sorted list of names.
+  """
+  if xml_paths is None:
+    xml_paths = histogram_paths.ALL_XMLS
+  if ukm_xml_path is None:
+    ukm_xml_path = histogram_paths.UKM_XML
+
+  merged = merge_xml.MergeFiles(xml_paths, lightweight=True)
+  # Errors are logged, and don't keep the other names from being looked up.
+  histograms, _ = extract_histograms.ExtractHistogramsFromDom(merged)
+  names = set(extract_histograms.ExtractNames(histograms))
+
+  ukm = light_dom.Parse(ukm_xml_path)
+  for event in ukm.getElementsByTagName('event'):
+    names.add(event.getAttribute('name'))
+    for metric in event.getElementsByTagName('metric'):
+      names.add(metric.getAttribute('name'))
+  return sorted(names)
+
+
+def ParseHash(text):
+  """Parses a hash from a log.
+
+  Args:
+    text: A hash in hex with a leading 0x, or in decimal. Negative values are
+      read as signed 32 or 64 bit integers.
+
+  Returns:
+    The hash as an unsigned integer.
+
+  Raises:
+    ValueError: If |text| isn't a hash.
+  """
+  value = int(text, 0)
+  if value < -(1 << 31):
+    value &= (1 << 64) - 1
+  elif value < 0:
+    value &= (1 << 32) - 1
+  if value >= 1 << 64:
+    raise ValueError('%s is larger than 64 bits.' % text)
+  return value
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--index',
+                      help='The file to keep the index of the names in.')
+  parser.add_argument('--update',
+                      action='store_true',
+                      help='Update the index with the current metadata.')
+  parser.add_argument('hashes',
+                      nargs='*',
+                      help='The hashes to look up. Read from stdin if none.')
+  args = parser.parse_args()
+
+  index = metrics_hashes.HashIndex(args.index)
+  if args.update or not len(index):
+    names = GetMetadataNames()
+    index.Retain(names)
+    index.Hash(names)
+    index.Save()
+
+  hashes = args.hashes or sys.stdin.read().replace(',', ' ').split()
+  for text in hashes:
+    try:
+      names = index.Lookup(ParseHash(text))
+    except ValueError as e:
+      print('%s\t<invalid: %s>' % (text, e))
+      continue
+    print('%s\t%s' % (text, ', '.join(names) if names else '<unknown>'))
+
+
+if __name__ == '__main__':
+  sys.exit(main())
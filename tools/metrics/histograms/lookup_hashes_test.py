@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# Copyright 2023 The Chromium Authors
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import unittest
+
+import histogram_paths
+import lookup_hashes
+
+
+class LookupHashesTest(unittest.TestCase):
+
+  def testParseHash(self):
+    self.assertEqual(0x0557fa923dcee4d0,
+                     lookup_hashes.ParseHash('0x0557fa923dcee4d0'))
+    self.assertEqual(0x0557fa92, lookup_hashes.ParseHash('89651858'))
+    self.assertEqual(0xffffffff, lookup_hashes.ParseHash('-1'))
+    self.assertEqual(0x8000000000000001,
+                     lookup_hashes.ParseHash('-9223372036854775807'))
+    with self.assertRaises(ValueError):
+      lookup_hashes.ParseHash('Back')
+    with self.assertRaises(ValueError):
+      lookup_hashes.ParseHash('0x10000000000000000')
+
+  def testGetMetadataNames(self):
+    names = lookup_hashes.GetMetadataNames(histogram_paths.ALL_TEST_XMLS,
+                                           histogram_paths.TEST_UKM_XML)
+    self.assertEqual(sorted(set(names)), names)
+    self.assertIn('Test.Histogram', names)
+    self.assertIn('Test.EnumHistogram', names)
+    # UKM events and metrics.
+    self.assertIn('AbusiveExperienceHeuristic.TestEvent1', names)
+    self.assertIn('MetricVersion1', names)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -6,16 +6,30 @@
 """A script to merge multiple source xml files into a single histograms.xml."""
 
 import argparse
+import hashlib
+import json
+import multiprocessing
 import os
 import sys
+import tempfile
 import xml.dom.minidom
 
 import expand_owners
 import extract_histograms
 import histogram_configuration_model
 import histogram_paths
+import light_dom
 import populate_enums
 
+# The environment variable with the default for MergeFiles()'s |cache_dir|.
+CACHE_DIR_ENV_VAR = 'HISTOGRAMS_XML_CACHE_DIR'
+
+# Bump whenever the format of cached fragments changes.
+_FRAGMENTS_VERSION = 1
+
+# The tags of the nodes that are merged sorted by name.
+_SORTED_TAGS = ('variants', 'histogram', 'histogram_suffixes')
+
 
 def GetElementsByTagName(trees, tag, depth=2):
   """Gets all elements with the specified tag from a set of DOM trees.
@@ -169,6 +183,26 @@ def MergeTrees(trees, should_expand_owners):
   return doc
 
 
+def _MergeLightweightTrees(trees):
+  """Merges a list of light_dom trees, like MergeTrees() does for DOM trees."""
+  doc = light_dom.Document()
+
+  def SortedNodes(tag):
+    return sorted(GetElementsByTagName(trees, tag, depth=3),
+                  key=lambda node: node.getAttribute('name').lower())
+
+  histograms = MakeNodeWithChildren(
+      doc, 'histograms',
+      SortedNodes('variants') + SortedNodes('histogram'))
+  histogram_suffixes_list = MakeNodeWithChildren(
+      doc, 'histogram_suffixes_list', SortedNodes('histogram_suffixes'))
+  doc.appendChild(
+      MakeNodeWithChildren(
+          doc, 'histogram-configuration',
+          GetEnumsNodes(doc, trees) + [histograms, histogram_suffixes_list]))
+  return doc
+
+
 def _GetComponentFromMetadataFile(filename):
   """Extracts a component string from the metadata file.
 
@@ -209,16 +243,19 @@ def _AddComponentFromMetadataFile(tree, filename):
   return tree
 
 
-def _BuildDOMTreeWithComponentMetadata(filename_or_file):
+def _BuildDOMTreeWithComponentMetadata(filename_or_file,
+                                       parse=xml.dom.minidom.parse):
   """Builds the DOM tree for the given file.
 
   Args:
     filename_or_file: The string filename or the file handle for histograms.xml.
+    parse: The function to parse the file with, i.e. xml.dom.minidom.parse or
+      light_dom.Parse.
 
   Returns:
     The histograms.xml DOM tree with (optional) component metadata.
   """
-  tree = xml.dom.minidom.parse(filename_or_file)
+  tree = parse(filename_or_file)
   if isinstance(filename_or_file, str):
     # If we can find a metadata file in the same directory, we try to extract
     # a component from it.
@@ -229,7 +266,156 @@ def _BuildDOMTreeWithComponentMetadata(filename_or_file):
   return tree
 
 
-def MergeFiles(filenames=[], files=[], should_expand_owners=False):
+def _ExtractFragments(tree):
+  """Serializes the nodes of a histograms.xml DOM tree that MergeTrees() uses.
+
+  Args:
+    tree: A histograms.xml DOM tree.
+
+  Returns:
+    A dict with the XML of the <enums> and ukm <event> nodes, and for each tag
+    in _SORTED_TAGS, a list of [lower case name, XML] of the nodes.
+  """
+  trees = [tree]
+  fragments = {
+      'enums': [node.toxml() for node in GetElementsByTagName(trees, 'enums')],
+      'ukm_events': [
+          node.toxml() for node in GetElementsByTagName(
+              GetElementsByTagName(trees, 'ukm-configuration'), 'event')
+      ],
+  }
+  for tag in _SORTED_TAGS:
+    fragments[tag] = [[node.getAttribute('name').lower(),
+                       node.toxml()]
+                      for node in GetElementsByTagName(trees, tag, depth=3)]
+  return fragments
+
+
+def _ExtractFragmentsFromFile(filename):
+  return _ExtractFragments(_BuildDOMTreeWithComponentMetadata(filename))
+
+
+def _FragmentsCachePath(cache_dir, filename):
+  """Returns the path to cache the fragments of |filename| at.
+
+  The path depends on the contents of the file and of the DIR_METADATA file
+  next to it, which determines the components added to histograms.
+  """
+  h = hashlib.sha256(b'%d' % _FRAGMENTS_VERSION)
+  with open(filename, 'rb') as f:
+    h.update(f.read())
+  metadata_filename = os.path.join(os.path.dirname(filename), 'DIR_METADATA')
+  if os.path.exists(metadata_filename):
+    with open(metadata_filename, 'rb') as f:
+      h.update(b'\0')
+      h.update(f.read())
+  return os.path.join(cache_dir, h.hexdigest() + '.json')
+
+
+def _ReadFragments(path):
+  try:
+    with open(path, 'r', encoding='utf-8') as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return None
+
+
+def _WriteFragments(path, fragments):
+  fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp')
+  try:
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      json.dump(fragments, f)
+    os.replace(tmp_path, path)
+  except BaseException:
+    os.unlink(tmp_path)
+    raise
+
+
+def _ExtractFragmentsFromFiles(filenames, cache_dir, jobs):
+  """Returns the fragments of |filenames|, reusing cached ones if possible.
+
+  Args:
+    filenames: A list of histograms.xml filenames.
+    cache_dir: A directory to cache fragments in, or None.
+    jobs: The number of processes to parse uncached files in.
+
+  Returns:
+    A list with the fragments of each file (see _ExtractFragments()).
+  """
+  fragments_list = [None] * len(filenames)
+  cache_paths = [None] * len(filenames)
+  if cache_dir:
+    os.makedirs(cache_dir, exist_ok=True)
+    for i, filename in enumerate(filenames):
+      cache_paths[i] = _FragmentsCachePath(cache_dir, filename)
+      fragments_list[i] = _ReadFragments(cache_paths[i])
+
+  missing = [i for i, f in enumerate(fragments_list) if f is None]
+  missing_filenames = [filenames[i] for i in missing]
+  if jobs > 1 and len(missing) > 1:
+    with multiprocessing.Pool(min(jobs, len(missing))) as pool:
+      results = pool.map(_ExtractFragmentsFromFile, missing_filenames)
+  else:
+    results = [_ExtractFragmentsFromFile(f) for f in missing_filenames]
+
+  for i, fragments in zip(missing, results):
+    fragments_list[i] = fragments
+    if cache_paths[i]:
+      _WriteFragments(cache_paths[i], fragments)
+  return fragments_list
+
+
+def _PopulateEnumsWithUkmEvents(enums_xmls, ukm_event_xmls):
+  """Returns |enums_xmls| with the ukm events added, see GetEnumsNodes()."""
+  doc = xml.dom.minidom.parseString('<root>%s</root>' % ''.join(enums_xmls))
+  events_doc = xml.dom.minidom.parseString('<root>%s</root>' %
+                                           ''.join(ukm_event_xmls))
+  iter_matches = extract_histograms.IterElementsWithTag
+  ukm_events = list(iter_matches(events_doc.documentElement, 'event', 1))
+  enums_list = list(iter_matches(doc.documentElement, 'enums', 1))
+  for enums in enums_list:
+    populate_enums.PopulateEnumsWithUkmEvents(doc, enums, ukm_events)
+  return [enums.toxml() for enums in enums_list]
+
+
+def _MergeFragments(fragments_list, should_expand_owners, lightweight,
+                    cache_dir):
+  """Like MergeTrees(), but for the fragments of the trees.
+
+  Since nodes are merged as XML text, this avoids building a DOM tree for each
+  file before building the merged one.
+  """
+  enums_xmls = [e for f in fragments_list for e in f['enums']]
+  ukm_event_xmls = [e for f in fragments_list for e in f['ukm_events']]
+  if ukm_event_xmls:
+    enums_xmls = _PopulateEnumsWithUkmEvents(enums_xmls, ukm_event_xmls)
+
+  def SortedXmls(tag):
+    entries = [e for f in fragments_list for e in f[tag]]
+    return [xml_text for _, xml_text in sorted(entries, key=lambda e: e[0])]
+
+  merged_xml = ''.join(['<histogram-configuration>'] + enums_xmls +
+                       ['<histograms>'] + SortedXmls('variants') +
+                       SortedXmls('histogram') +
+                       ['</histograms>', '<histogram_suffixes_list>'] +
+                       SortedXmls('histogram_suffixes') +
+                       ['</histogram_suffixes_list>',
+                        '</histogram-configuration>'])
+  if lightweight:
+    return light_dom.ParseString(merged_xml)
+  doc = xml.dom.minidom.parseString(merged_xml.encode('utf-8'))
+  if should_expand_owners:
+    for histograms in doc.getElementsByTagName('histograms'):
+      expand_owners.ExpandHistogramsOWNERS(histograms, cache_dir=cache_dir)
+  return doc
+
+
+def MergeFiles(filenames=[],
+               files=[],
+               should_expand_owners=False,
+               cache_dir=None,
+               jobs=1,
+               lightweight=False):
   """Merges a list of histograms.xml files.
 
   Args:
@@ -238,24 +424,63 @@ def MergeFiles(filenames=[], files=[], should_expand_owners=False):
     should_expand_owners: Whether we want to expand owners. By default, it's
       false because most of the callers don't care about the owners for each
       metadata.
+    cache_dir: A directory in which to cache the nodes parsed from each of
+      |filenames|, so that only the files that changed since they were last
+      merged are parsed again, and the components of OWNERS directories.
+      Defaults to $HISTOGRAMS_XML_CACHE_DIR, if set.
+    jobs: The number of processes to parse |filenames| in, or None for one per
+      CPU.
+    lightweight: Whether to return a light_dom tree instead of a minidom one.
+      It takes a fraction of the memory, but only supports reading the merged
+      metadata, e.g. with extract_histograms, so owners can't be expanded.
 
   Returns:
     A merged DOM tree.
   """
+  if lightweight and should_expand_owners:
+    raise ValueError('Owners can only be expanded in minidom trees.')
+  if cache_dir is None:
+    cache_dir = os.environ.get(CACHE_DIR_ENV_VAR)
+  if jobs is None:
+    jobs = multiprocessing.cpu_count()
+  if cache_dir or jobs > 1:
+    fragments_list = [
+        _ExtractFragments(_BuildDOMTreeWithComponentMetadata(f)) for f in files
+    ] + _ExtractFragmentsFromFiles(filenames, cache_dir, jobs)
+    return _MergeFragments(fragments_list, should_expand_owners, lightweight,
+                           cache_dir)
+
   # minidom.parse() takes both files and filenames:
   all_files = files + filenames
+  if lightweight:
+    return _MergeLightweightTrees([
+        _BuildDOMTreeWithComponentMetadata(f, parse=light_dom.Parse)
+        for f in all_files
+    ])
   trees = [_BuildDOMTreeWithComponentMetadata(f) for f in all_files]
   return MergeTrees(trees, should_expand_owners)
 
 
-def PrettyPrintMergedFiles(filenames=[], files=[]):
+def PrettyPrintMergedFiles(filenames=[], files=[], cache_dir=None, jobs=1):
   return histogram_configuration_model.PrettifyTree(
-      MergeFiles(filenames=filenames, files=files, should_expand_owners=True))
+      MergeFiles(filenames=filenames,
+                 files=files,
+                 should_expand_owners=True,
+                 cache_dir=cache_dir,
+                 jobs=jobs))
 
 
 def main():
   parser = argparse.ArgumentParser()
   parser.add_argument('--output', required=True)
+  parser.add_argument('--cache-dir',
+                      help='Directory to cache the nodes parsed from each '
+                      'file in, so that only modified files are parsed again.')
+  parser.add_argument('-j',
+                      '--jobs',
+                      type=int,
+                      default=1,
+                      help='Number of processes to parse files in.')
   args = parser.parse_args()
   with open(args.output, 'w', encoding='utf-8', newline='\n') as f:
     # This is run by
@@ -263,8 +488,11 @@ def main():
     # to send the merged histograms.xml to the server side. Providing |UKM_XML|
     # here is not to merge ukm.xml but to populate `UkmEventNameHash` enum
     # values.
-    f.write(PrettyPrintMergedFiles(
-      histogram_paths.ALL_XMLS + [histogram_paths.UKM_XML]))
+    f.write(
+        PrettyPrintMergedFiles(histogram_paths.ALL_XMLS +
+                               [histogram_paths.UKM_XML],
+                               cache_dir=args.cache_dir,
+                               jobs=args.jobs))
 
 
 if __name__ == '__main__':
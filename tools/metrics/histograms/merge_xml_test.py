@@ -2,6 +2,9 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
+import tempfile
 import unittest
 import xml.dom.minidom
 
@@ -262,6 +265,41 @@ class MergeXmlTest(unittest.TestCase):
 """
     self.assertMultiLineEqual(expected_merged_xml.strip(), merged.strip())
 
+  def testMergeFiles_WithCache(self):
+    """Checks that cached and parallel merges match the uncached merge."""
+    filenames = histogram_paths.ALL_TEST_XMLS + [
+        histogram_paths.TEST_XML_WITH_COMPONENTS
+    ]
+    expected_merged_xml = merge_xml.PrettyPrintMergedFiles(filenames)
+    cache_dir = tempfile.mkdtemp()
+    try:
+      for jobs in [2, 1]:
+        merged = merge_xml.PrettyPrintMergedFiles(filenames,
+                                                  cache_dir=cache_dir,
+                                                  jobs=jobs)
+        self.assertMultiLineEqual(expected_merged_xml, merged)
+      # The second merge reused the files cached by the first one.
+      self.assertEqual(len(filenames), len(os.listdir(cache_dir)))
+    finally:
+      shutil.rmtree(cache_dir)
+
+  def testMergeFiles_Lightweight(self):
+    """Checks that light_dom trees are merged the same as minidom ones."""
+    filenames = histogram_paths.ALL_TEST_XMLS + [
+        histogram_paths.TEST_XML_WITH_COMPONENTS
+    ]
+    expected_merged_xml = merge_xml.MergeFiles(filenames).toxml()
+    self.assertEqual(
+        expected_merged_xml,
+        merge_xml.MergeFiles(filenames, lightweight=True).toxml())
+    self.assertEqual(
+        expected_merged_xml,
+        merge_xml.MergeFiles(filenames, jobs=2, lightweight=True).toxml())
+    with self.assertRaises(ValueError):
+      merge_xml.MergeFiles(filenames,
+                           should_expand_owners=True,
+                           lightweight=True)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -34,9 +34,8 @@ def _GetEventDetails(event):
   hash = codegen.HashName(name) & 0x7fffffff
 
   def _HasDirectObsoleteTag(node):
-    return any(
-        isinstance(child, xml.dom.minidom.Element)
-        and child.tagName == 'obsolete' for child in node.childNodes)
+    return any(child.nodeType == xml.dom.minidom.Node.ELEMENT_NODE
+               and child.tagName == 'obsolete' for child in node.childNodes)
 
   # The UKM event is considered obsolete if the event itself is marked as
   # obsolete with a tag or all of its metrics are marked as obsolete.
@@ -31,7 +31,7 @@ def get_names(xml_files):
     A tuple of (names, obsolete names), where the obsolete names is a subset of
     all names.
   """
-  doc = merge_xml.MergeFiles(files=xml_files)
+  doc = merge_xml.MergeFiles(files=xml_files, lightweight=True)
   histograms, had_errors = extract_histograms.ExtractHistogramsFromDom(doc)
   if had_errors:
     raise ValueError("Error parsing inputs.")
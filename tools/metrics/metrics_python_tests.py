@@ -24,6 +24,8 @@ sys.exit(
     typ.main(
         tests=resolve(
             'actions/extract_actions_test.py',
+            'common/metrics_hashes_test.py',
+            'common/source_scanner_test.py',
 
             # TODO(crbug.com/1220251) - the test ordering is very sensitive due to
             # potential name collisions between ukm/pretty_print.py and
@@ -40,6 +42,8 @@ sys.exit(
             'histograms/expand_owners_unittest.py',
             'histograms/extract_histograms_test.py',
             'histograms/generate_expired_histograms_array_unittest.py',
+            'histograms/light_dom_test.py',
+            'histograms/lookup_hashes_test.py',
             'histograms/pretty_print_test.py',
             '../json_comment_eater/json_comment_eater_test.py',
             '../json_to_struct/element_generator_test.py',
@@ -89,6 +89,6 @@ const uint64_t {event.name}::k{metric.name}NameHash;
 """)
 
 
-def WriteFiles(outdir, relpath, data):
-  HEADER.WriteFile(outdir, relpath, data)
-  IMPL.WriteFile(outdir, relpath, data)
+def WriteFiles(outdir, relpath, data, hash_index=None):
+  HEADER.WriteFile(outdir, relpath, data, hash_index)
+  IMPL.WriteFile(outdir, relpath, data, hash_index)
@@ -4,13 +4,15 @@
 
 """Objects for describing template code that can be generated from ukm.xml."""
 
-import hashlib
 import os
 import re
-import struct
+import sys
 from ukm_model import _EVENT_TYPE
 from ukm_model import _METRIC_TYPE
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import metrics_hashes
+
 
 def sanitize_name(name):
   s = re.sub('[^0-9a-zA-Z_]', '_', name)
@@ -19,8 +21,7 @@ def sanitize_name(name):
 
 def HashName(name):
   # This must match the hash function in //base/metrics/metrics_hashes.cc.
-  # >Q: 8 bytes, big endian.
-  return struct.unpack('>Q', hashlib.md5(name.encode()).digest()[:8])[0]
+  return metrics_hashes.HashName(name)
 
 
 class FileInfo(object):
@@ -30,17 +31,36 @@ class FileInfo(object):
 
 
 class EventInfo(object):
-  def __init__(self, json_obj):
+  def __init__(self, json_obj, hashes=None):
     self.raw_name = json_obj['name']
     self.name = sanitize_name(json_obj['name'])
-    self.hash = HashName(json_obj['name'])
+    self.hash = (hashes[self.raw_name]
+                 if hashes is not None else HashName(self.raw_name))
 
 
 class MetricInfo(object):
-  def __init__(self, json_obj):
+  def __init__(self, json_obj, hashes=None):
     self.raw_name = json_obj['name']
     self.name = sanitize_name(json_obj['name'])
-    self.hash = HashName(json_obj['name'])
+    self.hash = (hashes[self.raw_name]
+                 if hashes is not None else HashName(self.raw_name))
+
+
+def HashNames(data, hash_index=None):
+  """Hashes the names of all the events and metrics of |data| in one batch.
+
+  Args:
+    data: The parsed ukm.xml data.
+    hash_index: A metrics_hashes.HashIndex to get the hashes from, or None.
+
+  Returns:
+    A dict of the names to their HashName().
+  """
+  names = []
+  for event in data[_EVENT_TYPE.tag]:
+    names.append(event['name'])
+    names.extend(metric['name'] for metric in event[_METRIC_TYPE.tag])
+  return metrics_hashes.HashNames(names, hash_index)
 
 
 class Template(object):
@@ -52,39 +72,42 @@ class Template(object):
     self.event_template = event_template
     self.metric_template = metric_template
 
-  def _StampMetricCode(self, file_info, event_info, metric):
+  def _StampMetricCode(self, file_info, event_info, metric, hashes):
     return self.metric_template.format(
         file=file_info,
         event=event_info,
-        metric=MetricInfo(metric))
+        metric=MetricInfo(metric, hashes))
 
-  def _StampEventCode(self, file_info, event):
-    event_info = EventInfo(event)
+  def _StampEventCode(self, file_info, event, hashes):
+    event_info = EventInfo(event, hashes)
     metric_code = "".join(
-        self._StampMetricCode(file_info, event_info, metric)
+        self._StampMetricCode(file_info, event_info, metric, hashes)
         for metric in event[_METRIC_TYPE.tag])
     return self.event_template.format(
         file=file_info,
         event=event_info,
         metric_code=metric_code)
 
-  def _StampFileCode(self, relpath, data):
+  def _StampFileCode(self, relpath, data, hash_index=None):
     file_info = FileInfo(relpath, self.basename)
+    hashes = HashNames(data, hash_index)
     event_code = "".join(
-        self._StampEventCode(file_info, event)
+        self._StampEventCode(file_info, event, hashes)
         for event in data[_EVENT_TYPE.tag])
     return self.file_template.format(
         file=file_info,
         event_code=event_code)
 
-  def WriteFile(self, outdir, relpath, data):
+  def WriteFile(self, outdir, relpath, data, hash_index=None):
     """Generates code and writes it to a file.
 
     Args:
       relpath: The path to the file in the source tree.
       rootdir: The root of the path the file should be written to.
       data: The parsed ukm.xml data.
+      hash_index: A metrics_hashes.HashIndex to share the hashes of the names
+        between templates with, or None.
     """
     output = open(os.path.join(outdir, self.basename), 'w')
-    output.write(self._StampFileCode(relpath, data))
+    output.write(self._StampFileCode(relpath, data, hash_index))
     output.close()
@@ -74,6 +74,6 @@ metric_template="""
 """)
 
 
-def WriteFiles(outdir, relpath, data):
-  HEADER.WriteFile(outdir, relpath, data)
-  IMPL.WriteFile(outdir, relpath, data)
+def WriteFiles(outdir, relpath, data, hash_index=None):
+  HEADER.WriteFile(outdir, relpath, data, hash_index)
+  IMPL.WriteFile(outdir, relpath, data, hash_index)
@@ -11,23 +11,33 @@ entries and metrics.
 """
 
 import argparse
+import os
 import sys
 
 import ukm_model
 import builders_template
 import decode_template
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'common'))
+import metrics_hashes
+
 parser = argparse.ArgumentParser(description='Generate UKM entry builders')
 parser.add_argument('--input', help='Path to ukm.xml')
 parser.add_argument('--output', help='Path to generated files.')
+parser.add_argument('--hash_index',
+                    help='Path to an index of the hashes of the names, which '
+                    'is updated with the new names.')
 
 
 def main(argv):
   args = parser.parse_args()
   data = ReadFilteredData(args.input)
   relpath = 'services/metrics/public/cpp/'
-  builders_template.WriteFiles(args.output, relpath, data)
-  decode_template.WriteFiles(args.output, relpath, data)
+  # The names are hashed once and shared by all the templates.
+  hash_index = metrics_hashes.HashIndex(args.hash_index)
+  builders_template.WriteFiles(args.output, relpath, data, hash_index)
+  decode_template.WriteFiles(args.output, relpath, data, hash_index)
+  hash_index.Save()
   return 0
 
 
@@ -126,7 +126,8 @@ class UkmXmlValidation(object):
     errors = []
     warnings = []
 
-    enum_tree = merge_xml.MergeFiles([histogram_paths.ENUMS_XML])
+    enum_tree = merge_xml.MergeFiles([histogram_paths.ENUMS_XML],
+                                     lightweight=True)
     enums, _ = extract_histograms.ExtractEnumsFromXmlTree(enum_tree)
 
     for event_node in self.config.getElementsByTagName('event'):
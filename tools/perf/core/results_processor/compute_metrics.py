@@ -108,9 +108,10 @@ def ComputeTBMv3Metrics(test_result,
     return
 
   start = time.time()
-  histograms = trace_processor.RunMetrics(
-      trace_processor_path, artifacts[CONCATENATED_PROTO_NAME]['filePath'],
-      metrics, fetch_power_profile)
+  with trace_processor.TraceProcessorSession(
+      trace_processor_path,
+      artifacts[CONCATENATED_PROTO_NAME]['filePath']) as session:
+    histograms = session.RunMetrics(metrics, fetch_power_profile)
   test_result['_histograms'].Merge(histograms)
   logging.info('%s: Computing TBMv3 metrics took %.3f seconds.' % (
       test_result['testPath'], time.time() - start))
@@ -18,7 +18,8 @@ import mock
 
 RUN_METRICS_METHOD = 'tracing.metrics.metric_runner.RunMetricOnSingleTrace'
 GETSIZE_METHOD = 'os.path.getsize'
-TRACE_PROCESSOR_METRIC_METHOD = 'core.tbmv3.trace_processor.RunMetrics'
+TRACE_PROCESSOR_SESSION_CLASS = (
+    'core.tbmv3.trace_processor.TraceProcessorSession')
 
 
 class ComputeMetricsTest(unittest.TestCase):
@@ -123,9 +124,12 @@ class ComputeMetricsTest(unittest.TestCase):
     metric_result = histogram_set.HistogramSet()
     metric_result.CreateHistogram('a', 'unitless', [0])
 
-    with mock.patch(TRACE_PROCESSOR_METRIC_METHOD) as run_metric_mock:
-      run_metric_mock.return_value = metric_result
+    with mock.patch(TRACE_PROCESSOR_SESSION_CLASS) as session_mock:
+      session = session_mock.return_value.__enter__.return_value
+      session.RunMetrics.return_value = metric_result
       compute_metrics.ComputeTBMv3Metrics(test_result, '/path/to/tp')
+      session_mock.assert_called_once_with('/path/to/tp', '/concatenated.pb')
+      session.RunMetrics.assert_called_once_with(['metric'], False)
 
     histogram_dicts = test_result['_histograms'].AsDicts()
     self.assertEqual(histogram_dicts, metric_result.AsDicts())
@@ -3,12 +3,17 @@
 # found in the LICENSE file.
 
 import csv
+import http.client
 import json
 import logging
 import os
+import shutil
+import socket
+import struct
 import subprocess
 import tempfile
 import threading
+import time
 
 from collections import namedtuple
 
@@ -71,17 +76,21 @@ def _EnsurePowerProfile():
   return _fetched_power_profile
 
 
-def _RunTraceProcessor(*args):
-  """Run trace processor shell with given command line arguments."""
+def _TraceProcessorEnvironment():
   # Unset environment variables that are not needed for current trace processor
   # use cases, but, if set, can interfere with its execution.
   custom_environment = os.environ.copy()
   custom_environment.pop('PERFETTO_BINARY_PATH', None)
   custom_environment.pop('PERFETTO_SYMBOLIZER_MODE', None)
+  return custom_environment
+
+
+def _RunTraceProcessor(*args):
+  """Run trace processor shell with given command line arguments."""
   p = subprocess.Popen(args,
                        stdout=subprocess.PIPE,
                        stderr=subprocess.PIPE,
-                       env=custom_environment)
+                       env=_TraceProcessorEnvironment())
   stdout, stderr = p.communicate()
   stdout = stdout.decode('utf-8')
   stderr = stderr.decode('utf-8')
@@ -332,7 +341,11 @@ def RunMetrics(trace_processor_path,
 
   output = _RunTraceProcessor(*command_args)
   measurements = json.loads(output)
+  return _MetricsToHistograms(measurements, metric_names, retain_all_samples)
+
 
+def _MetricsToHistograms(measurements, metric_names, retain_all_samples):
+  """Converts the JSON output of trace processor metrics to a HistogramSet."""
   histograms = histogram_set.HistogramSet()
   root_annotations = measurements.get('__annotations', {})
   for metric_name in metric_names:
@@ -399,3 +412,379 @@ def ConvertProtoTraceToJson(trace_processor_path, proto_file, json_path):
     )
 
   return json_path
+
+
+# Field numbers and values of the trace processor RPC protos, see
+# protos/perfetto/trace_processor/trace_processor.proto in Perfetto.
+_QUERY_ARGS_SQL_QUERY = 1
+_QUERY_RESULT_COLUMN_NAMES = 1
+_QUERY_RESULT_ERROR = 2
+_QUERY_RESULT_BATCH = 3
+_CELLS_BATCH_CELLS = 1
+_CELLS_BATCH_VARINT_CELLS = 2
+_CELLS_BATCH_FLOAT64_CELLS = 3
+_CELLS_BATCH_BLOB_CELLS = 4
+_CELLS_BATCH_STRING_CELLS = 5
+_CELL_NULL = 1
+_CELL_VARINT = 2
+_CELL_FLOAT64 = 3
+_CELL_STRING = 4
+_CELL_BLOB = 5
+_COMPUTE_METRIC_ARGS_METRIC_NAMES = 1
+_COMPUTE_METRIC_ARGS_FORMAT = 2
+_COMPUTE_METRIC_FORMAT_JSON = 2
+_COMPUTE_METRIC_RESULT_ERROR = 2
+_COMPUTE_METRIC_RESULT_JSON = 4
+
+# The virtual path the metrics in METRICS_PATH are mounted on in sessions.
+_METRIC_EXTENSION_PATH = 'tbmv3/'
+
+
+def _EncodeVarint(value):
+  value &= (1 << 64) - 1
+  encoded = bytearray()
+  while value > 0x7f:
+    encoded.append(value & 0x7f | 0x80)
+    value >>= 7
+  encoded.append(value)
+  return bytes(encoded)
+
+
+def _EncodeField(field_number, value):
+  """Encodes a proto field with an int value, or a string or bytes value."""
+  if isinstance(value, int):
+    return _EncodeVarint(field_number << 3) + _EncodeVarint(value)
+  if isinstance(value, str):
+    value = value.encode('utf-8')
+  return (_EncodeVarint(field_number << 3 | 2) + _EncodeVarint(len(value)) +
+          value)
+
+
+def _DecodeVarint(data, pos):
+  value = 0
+  shift = 0
+  while True:
+    byte = data[pos]
+    pos += 1
+    value |= (byte & 0x7f) << shift
+    if not byte & 0x80:
+      return value, pos
+    shift += 7
+
+
+def _DecodeFields(data):
+  """Yields the (field number, wire type, value) of the fields of a proto.
+
+  Varint values are ints, and the other values are bytes.
+  """
+  pos = 0
+  while pos < len(data):
+    key, pos = _DecodeVarint(data, pos)
+    field_number, wire_type = key >> 3, key & 7
+    if wire_type == 0:
+      value, pos = _DecodeVarint(data, pos)
+    elif wire_type == 1:
+      value, pos = data[pos:pos + 8], pos + 8
+    elif wire_type == 2:
+      length, pos = _DecodeVarint(data, pos)
+      value, pos = data[pos:pos + length], pos + length
+    elif wire_type == 5:
+      value, pos = data[pos:pos + 4], pos + 4
+    else:
+      raise InvalidTraceProcessorOutput('Unexpected proto wire type %d' %
+                                        wire_type)
+    yield field_number, wire_type, value
+
+
+def _DecodeRepeatedVarints(wire_type, value):
+  """Returns the ints of a packed, or unpacked, repeated varint field."""
+  if wire_type == 0:
+    return [value]
+  values = []
+  pos = 0
+  while pos < len(value):
+    varint, pos = _DecodeVarint(value, pos)
+    values.append(varint)
+  return values
+
+
+def _ToInt64(value):
+  return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class QueryResult(object):
+  """The result of a query, with typed values stored by column.
+
+  Values are ints, floats, strs, bytes, or None for NULL.
+
+  Attributes:
+    column_names: A list with the name of each column.
+    columns: A list with the values of each column.
+  """
+
+  def __init__(self, column_names, columns):
+    self.column_names = column_names
+    self.columns = columns
+
+  def __len__(self):
+    return len(self.columns[0]) if self.columns else 0
+
+  def Column(self, name):
+    """Returns the values of the column with the given name."""
+    return self.columns[self.column_names.index(name)]
+
+  def Rows(self):
+    """Returns a list with a dict of column names to values for each row."""
+    return [dict(zip(self.column_names, row)) for row in zip(*self.columns)]
+
+
+def _DecodeQueryResult(data):
+  """Decodes the QueryResult protos of the /query RPC into a QueryResult.
+
+  The RPC streams several QueryResult protos: the first one has the column
+  names, and each one has batches of cells. The cells are stored row by row,
+  with the values of each type in separate lists.
+
+  Raises:
+    RuntimeError: If the query failed.
+  """
+  column_names = []
+  errors = []
+  cell_types = []
+  values = {
+      _CELL_VARINT: [],
+      _CELL_FLOAT64: [],
+      _CELL_STRING: [],
+      _CELL_BLOB: [],
+  }
+  for field_number, _, value in _DecodeFields(data):
+    if field_number == _QUERY_RESULT_COLUMN_NAMES:
+      column_names.append(value.decode('utf-8'))
+      continue
+    if field_number == _QUERY_RESULT_ERROR:
+      errors.append(value.decode('utf-8'))
+      continue
+    if field_number != _QUERY_RESULT_BATCH:
+      continue
+    for batch_field, wire_type, batch_value in _DecodeFields(value):
+      if batch_field == _CELLS_BATCH_CELLS:
+        cell_types.extend(_DecodeRepeatedVarints(wire_type, batch_value))
+      elif batch_field == _CELLS_BATCH_VARINT_CELLS:
+        values[_CELL_VARINT].extend(
+            _ToInt64(v)
+            for v in _DecodeRepeatedVarints(wire_type, batch_value))
+      elif batch_field == _CELLS_BATCH_FLOAT64_CELLS:
+        values[_CELL_FLOAT64].extend(
+            struct.unpack('<%dd' % (len(batch_value) // 8), batch_value))
+      elif batch_field == _CELLS_BATCH_BLOB_CELLS:
+        values[_CELL_BLOB].append(bytes(batch_value))
+      elif batch_field == _CELLS_BATCH_STRING_CELLS:
+        # Each string is NUL terminated.
+        strings = bytes(batch_value).decode('utf-8').split('\0')
+        values[_CELL_STRING].extend(strings[:-1])
+  if any(errors):
+    raise RuntimeError('Trace processor query failed: %s' %
+                       '\n'.join(e for e in errors if e))
+
+  if cell_types and (not column_names or
+                     len(cell_types) % len(column_names)):
+    raise InvalidTraceProcessorOutput(
+        'Got %d cells for %d columns' % (len(cell_types), len(column_names)))
+
+  columns = [[] for _ in column_names]
+  iterators = {cell_type: iter(v) for cell_type, v in values.items()}
+  for i, cell_type in enumerate(cell_types):
+    if cell_type == _CELL_NULL:
+      value = None
+    elif cell_type in iterators:
+      value = next(iterators[cell_type], None)
+      if value is None:
+        raise InvalidTraceProcessorOutput('Missing value for cell %d' % i)
+    else:
+      raise InvalidTraceProcessorOutput('Unexpected cell type %d' % cell_type)
+    columns[i % len(columns)].append(value)
+  return QueryResult(column_names, columns)
+
+
+def _GetFreePort():
+  with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    s.bind(('127.0.0.1', 0))
+    return s.getsockname()[1]
+
+
+# The number of seconds to wait for trace processor to load a trace.
+_SESSION_STARTUP_TIMEOUT = 300
+
+
+class TraceProcessorSession(object):
+  """A trace processor instance with a trace loaded.
+
+  Loading and indexing a trace takes most of the time of running a query or a
+  metric on it, so a session keeps the trace loaded in a trace processor that
+  serves RPCs over HTTP, and runs all queries and metrics on it. The metrics in
+  METRICS_PATH are loaded in the trace processor as a metric extension.
+
+  Sessions must be closed, e.g. by using them as context managers:
+
+    with TraceProcessorSession(trace_processor_path, trace_file) as session:
+      result = session.Query('select name, dur from slice')
+      histograms = session.RunMetrics(['console_error_metric'])
+  """
+
+  def __init__(self,
+               trace_processor_path,
+               trace_file,
+               startup_timeout=_SESSION_STARTUP_TIMEOUT):
+    """Starts trace processor and loads |trace_file| in it.
+
+    Args:
+      trace_processor_path: path to the trace_processor executable, or None to
+        download it.
+      trace_file: path to the trace file.
+      startup_timeout: the number of seconds to wait for the trace to load.
+
+    Raises:
+      RuntimeError: If trace processor fails to start or to load the trace in
+        time.
+    """
+    self.trace_file = trace_file
+    self._ran_power_profile = False
+    self._process = None
+    trace_processor_path = _EnsureTraceProcessor(trace_processor_path)
+    self._temp_dir = tempfile.mkdtemp()
+    try:
+      self._Start(trace_processor_path, startup_timeout)
+    except BaseException:
+      self.Close()
+      raise
+
+  def _Start(self, trace_processor_path, timeout):
+    extension_dir = os.path.join(self._temp_dir, 'metrics', '')
+    for subdir, extension in (('sql', '.sql'), ('protos', '.proto')):
+      os.makedirs(os.path.join(extension_dir, subdir))
+      for name in os.listdir(METRICS_PATH):
+        if name.endswith(extension):
+          shutil.copy(os.path.join(METRICS_PATH, name),
+                      os.path.join(extension_dir, subdir))
+
+    self._port = _GetFreePort()
+    self._command_args = [
+        trace_processor_path,
+        '--httpd',
+        '--http-port',
+        str(self._port),
+        '--metric-extension',
+        extension_dir + '@' + _METRIC_EXTENSION_PATH,
+        self.trace_file,
+    ]
+    self._stderr = tempfile.TemporaryFile(dir=self._temp_dir)
+    self._process = subprocess.Popen(self._command_args,
+                                     stdout=subprocess.DEVNULL,
+                                     stderr=self._stderr,
+                                     env=_TraceProcessorEnvironment())
+    # The server starts once the trace is loaded.
+    deadline = time.time() + timeout
+    while True:
+      self._CheckRunning()
+      try:
+        self._Post('/status')
+        return
+      except OSError:
+        if time.time() > deadline:
+          raise self._Error('Trace processor did not load the trace within '
+                            '%d seconds.' % timeout)
+        time.sleep(0.1)
+
+  def _CheckRunning(self):
+    if self._process.poll() is not None:
+      raise self._Error('Running trace processor failed.')
+
+  def _Error(self, message):
+    """Returns a RuntimeError with |message| and trace processor's stderr."""
+    self._stderr.seek(0)
+    return RuntimeError(
+        '%s Command line:\n%s\nStderr:\n%s\n' %
+        (message, ' '.join(self._command_args), self._stderr.read().decode(
+            'utf-8', 'replace')))
+
+  def _Post(self, endpoint, body=b''):
+    """Sends an RPC to trace processor and returns the response body."""
+    connection = http.client.HTTPConnection('127.0.0.1', self._port)
+    try:
+      connection.request('POST', endpoint, body,
+                         {'Content-Type': 'application/x-protobuf'})
+      response = connection.getresponse()
+      data = response.read()
+    finally:
+      connection.close()
+    if response.status != 200:
+      raise RuntimeError('Trace processor RPC %s failed with status %d: %s' %
+                         (endpoint, response.status,
+                          data.decode('utf-8', 'replace')))
+    return data
+
+  def Query(self, sql_command):
+    """Runs SQL statements on the trace.
+
+    Args:
+      sql_command: string SQL command, which may have several statements.
+
+    Returns:
+      A QueryResult with the output of the last statement.
+
+    Raises:
+      RuntimeError: If the query failed.
+    """
+    return _DecodeQueryResult(
+        self._Post('/query', _EncodeField(_QUERY_ARGS_SQL_QUERY, sql_command)))
+
+  def RunMetrics(self,
+                 metric_names,
+                 fetch_power_profile=False,
+                 retain_all_samples=False):
+    """Runs TBMv3 metrics on the trace, see RunMetrics().
+
+    Returns:
+      A HistogramSet with metric results.
+    """
+    if fetch_power_profile and not self._ran_power_profile:
+      with open(_EnsurePowerProfile()) as power_profile:
+        self.Query(power_profile.read())
+      self._ran_power_profile = True
+
+    body = b''.join(
+        _EncodeField(_COMPUTE_METRIC_ARGS_METRIC_NAMES, metric_name)
+        for metric_name in metric_names)
+    body += _EncodeField(_COMPUTE_METRIC_ARGS_FORMAT,
+                         _COMPUTE_METRIC_FORMAT_JSON)
+    output = ''
+    for field_number, _, value in _DecodeFields(
+        self._Post('/compute_metric', body)):
+      if field_number == _COMPUTE_METRIC_RESULT_ERROR and value:
+        raise RuntimeError('Computing trace processor metrics failed: %s' %
+                           value.decode('utf-8'))
+      if field_number == _COMPUTE_METRIC_RESULT_JSON:
+        output = value.decode('utf-8')
+    measurements = json.loads(output) if output else {}
+    return _MetricsToHistograms(measurements, metric_names, retain_all_samples)
+
+  def ConvertToJson(self, json_path):
+    """Converts the trace to json, see ConvertProtoTraceToJson()."""
+    self.Query(EXPORT_JSON_QUERY_TEMPLATE % _SqlString(json_path))
+    return json_path
+
+  def Close(self):
+    """Stops trace processor."""
+    if self._process is not None:
+      if self._process.poll() is None:
+        self._process.terminate()
+      self._process.wait()
+      self._process = None
+      self._stderr.close()
+    shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.Close()
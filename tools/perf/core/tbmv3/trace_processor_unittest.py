@@ -2,8 +2,10 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import json
 import os
 import shutil
+import struct
 import tempfile
 import unittest
 
@@ -336,3 +338,163 @@ class TraceProcessorTestCase(unittest.TestCase):
     finally:
       os.environ.pop('PERFETTO_BINARY_PATH', None)
       os.environ.pop('PERFETTO_SYMBOLIZER_MODE', None)
+
+
+POPEN_METHOD = 'core.tbmv3.trace_processor.subprocess.Popen'
+POST_METHOD = 'core.tbmv3.trace_processor.TraceProcessorSession._Post'
+
+
+def _Field(field_number, value):
+  return trace_processor._EncodeField(field_number, value)
+
+
+def _PackedVarints(values):
+  return b''.join(trace_processor._EncodeVarint(v) for v in values)
+
+
+class TraceProcessorSessionTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.tp_path = os.path.join(self.temp_dir, 'trace_processor_shell')
+    with open(self.tp_path, 'w'):
+      pass
+    popen_patcher = mock.patch(POPEN_METHOD)
+    self.popen_patch = popen_patcher.start()
+    self.popen_patch.return_value.poll.return_value = None
+    self.addCleanup(popen_patcher.stop)
+    post_patcher = mock.patch(POST_METHOD)
+    self.post_patch = post_patcher.start()
+    self.addCleanup(post_patcher.stop)
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def testStartsTraceProcessorWithMetrics(self):
+    with trace_processor.TraceProcessorSession(self.tp_path,
+                                               '/path/to/trace') as session:
+      args = self.popen_patch.call_args[0][0]
+      self.assertEqual(args[0], self.tp_path)
+      self.assertIn('--httpd', args)
+      self.assertEqual(args[-1], '/path/to/trace')
+      extension = args[args.index('--metric-extension') + 1]
+      extension_dir, virtual_path = extension.split('@')
+      self.assertEqual(virtual_path, 'tbmv3/')
+      self.assertTrue(
+          os.path.isfile(
+              os.path.join(extension_dir, 'sql', 'dummy_metric.sql')))
+      self.assertTrue(
+          os.path.isfile(
+              os.path.join(extension_dir, 'protos', 'dummy_metric.proto')))
+      self.post_patch.assert_called_once_with('/status')
+    self.popen_patch.return_value.terminate.assert_called_once_with()
+    self.assertFalse(os.path.exists(extension_dir))
+
+  def testStartFails(self):
+    self.popen_patch.return_value.poll.return_value = 1
+    with self.assertRaises(RuntimeError):
+      trace_processor.TraceProcessorSession(self.tp_path, '/path/to/trace')
+
+  def testStartTimesOut(self):
+    self.post_patch.side_effect = ConnectionRefusedError()
+    with mock.patch('core.tbmv3.trace_processor.time') as time_patch:
+      time_patch.time.side_effect = [0, 1, 301]
+      with self.assertRaisesRegex(RuntimeError, 'within 300 seconds'):
+        trace_processor.TraceProcessorSession(self.tp_path,
+                                              '/path/to/trace',
+                                              startup_timeout=300)
+    self.popen_patch.return_value.terminate.assert_called_once_with()
+
+  def testQuery(self):
+    tp = trace_processor
+    batch = b''.join([
+        _Field(tp._CELLS_BATCH_CELLS,
+               _PackedVarints([
+                   tp._CELL_VARINT, tp._CELL_STRING, tp._CELL_FLOAT64,
+                   tp._CELL_NULL, tp._CELL_STRING, tp._CELL_NULL,
+                   tp._CELL_VARINT, tp._CELL_BLOB, tp._CELL_FLOAT64
+               ])),
+        _Field(tp._CELLS_BATCH_VARINT_CELLS, _PackedVarints([7, -3])),
+        _Field(tp._CELLS_BATCH_FLOAT64_CELLS,
+               struct.pack('<2d', 0.5, 2.0)),
+        _Field(tp._CELLS_BATCH_BLOB_CELLS, b'\x00\x01'),
+        _Field(tp._CELLS_BATCH_STRING_CELLS, b'Linux\0\0'),
+    ])
+    response = b''.join([
+        _Field(tp._QUERY_RESULT_COLUMN_NAMES, 'id'),
+        _Field(tp._QUERY_RESULT_COLUMN_NAMES, 'name'),
+        _Field(tp._QUERY_RESULT_COLUMN_NAMES, 'value'),
+        _Field(tp._QUERY_RESULT_BATCH, batch),
+    ])
+
+    with trace_processor.TraceProcessorSession(self.tp_path,
+                                               '/path/to/trace') as session:
+      self.post_patch.return_value = response
+      result = session.Query('select id, name, value from foo')
+      self.post_patch.assert_called_with(
+          '/query',
+          _Field(tp._QUERY_ARGS_SQL_QUERY,
+                 'select id, name, value from foo'))
+
+    self.assertEqual(len(result), 3)
+    self.assertEqual(result.column_names, ['id', 'name', 'value'])
+    self.assertEqual(result.Column('id'), [7, None, -3])
+    self.assertEqual(result.Column('name'), ['Linux', '', b'\x00\x01'])
+    self.assertEqual(result.Column('value'), [0.5, None, 2.0])
+    self.assertEqual(result.Rows()[0], {'id': 7, 'name': 'Linux', 'value': 0.5})
+
+  def testQueryError(self):
+    response = _Field(trace_processor._QUERY_RESULT_ERROR, 'no such table')
+    with trace_processor.TraceProcessorSession(self.tp_path,
+                                               '/path/to/trace') as session:
+      self.post_patch.return_value = response
+      with self.assertRaises(RuntimeError):
+        session.Query('select * from foo')
+
+  def testQueryCellsWithoutColumns(self):
+    tp = trace_processor
+    batch = b''.join([
+        _Field(tp._CELLS_BATCH_CELLS, _PackedVarints([tp._CELL_VARINT])),
+        _Field(tp._CELLS_BATCH_VARINT_CELLS, _PackedVarints([7])),
+    ])
+    response = _Field(tp._QUERY_RESULT_BATCH, batch)
+    with trace_processor.TraceProcessorSession(self.tp_path,
+                                               '/path/to/trace') as session:
+      self.post_patch.return_value = response
+      with self.assertRaises(trace_processor.InvalidTraceProcessorOutput):
+        session.Query('select id from foo')
+
+  def testRunMetrics(self):
+    metric_output = json.dumps({
+        'perfetto.protos.dummy_metric': {
+            'foo': 7,
+        },
+        '__annotations': {
+            'perfetto.protos.dummy_metric': {
+                'foo': {
+                    '__field_options': {
+                        'unit': 'count_biggerIsBetter'
+                    }
+                }
+            }
+        }
+    })
+    response = _Field(trace_processor._COMPUTE_METRIC_RESULT_JSON,
+                      metric_output)
+
+    with trace_processor.TraceProcessorSession(self.tp_path,
+                                               '/path/to/trace') as session:
+      self.post_patch.return_value = response
+      histograms = session.RunMetrics(['dummy_metric'])
+      endpoint, body = self.post_patch.call_args[0]
+
+    self.assertEqual(endpoint, '/compute_metric')
+    self.assertEqual(
+        body,
+        _Field(trace_processor._COMPUTE_METRIC_ARGS_METRIC_NAMES,
+               'dummy_metric') +
+        _Field(trace_processor._COMPUTE_METRIC_ARGS_FORMAT,
+               trace_processor._COMPUTE_METRIC_FORMAT_JSON))
+    foo_hist = histograms.GetHistogramNamed('dummy::foo')
+    self.assertEqual(foo_hist.unit, 'count_biggerIsBetter')
+    self.assertEqual(foo_hist.sample_values, [7])